@@ -0,0 +1,288 @@
+"""
+analytics.py
+Модуль колоночных снимков заметок (Apache Arrow / Parquet) и аналитики по ним.
+
+Снимок пишет команда export --format arrow|parquet (см. transfer.py).
+Колонки снимка (SCHEMA):
+    id, body_length          - int64
+    title, body              - строки
+    status, priority         - словарное кодирование: int8-индексы в STATUSES/PRIORITIES
+    created_us, updated_us   - int64, микросекунды от 1970-01-01 по времени сервера БД
+                               (колонки TIMESTAMP без часового пояса); -1 - нет значения
+    tags                     - список строк
+
+Файл Arrow (IPC) открывается через mmap: колонки чисел и индексы словарей
+читаются как массивы NumPy прямо из отображенной памяти, без копирования
+и без обращения к рабочей базе. Parquet сжат и всегда распаковывается
+в память - он удобнее для передачи, а Arrow - для повторного анализа.
+
+Для работы нужны pyarrow и NumPy.
+"""
+
+import datetime
+
+try:
+    import numpy
+except ImportError:  # Необязательная зависимость
+    numpy = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Необязательная зависимость
+    pyarrow = None
+
+from .models import STATUSES, PRIORITIES
+from .paths import EPOCH, to_micros
+
+# Границы корзин распределения длины текста (в символах)
+LENGTH_BINS = (0, 100, 1000, 10000, 100000, 1000000)
+
+_ARROW_MAGIC = b"ARROW1"
+_DAY_US = 86400 * 10**6
+_WEEK_US = 7 * _DAY_US
+# 1970-01-01 - четверг: сдвиг на 3 дня делает началом недели понедельник
+_WEEK_SHIFT_US = 3 * _DAY_US
+
+SCHEMA = None
+if pyarrow is not None:
+    SCHEMA = pyarrow.schema([
+        ("id", pyarrow.int64()),
+        ("title", pyarrow.string()),
+        ("body", pyarrow.large_string()),
+        ("status", pyarrow.dictionary(pyarrow.int8(), pyarrow.string())),
+        ("priority", pyarrow.dictionary(pyarrow.int8(), pyarrow.string())),
+        ("created_us", pyarrow.int64()),
+        ("updated_us", pyarrow.int64()),
+        ("body_length", pyarrow.int64()),
+        ("tags", pyarrow.list_(pyarrow.string())),
+    ], metadata={"notebookk.snapshot": "1"})
+
+
+def require_columnar():
+    """
+    Проверяет, что установлены pyarrow и NumPy.
+
+    Raises:
+        ValueError: Если какой-то из пакетов не установлен
+    """
+    missing = [name for name, module in (("pyarrow", pyarrow), ("numpy", numpy)) if module is None]
+    if missing:
+        raise ValueError(f"Для колоночных снимков установите {' и '.join(missing)}")
+
+
+def _dictionary_array(values, dictionary):
+    """Кодирует значения индексами в фиксированном словаре (одинаковом во всех порциях)."""
+    index = {value: i for i, value in enumerate(dictionary)}
+    indices = pyarrow.array([index[value] for value in values], pyarrow.int8())
+    return pyarrow.DictionaryArray.from_arrays(indices, pyarrow.array(dictionary, pyarrow.string()))
+
+
+def notes_to_batch(notes):
+    """
+    Преобразует заметки в порцию колоночного снимка.
+
+    Args:
+        notes (list[Note]): Заметки
+
+    Returns:
+        pyarrow.RecordBatch: Порция со схемой SCHEMA
+    """
+    require_columnar()
+    return pyarrow.RecordBatch.from_arrays([
+        pyarrow.array([note.id for note in notes], pyarrow.int64()),
+        pyarrow.array([note.title for note in notes], pyarrow.string()),
+        pyarrow.array([note.body for note in notes], pyarrow.large_string()),
+        _dictionary_array([note.status for note in notes], STATUSES),
+        _dictionary_array([note.priority for note in notes], PRIORITIES),
+        pyarrow.array([to_micros(note.created) for note in notes], pyarrow.int64()),
+        pyarrow.array([to_micros(note.updated) for note in notes], pyarrow.int64()),
+        pyarrow.array([note.body_length for note in notes], pyarrow.int64()),
+        pyarrow.array([note.tags for note in notes], pyarrow.list_(pyarrow.string())),
+    ], schema=SCHEMA)
+
+
+class SnapshotWriter:
+    """
+    Запись колоночного снимка порциями.
+
+    Использование:
+        with SnapshotWriter(path, "arrow") as writer:
+            writer.write(notes_to_batch(notes))
+    """
+
+    def __init__(self, path, fmt):
+        """
+        Args:
+            path (str): Путь к файлу
+            fmt (str): Формат (arrow/parquet)
+        """
+        require_columnar()
+        self.fmt = fmt
+        if fmt == "parquet":
+            self._sink = None
+            self._writer = pyarrow.parquet.ParquetWriter(path, SCHEMA, compression="zstd")
+        else:
+            self._sink = pyarrow.OSFile(path, "wb")
+            self._writer = pyarrow.ipc.new_file(self._sink, SCHEMA)
+
+    def write(self, batch):
+        """Дописывает порцию (pyarrow.RecordBatch)."""
+        if self.fmt == "parquet":
+            self._writer.write_table(pyarrow.Table.from_batches([batch]))
+        else:
+            self._writer.write_batch(batch)
+
+    def close(self):
+        """Завершает файл (записывает футер)."""
+        self._writer.close()
+        if self._sink is not None:
+            self._sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_snapshot(path):
+    """
+    Открывает колоночный снимок.
+
+    Файл Arrow отображается в память (mmap): порции ссылаются на страницы
+    файла, и данные читаются с диска только при обращении к ним.
+    Parquet читается в память целиком.
+
+    Args:
+        path (str): Путь к файлу .arrow или .parquet (формат определяется по содержимому)
+
+    Returns:
+        list[pyarrow.RecordBatch]: Порции снимка
+
+    Raises:
+        ValueError: Если файл не является снимком заметок
+    """
+    require_columnar()
+    with open(path, "rb") as f:
+        magic = f.read(len(_ARROW_MAGIC))
+    if magic == _ARROW_MAGIC:
+        reader = pyarrow.ipc.open_file(pyarrow.memory_map(path, "r"))
+        schema = reader.schema
+        batches = [reader.get_batch(i) for i in range(reader.num_record_batches)]
+    else:
+        table = pyarrow.parquet.read_table(path, memory_map=True)
+        schema = table.schema
+        batches = table.to_batches()
+    missing = [name for name in SCHEMA.names if name not in schema.names]
+    if missing:
+        raise ValueError(f"Файл {path} не является снимком заметок (нет колонок: {', '.join(missing)})")
+    return batches
+
+
+def _numbers(batch, name):
+    """Числовая колонка порции как массив NumPy (без копирования)."""
+    return batch.column(name).to_numpy(zero_copy_only=True)
+
+
+def _codes(batch, name, dictionary):
+    """
+    Индексы словарной колонки в порядке dictionary (STATUSES/PRIORITIES).
+
+    В снимках Arrow словарь совпадает с dictionary, и индексы берутся
+    из файла без копирования. Parquet может переупорядочить словарь -
+    тогда индексы перекодируются.
+    """
+    column = batch.column(name)
+    indices = column.indices.to_numpy(zero_copy_only=True)
+    values = column.dictionary.to_pylist()
+    if values == list(dictionary)[:len(values)]:
+        return indices
+    lookup = numpy.array([dictionary.index(value) for value in values], dtype=numpy.int8)
+    return lookup[indices]
+
+
+def _week_starts(micros):
+    """Номера недель (понедельник - начало недели) для времени в микросекундах."""
+    return (micros + _WEEK_SHIFT_US) // _WEEK_US
+
+
+def _week_date(week):
+    """Дата понедельника недели с номером week."""
+    return (EPOCH + datetime.timedelta(microseconds=int(week) * _WEEK_US - _WEEK_SHIFT_US)).date()
+
+
+def _add_counts(totals, keys):
+    """Добавляет к totals число вхождений каждого значения keys."""
+    values, counts = numpy.unique(keys, return_counts=True)
+    for value, count in zip(values.tolist(), counts.tolist()):
+        totals[value] = totals.get(value, 0) + count
+
+
+def weekly_throughput(batches):
+    """
+    Считает по неделям число созданных и выполненных заметок.
+
+    Временем выполнения считается время последнего изменения (updated)
+    заметок со статусом done: отдельно момент смены статуса не хранится.
+
+    Args:
+        batches (list[pyarrow.RecordBatch]): Порции снимка (open_snapshot())
+
+    Returns:
+        list[tuple]: (понедельник недели (datetime.date), создано, выполнено)
+        по возрастанию даты
+    """
+    done_code = STATUSES.index("done")
+    created, done = {}, {}
+    for batch in batches:
+        created_us = _numbers(batch, "created_us")
+        _add_counts(created, _week_starts(created_us[created_us >= 0]))
+        updated_us = _numbers(batch, "updated_us")
+        mask = (_codes(batch, "status", STATUSES) == done_code) & (updated_us >= 0)
+        _add_counts(done, _week_starts(updated_us[mask]))
+    return [(_week_date(week), created.get(week, 0), done.get(week, 0))
+            for week in sorted(created.keys() | done.keys())]
+
+
+def body_length_histogram(batches, bins=LENGTH_BINS):
+    """
+    Считает распределение длины текста заметок.
+
+    Args:
+        batches (list[pyarrow.RecordBatch]): Порции снимка
+        bins (tuple[int]): Возрастающие границы корзин
+
+    Returns:
+        list[tuple]: (от, до (None - без ограничения), число заметок);
+        нижняя граница включается, верхняя - нет
+    """
+    edges = numpy.array(bins, dtype=numpy.int64)
+    totals = numpy.zeros(len(edges), dtype=numpy.int64)
+    for batch in batches:
+        lengths = _numbers(batch, "body_length")
+        # Индекс корзины - число границ, не превосходящих длину
+        slots = numpy.searchsorted(edges, lengths, side="right") - 1
+        totals += numpy.bincount(slots[slots >= 0], minlength=len(edges))
+    uppers = list(bins[1:]) + [None]
+    return [(low, high, int(count)) for low, high, count in zip(bins, uppers, totals)]
+
+
+def status_priority_counts(batches):
+    """
+    Считает заметки в разрезе статуса и приоритета.
+
+    Args:
+        batches (list[pyarrow.RecordBatch]): Порции снимка
+
+    Returns:
+        dict: {(статус, приоритет): число заметок} для всех сочетаний
+    """
+    totals = numpy.zeros(len(STATUSES) * len(PRIORITIES), dtype=numpy.int64)
+    for batch in batches:
+        statuses = _codes(batch, "status", STATUSES).astype(numpy.int64)
+        priorities = _codes(batch, "priority", PRIORITIES).astype(numpy.int64)
+        totals += numpy.bincount(statuses * len(PRIORITIES) + priorities, minlength=len(totals))
+    return {(status, priority): int(totals[i * len(PRIORITIES) + j])
+            for i, status in enumerate(STATUSES)
+            for j, priority in enumerate(PRIORITIES)}
@@ -0,0 +1,242 @@
+"""
+batch.py
+Модуль пакетного выполнения операций над заметками.
+
+Операции читаются из файла (или stdin) в формате JSON Lines - по одной
+операции в строке:
+    {"op": "add", "title": "...", "body": "...", "status": "todo", "priority": "high", "tags": ["work"]}
+    {"op": "update", "id": 12, "title": "...", "priority": "low"}
+    {"op": "status", "id": 12, "status": "done"}
+    {"op": "delete", "id": 12}
+
+Все операции выполняются через одно соединение и группируются в транзакции
+по tx_size операций. Подряд идущие однотипные операции внутри транзакции
+объединяются в один многострочный запрос (INSERT ... VALUES, UPDATE/DELETE
+по id = ANY). Если запрос завершился ошибкой, транзакция откатывается
+и все ее операции считаются невыполненными.
+"""
+
+import json
+import time
+
+from .database import Database
+from .models import Note, STATUSES, PRIORITIES, normalize_tags
+from .storage import save_notes_bulk, update_notes, delete_notes, UPDATABLE_FIELDS
+
+OPERATIONS = ("add", "update", "status", "delete")
+
+
+class BatchError(ValueError):
+    """Ошибка в описании операции."""
+
+
+class Operation:
+    """
+    Одна операция пакета.
+
+    Attributes:
+        line (int): Номер строки во входных данных
+        op (str): Тип операции (add/update/delete; status приводится к update)
+        note_id (int | None): ID заметки (для add - присваивается при выполнении)
+        values (dict): Значения полей
+        ok (bool | None): Результат выполнения (None - не выполнялась)
+        error (str | None): Описание ошибки
+    """
+
+    def __init__(self, line, op, note_id=None, values=None):
+        self.line = line
+        self.op = op
+        self.note_id = note_id
+        self.values = values or {}
+        self.ok = None
+        self.error = None
+
+    def group_key(self):
+        """Ключ группировки: операции с одинаковым ключом выполняются одним запросом."""
+        if self.op == "update":
+            return ("update", json.dumps(self.values, sort_keys=True))
+        return (self.op,)
+
+
+def _check_values(values):
+    """Проверяет допустимость значений статуса и приоритета."""
+    if "status" in values and values["status"] not in STATUSES:
+        raise BatchError(f"неизвестный статус: {values['status']}")
+    if "priority" in values and values["priority"] not in PRIORITIES:
+        raise BatchError(f"неизвестный приоритет: {values['priority']}")
+    for field in ("title", "body"):
+        if field in values and not isinstance(values[field], str):
+            raise BatchError(f"поле {field} должно быть строкой")
+    if "tags" in values:
+        tags = values["tags"]
+        if isinstance(tags, str):
+            tags = [tags]
+        if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+            raise BatchError("поле tags должно быть списком строк")
+        values["tags"] = normalize_tags(tags)
+
+
+def parse_operation(line_no, text):
+    """
+    Разбирает строку с описанием операции.
+
+    Args:
+        line_no (int): Номер строки
+        text (str): JSON-объект операции
+
+    Returns:
+        Operation: Разобранная операция
+
+    Raises:
+        BatchError: Если строка не является корректной операцией
+    """
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise BatchError(f"некорректный JSON: {e}")
+    if not isinstance(data, dict):
+        raise BatchError("ожидается JSON-объект")
+
+    op = data.pop("op", None)
+    if op not in OPERATIONS:
+        raise BatchError(f"неизвестная операция: {op!r} (допустимо: {', '.join(OPERATIONS)})")
+
+    if op == "add":
+        values = {
+            "title": data.get("title"),
+            "body": data.get("body", ""),
+            "status": data.get("status", "todo"),
+            "priority": data.get("priority", "medium"),
+            "tags": data.get("tags", []),
+        }
+        if not values["title"]:
+            raise BatchError("не указан заголовок (title)")
+        _check_values(values)
+        return Operation(line_no, "add", values=values)
+
+    note_id = data.pop("id", None)
+    if not isinstance(note_id, int) or isinstance(note_id, bool):
+        raise BatchError("не указан целочисленный id")
+
+    if op == "delete":
+        return Operation(line_no, "delete", note_id)
+
+    if op == "status":
+        if "status" not in data:
+            raise BatchError("не указан статус (status)")
+        values = {"status": data["status"]}
+    else:
+        unknown = set(data) - set(UPDATABLE_FIELDS)
+        if unknown:
+            raise BatchError(f"нельзя изменить поля: {', '.join(sorted(unknown))}")
+        if not data:
+            raise BatchError("не указаны поля для изменения")
+        values = data
+    _check_values(values)
+    return Operation(line_no, "update", note_id, values)
+
+
+def _execute_group(group):
+    """
+    Выполняет группу однотипных операций одним запросом.
+
+    Args:
+        group (list[Operation]): Операции с одинаковым group_key()
+    """
+    op = group[0].op
+    if op == "add":
+        notes = [Note(0, o.values["title"], o.values["body"], o.values["status"], o.values["priority"],
+                      tags=o.values["tags"])
+                 for o in group]
+        save_notes_bulk(notes)
+        for o, note in zip(group, notes):
+            o.note_id = note.id
+            o.ok = True
+        return
+
+    ids = [o.note_id for o in group]
+    if op == "delete":
+        done = set(delete_notes(ids))
+    else:
+        done = set(update_notes(ids, group[0].values))
+    for o in group:
+        o.ok = o.note_id in done
+        if not o.ok:
+            o.error = f"заметка {o.note_id} не найдена"
+
+
+def _execute_transaction(ops):
+    """
+    Выполняет операции в одной транзакции, объединяя подряд идущие однотипные.
+
+    Args:
+        ops (list[Operation]): Операции транзакции
+    """
+    try:
+        with Database.transaction():
+            group = []
+            for o in ops:
+                if group and o.group_key() != group[-1].group_key():
+                    _execute_group(group)
+                    group = []
+                group.append(o)
+            if group:
+                _execute_group(group)
+    except Exception as e:
+        # Транзакция откачена - ни одна ее операция не применилась
+        for o in ops:
+            o.ok = False
+            o.error = f"транзакция отменена: {e}".strip()
+
+
+def run_batch(lines, tx_size=100, on_result=None):
+    """
+    Выполняет поток операций.
+
+    Args:
+        lines (iterable[str]): Строки JSON Lines (пустые и начинающиеся с # пропускаются)
+        tx_size (int): Максимальное количество операций в одной транзакции
+        on_result (callable, optional): Вызывается для каждой операции после ее выполнения
+
+    Returns:
+        dict: Итоги: ok, failed, elapsed (секунды)
+    """
+    if tx_size < 1:
+        raise ValueError("Размер транзакции должен быть положительным")
+
+    stats = {"ok": 0, "failed": 0, "elapsed": 0.0}
+    started = time.perf_counter()
+
+    def report(ops):
+        for o in ops:
+            stats["ok" if o.ok else "failed"] += 1
+            if on_result:
+                on_result(o)
+
+    with Database.session():
+        pending = []
+        for line_no, text in enumerate(lines, 1):
+            text = text.strip()
+            if not text or text.startswith("#"):
+                continue
+            try:
+                pending.append(parse_operation(line_no, text))
+            except BatchError as e:
+                # Ошибочная строка не прерывает пакет
+                o = Operation(line_no, None)
+                o.ok = False
+                o.error = str(e)
+                report([o])
+                continue
+
+            if len(pending) >= tx_size:
+                _execute_transaction(pending)
+                report(pending)
+                pending = []
+
+        if pending:
+            _execute_transaction(pending)
+            report(pending)
+
+    stats["elapsed"] = time.perf_counter() - started
+    return stats
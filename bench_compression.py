@@ -0,0 +1,83 @@
+# bench_compression.py
+# Сравнение хранения текстов заметок как TEXT и в сжатом виде (DB_COMPRESS_BODIES).
+#
+# Создает две временные таблицы с одинаковыми текстами: в одной тексты
+# хранятся как TEXT, в другой - сжатыми на клиенте (bytea), и сравнивает
+# объем передаваемых данных, время загрузки и время распаковки.
+#
+# Запуск: python -m notebookk.bench_compression [число заметок] [размер текста в символах]
+import random
+import sys
+import time
+
+from notebookk.compression import CODECS, default_codec, unpack_body
+from notebookk.database import Database
+
+WORDS = ("лог", "ошибка", "запрос", "ответ", "сервер", "таймаут", "пользователь", "заметка",
+         "INFO", "WARN", "ERROR", "200", "404", "500", "GET", "POST", "/api/notes", "ms")
+
+
+def make_body(size):
+    """Генерирует текст, похожий на вставленный лог."""
+    words = []
+    length = 0
+    while length < size:
+        word = random.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)[:size]
+
+
+def timed_fetch(cursor, query):
+    """Выполняет запрос и возвращает (строки, время в секундах)."""
+    started = time.perf_counter()
+    cursor.execute(query)
+    rows = cursor.fetchall()
+    return rows, time.perf_counter() - started
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 50000
+    codec = default_codec()
+    compress = CODECS[codec][0]
+
+    print(f"=== {count} заметок по {size} символов, алгоритм {codec} ===")
+    bodies = [make_body(size) for _ in range(count)]
+
+    with Database.transaction(), Database.get_cursor() as cursor:
+        cursor.execute("CREATE TEMP TABLE bench_plain (id SERIAL, body TEXT) ON COMMIT DROP")
+        cursor.execute("CREATE TEMP TABLE bench_packed (id SERIAL, body_z BYTEA, body_codec TEXT) ON COMMIT DROP")
+
+        started = time.perf_counter()
+        packed = [compress(body.encode("utf-8")) for body in bodies]
+        compress_time = time.perf_counter() - started
+
+        cursor.executemany("INSERT INTO bench_plain (body) VALUES (%s)", [(body,) for body in bodies])
+        cursor.executemany("INSERT INTO bench_packed (body_z, body_codec) VALUES (%s, %s)",
+                           [(payload, codec) for payload in packed])
+
+        # Объем данных, которые отдает сервер (без служебных заголовков протокола)
+        cursor.execute("SELECT SUM(octet_length(body)) AS size FROM bench_plain")
+        plain_bytes = cursor.fetchone()['size']
+        cursor.execute("SELECT SUM(octet_length(body_z)) AS size FROM bench_packed")
+        packed_bytes = cursor.fetchone()['size']
+
+        _, plain_time = timed_fetch(cursor, "SELECT id, body FROM bench_plain")
+        rows, packed_time = timed_fetch(cursor, "SELECT id, body_z, body_codec FROM bench_packed")
+
+        started = time.perf_counter()
+        for row in rows:
+            unpack_body(row['body_z'], row['body_codec'])
+        unpack_time = time.perf_counter() - started
+
+    print(f"{'':<12} | {'Передано, МБ':>13} | {'Загрузка, с':>12} | {'Распаковка, с':>14}")
+    print("-" * 62)
+    print(f"{'TEXT':<12} | {plain_bytes / 2**20:>13.2f} | {plain_time:>12.3f} | {'-':>14}")
+    print(f"{'bytea/' + codec:<12} | {packed_bytes / 2**20:>13.2f} | {packed_time:>12.3f} | {unpack_time:>14.3f}")
+    print("-" * 62)
+    print(f"Степень сжатия: {plain_bytes / packed_bytes:.1f}x, время сжатия при записи: {compress_time:.3f} с")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,10 +3,25 @@ commands.py
 Модуль CLI команд приложения.
 """
 
-from .storage import load_notes, save_note, delete_note_by_id, search_notes, get_note_by_id
-from .models import Note
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from .storage import (load_notes, save_note, delete_note_by_id, search_notes, recent_note_ids,
+                      next_notes, claim_next_notes, archive_done_notes, purge_tombstones,
+                      count_matching, update_matching, delete_matching,
+                      get_note_by_id, edit_note, ConflictError, tag_counts, get_notes_by_ids)
+from .models import Note, STATUSES, PRIORITIES, normalize_tags
+from .batch import run_batch
+from .options import format_size
 from notebookk.database import init_db
 
+# Модули dedupe, transfer, analytics, syncdir и doctor (с NumPy, pyarrow,
+# multiprocessing) импортируются внутри своих команд: остальные команды
+# и GUI не должны тратить на них время запуска
+
 
 def get_next_id(notes):
     """
@@ -33,6 +48,7 @@ def add_note(args):
             - body (str): Текст заметки
             - status (str): Статус заметки
             - priority (str): Приоритет заметки
+            - tag (list[str], optional): Теги заметки
 
     Prints:
         Информация о добавленной заметке или сообщение об ошибке
@@ -46,7 +62,8 @@ def add_note(args):
         args.title,
         args.body,
         args.status,
-        args.priority
+        args.priority,
+        tags=args.tag or ()
     )
 
     # Сохраняем в БД
@@ -56,10 +73,12 @@ def add_note(args):
     print(f"✅ Заметка добавлена! ID: {note.id}")
     print(f"   Заголовок: {note.title}")
     print(f"   Статус: {note.status}, Приоритет: {note.priority}")
+    if note.tags:
+        print(f"   Теги: {', '.join(note.tags)}")
     print(f"   Создано: {note.created}")
 
 
-def list_notes(args):
+def list_notes(args, load=load_notes):
     """
     Показывает список заметок с возможностью фильтрации.
 
@@ -67,22 +86,27 @@ def list_notes(args):
         args: Объект аргументов с полями:
             - status (str, optional): Фильтр по статусу
             - priority (str, optional): Фильтр по приоритету
+            - since (datetime.date, optional): Созданные начиная с даты
+            - until (datetime.date, optional): Созданные по дату включительно
+            - include_archive (bool): Показать также заметки из архива
+            - tag (list[str], optional): Только заметки со всеми этими тегами
+        load (callable): Функция загрузки с параметрами storage.load_notes()
+            (в shell - из кэша заметок)
 
     Prints:
         Отформатированную таблицу с заметками или сообщение об отсутствии
     """
     init_db()
 
-    notes = load_notes()
-    filtered = notes.copy()  # Создаем копию для фильтрации
-
-    # Фильтрация по статусу
-    if args.status:
-        filtered = [n for n in filtered if n.status == args.status]
-
-    # Фильтрация по приоритету
-    if args.priority:
-        filtered = [n for n in filtered if n.priority == args.priority]
+    # Фильтрация выполняется в БД
+    filtered = load(
+        status=args.status,
+        priority=args.priority,
+        since=args.since,
+        until=args.until,
+        include_archive=args.include_archive,
+        tags=args.tag
+    )
 
     if not filtered:
         print("📝 Заметки не найдены")
@@ -94,33 +118,85 @@ def list_notes(args):
         print(f"   Фильтр по статусу: {args.status}")
     if args.priority:
         print(f"   Фильтр по приоритету: {args.priority}")
+    if args.since or args.until:
+        print(f"   Период: {args.since or '...'} — {args.until or '...'}")
+    if args.tag:
+        print(f"   Теги: {', '.join(args.tag)}")
+
+    print_notes_table(filtered)
 
+
+def print_notes_table(notes):
+    """
+    Выводит заметки в виде таблицы.
+
+    Args:
+        notes (list[Note]): Заметки для вывода
+    """
     print("-" * 100)
     # Заголовок таблицы
-    print(f"{'ID':<4} | {'Заголовок':<30} | {'Статус':<12} | {'Приоритет':<9} | {'Создано':<19}")
+    print(f"{'ID':<4} | {'Заголовок':<30} | {'Статус':<12} | {'Приоритет':<9} | {'Теги':<15} | {'Создано':<16}")
     print("-" * 100)
 
-    for note in filtered:
+    for note in notes:
         # Обрезаем длинный заголовок
         title = note.title[:27] + "..." if len(note.title) > 30 else note.title
-        print(f"{note.id:<4} | {title:<30} | {note.status:<12} | {note.priority:<9} | {note.created:<19}")
+        tags = ", ".join(note.tags)
+        tags = tags[:12] + "..." if len(tags) > 15 else tags
+        print(f"{note.id:<4} | {title:<30} | {note.status:<12} | {note.priority:<9} | {tags:<15} | {note.created:<16}")
 
     print("-" * 100)
 
 
-def search_notes_cli(args):
+def next_notes_cli(args):
+    """
+    Показывает, чем заняться дальше: открытые заметки по убыванию приоритета.
+
+    Args:
+        args: Объект аргументов с полями:
+            - n (int): Количество заметок
+            - claim (bool): Взять заметки в работу (todo -> in_progress)
+
+    Prints:
+        Таблицу заметок из очереди или сообщение о пустой очереди
+    """
+    init_db()
+
+    if args.claim:
+        notes = claim_next_notes(args.n)
+        if not notes:
+            print("✅ Нет заметок со статусом todo - очередь пуста")
+            return
+        print(f"🚀 Взято в работу заметок: {len(notes)}")
+    else:
+        notes = next_notes(args.n)
+        if not notes:
+            print("✅ Открытых заметок нет")
+            return
+        print(f"⏭️  Следующие заметки ({len(notes)}):")
+
+    print_notes_table(notes)
+
+
+def search_notes_cli(args, search=search_notes):
     """
     Ищет заметки по ключевому слову в заголовке или тексте.
 
     Args:
         args: Объект аргументов с полями:
             - keyword (str): Ключевое слово для поиска
+            - include_archive (bool): Искать также в архиве
+            - tag (list[str], optional): Только заметки со всеми этими тегами
+            - include_compressed (bool): Искать также в сжатых текстах
+        search (callable): Функция поиска с параметрами storage.search_notes()
+            (в shell - по кэшу заметок)
 
     Prints:
         Список найденных заметок с фрагментами текста
     """
     init_db()
-    found = search_notes(args.keyword)
+    found = search(args.keyword, include_archive=args.include_archive, tags=args.tag,
+                   include_compressed=args.include_compressed)
 
     if not found:
         print(f"🔍 По запросу '{args.keyword}' ничего не найдено")
@@ -155,32 +231,638 @@ def search_notes_cli(args):
         print("-" * 100)
 
 
+def selection_filters(args):
+    """
+    Собирает фильтры отбора заметок для массовых команд (update/delete).
+
+    Args:
+        args: Объект аргументов с полями id, status, priority, since, until, before
+
+    Returns:
+        dict: Фильтры для storage.count_matching/update_matching/delete_matching
+    """
+    return {
+        'ids': args.id,
+        'status': args.status,
+        'priority': args.priority,
+        'since': args.since,
+        'until': args.until,
+        'before': args.before,
+        'tags': args.tag,
+    }
+
+
+def describe_filters(filters):
+    """Возвращает описание фильтров отбора для вывода пользователю."""
+    parts = []
+    if filters['ids'] is not None:
+        parts.append(f"ID: {', '.join(map(str, filters['ids']))}")
+    for key, title in (('status', 'статус'), ('priority', 'приоритет'), ('since', 'создано с'),
+                       ('until', 'создано по'), ('before', 'создано до')):
+        if filters[key]:
+            parts.append(f"{title}: {filters[key]}")
+    if filters['tags']:
+        parts.append(f"теги: {', '.join(filters['tags'])}")
+    return ", ".join(parts)
+
+
 def delete_note_cli(args):
     """
-    Удаляет заметку по указанному ID.
+    Удаляет заметки по ID или по фильтру одним запросом.
 
     Args:
         args: Объект аргументов с полями:
-            - id (int): ID заметки для удаления
+            - id (list[int], optional): ID заметок для удаления
+            - status, priority, since, until, before: Фильтры отбора
+            - dry_run (bool): Только показать, сколько заметок будет удалено
 
     Prints:
-        Сообщение об успешном удалении или ошибке если заметка не найдена
+        Сообщение об успешном удалении или ошибке если заметки не найдены
+    """
+    init_db()
+    filters = selection_filters(args)
+    if not any(value is not None for value in filters.values()):
+        print("❌ Укажите ID заметок или условия отбора (--status, --priority, --since, --until, --before, --tag)")
+        return
+
+    if args.dry_run:
+        count = count_matching(**filters)
+        print(f"🔎 Будет удалено заметок: {count} ({describe_filters(filters)})")
+        return
+
+    single_id = args.id[0] if args.id and len(args.id) == 1 else None
+    if single_id is not None and all(value is None for key, value in filters.items() if key != 'ids'):
+        # Одна заметка: запрос сразу возвращает удаленную строку
+        note = delete_note_by_id(single_id)
+        if not note:
+            print(f"❌ Заметка с ID {single_id} не найдена")
+            # Показываем доступные ID для справки
+            available_ids = recent_note_ids(5)  # Последние 5 ID
+            if available_ids:
+                print(f"   Доступные ID: {', '.join(map(str, available_ids))}...")
+            return
+
+        print(f"🗑️  Заметка удалена!")
+        print(f"   ID: {note.id}")
+        print(f"   Заголовок: {note.title}")
+        return
+
+    deleted = delete_matching(**filters)
+    if not deleted:
+        print(f"❌ Заметки не найдены ({describe_filters(filters)})")
+        return
+    print(f"🗑️  Удалено заметок: {len(deleted)}")
+    if args.id:
+        missing = sorted(set(args.id) - set(deleted))
+        if missing:
+            print(f"   Не найдены ID: {', '.join(map(str, missing))}")
+
+
+def update_notes_cli(args):
+    """
+    Изменяет заметки по ID или по фильтру одним запросом.
+
+    Args:
+        args: Объект аргументов с полями:
+            - id (list[int], optional): ID заметок
+            - status, priority, since, until, before: Фильтры отбора
+            - set_title, set_body, set_status, set_priority, set_tags: Новые значения полей
+            - dry_run (bool): Только показать, сколько заметок будет изменено
+
+    Prints:
+        Количество измененных заметок или сообщение об ошибке
+    """
+    init_db()
+    filters = selection_filters(args)
+    if not any(value is not None for value in filters.values()):
+        print("❌ Укажите ID заметок или условия отбора (--status, --priority, --since, --until, --before, --tag)")
+        return
+
+    values = {
+        field: getattr(args, f"set_{field}")
+        for field in ('title', 'body', 'status', 'priority', 'tags')
+        if getattr(args, f"set_{field}") is not None
+    }
+    if not values:
+        print("❌ Укажите новые значения (--set-title, --set-body, --set-status, --set-priority, --set-tags)")
+        return
+
+    if args.dry_run:
+        count = count_matching(**filters)
+        print(f"🔎 Будет изменено заметок: {count} ({describe_filters(filters)})")
+        return
+
+    updated = update_matching(values, **filters)
+    if not updated:
+        print(f"❌ Заметки не найдены ({describe_filters(filters)})")
+        return
+    print(f"✏️  Изменено заметок: {len(updated)}")
+    print(f"   Новые значения: {', '.join(f'{key}={value}' for key, value in values.items())}")
+    if args.id:
+        missing = sorted(set(args.id) - set(updated))
+        if missing:
+            print(f"   Не найдены ID: {', '.join(map(str, missing))}")
+
+
+def edit_in_editor(note):
+    """
+    Открывает заметку во внешнем редакторе ($VISUAL/$EDITOR).
+
+    Первая строка файла - заголовок, после пустой строки - текст.
+
+    Args:
+        note (Note): Заметка для редактирования
+
+    Returns:
+        tuple[str, str, str]: Заголовок, текст и путь к временному файлу
+    """
+    editor = os.getenv('VISUAL') or os.getenv('EDITOR') or ('notepad' if os.name == 'nt' else 'vi')
+    fd, path = tempfile.mkstemp(prefix=f"notebookk-{note.id}-", suffix=".txt")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(f"{note.title}\n\n{note.body}")
+
+    subprocess.call([*editor.split(), path])
+
+    with open(path, encoding="utf-8") as f:
+        title, _, body = f.read().partition("\n")
+    return title.strip(), body.strip("\n"), path
+
+
+def edit_note_cli(args):
+    """
+    Редактирует заметку с проверкой одновременных изменений.
+
+    Заметка читается вместе с временем последнего изменения (updated) и
+    сохраняется, только если за время редактирования ее никто не изменил.
+    Без аргументов полей заметка открывается во внешнем редакторе.
+
+    Args:
+        args: Объект аргументов с полями:
+            - id (int): ID заметки
+            - title, body, status, priority (str, optional): Новые значения полей
+            - tags (str, optional): Новые теги через запятую
+
+    Prints:
+        Результат сохранения или описание конфликта
     """
     init_db()
-    # Проверяем существование заметки
     note = get_note_by_id(args.id)
     if not note:
         print(f"❌ Заметка с ID {args.id} не найдена")
-        # Показываем доступные ID для справки
-        notes = load_notes()
-        available_ids = [n.id for n in notes[:5]]  # Первые 5 ID
-        if available_ids:
-            print(f"   Доступные ID: {', '.join(map(str, available_ids))}...")
         return
 
-    # Удаляем заметку
-    delete_note_by_id(args.id)
+    draft_path = None
+    if all(getattr(args, field) is None for field in ('title', 'body', 'status', 'priority', 'tags')):
+        note.title, note.body, draft_path = edit_in_editor(note)
+        if not note.title:
+            print("❌ Заголовок не может быть пустым, изменения не сохранены")
+            os.remove(draft_path)
+            return
+    else:
+        for field in ('title', 'body', 'status', 'priority'):
+            value = getattr(args, field)
+            if value is not None:
+                setattr(note, field, value)
+        if args.tags is not None:
+            note.tags = normalize_tags(args.tags)
+
+    try:
+        saved = edit_note(note)
+    except ConflictError as e:
+        print(f"⚠️ {e}, изменения не сохранены")
+        print(f"   Текущая версия изменена: {e.current.updated:%Y-%m-%d %H:%M:%S}")
+        print(f"   Заголовок: {e.current.title}")
+        print(f"   Статус: {e.current.status}, Приоритет: {e.current.priority}")
+        if draft_path:
+            # Черновик не удаляем, чтобы правки не потерялись
+            print(f"   Ваш вариант сохранен в файле: {draft_path}")
+        return
 
-    print(f"🗑️  Заметка удалена!")
-    print(f"   ID: {note.id}")
-    print(f"   Заголовок: {note.title}")
+    if draft_path:
+        os.remove(draft_path)
+    if not saved:
+        print(f"❌ Заметка с ID {args.id} была удалена")
+        return
+
+    print(f"✏️  Заметка #{saved.id} сохранена")
+    print(f"   Заголовок: {saved.title}")
+    print(f"   Статус: {saved.status}, Приоритет: {saved.priority}")
+
+
+def archive_notes_cli(args):
+    """
+    Переносит завершенные заметки в архив и удаляет устаревшие надгробия порциями.
+
+    Args:
+        args: Объект аргументов с полями:
+            - older_than (datetime.timedelta): Минимальный возраст последнего изменения
+            - tombstones_older_than (datetime.timedelta): Срок хранения надгробий
+            - batch_size (int): Размер порции (одна транзакция на порцию)
+
+    Prints:
+        Ход архивации, количество перенесенных заметок и удаленных надгробий
+    """
+    init_db()
+
+    total = 0
+    while True:
+        moved = archive_done_notes(args.older_than, args.batch_size)
+        if not moved:
+            break
+        total += moved
+        print(f"   📦 Перенесено: {total}")
+
+    if total:
+        print(f"✅ В архив перенесено заметок: {total}")
+    else:
+        print("📝 Нет завершенных заметок для архивации")
+
+    purged = 0
+    while True:
+        removed = purge_tombstones(args.tombstones_older_than, args.batch_size)
+        if not removed:
+            break
+        purged += removed
+    if purged:
+        print(f"🧹 Удалено устаревших надгробий: {purged}")
+
+
+def batch_cli(args):
+    """
+    Выполняет пакет операций из файла JSON Lines или stdin.
+
+    Args:
+        args: Объект аргументов с полями:
+            - file (file): Открытый файл с операциями (по одной в строке)
+            - tx_size (int): Количество операций в одной транзакции
+            - errors_only (bool): Выводить только ошибочные операции
+
+    Prints:
+        Результат каждой операции и общую производительность
+    """
+    init_db()
+
+    def on_result(op):
+        if op.ok:
+            if not args.errors_only:
+                print(f"   ✅ строка {op.line}: {op.op} #{op.note_id}")
+        else:
+            print(f"   ❌ строка {op.line}: {op.error}")
+
+    try:
+        stats = run_batch(args.file, args.tx_size, on_result)
+    finally:
+        if args.file is not sys.stdin:
+            args.file.close()
+
+    total = stats['ok'] + stats['failed']
+    rate = total / stats['elapsed'] if stats['elapsed'] > 0 else 0
+    print(f"✅ Выполнено: {stats['ok']}, с ошибками: {stats['failed']}, "
+          f"за {stats['elapsed']:.2f} с ({rate:.0f} операций/с)")
+
+
+def tags_cli(args):
+    """
+    Показывает количество заметок по каждому тегу.
+
+    Args:
+        args: Объект аргументов с полями:
+            - status (str, optional): Учитывать только заметки с этим статусом
+            - tag (list[str], optional): Учитывать только заметки с этими тегами
+
+    Prints:
+        Таблицу тегов, самые частые сначала
+    """
+    init_db()
+    counts = tag_counts(status=args.status, tags=args.tag)
+    if not counts:
+        print("🏷️ Теги не найдены")
+        return
+
+    print(f"🏷️ Всего тегов: {len(counts)}")
+    print("-" * 40)
+    for tag, count in counts:
+        print(f"{tag:<30} | {count:>6}")
+    print("-" * 40)
+
+
+def dedupe_cli(args):
+    """
+    Находит группы почти одинаковых заметок и при необходимости объединяет их.
+
+    Args:
+        args: Объект аргументов с полями:
+            - threshold (float): Минимальное сходство заметок (от 0 до 1)
+            - limit (int): Сколько групп показать (и объединить)
+            - merge (bool): Объединить показанные группы в последнюю измененную заметку
+            - dry_run (bool): Только показать, какие заметки будут объединены
+
+    Prints:
+        Найденные группы дубликатов и результат объединения
+    """
+    from .dedupe import update_signatures, find_clusters, plan_merge, merge_cluster
+    init_db()
+    if not 0 < args.threshold <= 1:
+        print("❌ Порог сходства должен быть в диапазоне (0, 1]")
+        return
+
+    def on_progress(done, total):
+        print(f"   🔢 Подписи: {done}/{total}", end="\r", flush=True)
+
+    signatures, computed = update_signatures(on_progress=on_progress)
+    if computed:
+        print()
+    print(f"🔎 Заметок: {len(signatures)}, пересчитано подписей: {computed}")
+
+    clusters = find_clusters(signatures, args.threshold)
+    if not clusters:
+        print("✅ Дубликаты не найдены")
+        return
+    print(f"📑 Групп дубликатов: {len(clusters)}, заметок в них: {sum(map(len, clusters))}")
+
+    shown = clusters[:args.limit]
+    for ids in shown:
+        notes = sorted(get_notes_by_ids(ids), key=lambda note: note.id)
+        plan = plan_merge(notes, args.threshold) if args.dry_run else None
+        print("-" * 60)
+        for note in notes:
+            mark = ""
+            if plan:
+                keep, duplicates = plan
+                mark = " ✅ останется" if note is keep else " 🗑️ будет удалена" if note in duplicates else ""
+            print(f"   #{note.id:<8} {note.title[:40]:<40} | {note.created}{mark}")
+    if len(clusters) > args.limit:
+        print(f"   ... и еще групп: {len(clusters) - args.limit} (не объединяются, увеличьте --limit)")
+    print("-" * 60)
+
+    if args.dry_run:
+        print("💡 Чтобы объединить показанные группы, повторите команду с --merge без --dry-run")
+        return
+    if not args.merge:
+        print("💡 Чтобы объединить показанные группы, повторите команду с --merge "
+              "(--dry-run - сначала посмотреть результат)")
+        return
+
+    merged = removed = 0
+    for ids in shown:
+        result = merge_cluster(ids, args.threshold)
+        if result:
+            merged += 1
+            removed += len(result[1])
+    print(f"🧹 Объединено групп: {merged}, удалено заметок: {removed}")
+
+
+def print_worker_stats(workers):
+    """
+    Выводит производительность обработчиков параллельного импорта/экспорта.
+
+    Args:
+        workers (dict): Обработчик -> [заметок, секунд работы]
+    """
+    for name, (rows, seconds) in sorted(workers.items()):
+        rate = rows / seconds if seconds > 0 else 0
+        print(f"   {name:<20} | {rows:>9} | {seconds:>8.2f} с | {rate:>10.0f} заметок/с")
+
+
+def import_cli(args):
+    """
+    Импортирует заметки из файла JSON Lines или CSV параллельно.
+
+    Args:
+        args: Объект аргументов с полями:
+            - file (str): Путь к файлу
+            - format (str, optional): Формат файла (по умолчанию по расширению)
+            - workers (int, optional): Число процессов разбора
+            - connections (int, optional): Число подключений для записи
+
+    Prints:
+        Ошибки в строках файла, итоги и производительность каждого обработчика
+    """
+    from .transfer import import_file
+    init_db()
+
+    def on_error(line_no, message):
+        print(f"   ❌ строка {line_no}: {message}")
+
+    try:
+        stats = import_file(args.file, args.format, args.workers, args.connections, on_error=on_error)
+    except (OSError, ValueError) as e:
+        print(f"❌ Не удалось прочитать файл: {e}")
+        return
+
+    for error in stats['errors']:
+        print(f"   ❌ {error}")
+    total = stats['imported'] + stats['skipped'] + stats['failed']
+    rate = total / stats['elapsed'] if stats['elapsed'] > 0 else 0
+    print(f"✅ Импортировано: {stats['imported']}, пропущено (уже есть в БД): {stats['skipped']}, "
+          f"с ошибками: {stats['failed']}, за {stats['elapsed']:.2f} с ({rate:.0f} заметок/с)")
+    print("📊 Разбор:")
+    print_worker_stats(stats['parsers'])
+    print("📊 Запись:")
+    print_worker_stats(stats['writers'])
+
+
+def export_cli(args):
+    """
+    Выгружает заметки в файл JSON Lines, CSV, Arrow или Parquet параллельно.
+
+    Args:
+        args: Объект аргументов с полями:
+            - file (str): Путь к файлу
+            - format (str, optional): Формат файла (по умолчанию по расширению)
+            - workers (int, optional): Число процессов
+            - status (str, optional): Выгрузить только заметки с этим статусом
+            - tag (list[str], optional): Выгрузить только заметки с этими тегами
+
+    Prints:
+        Итоги и производительность каждого обработчика
+    """
+    from .transfer import export_file
+    init_db()
+    try:
+        stats = export_file(args.file, args.format, args.workers, status=args.status, tags=args.tag)
+    except OSError as e:
+        print(f"❌ Не удалось записать файл: {e}")
+        return
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+
+    rate = stats['exported'] / stats['elapsed'] if stats['elapsed'] > 0 else 0
+    print(f"✅ Выгружено заметок: {stats['exported']} в {args.file}, "
+          f"за {stats['elapsed']:.2f} с ({rate:.0f} заметок/с)")
+    print_worker_stats(stats['workers'])
+
+
+def report_cli(args):
+    """
+    Выводит отчет по колоночному снимку заметок (без подключения к БД).
+
+    Args:
+        args: Объект аргументов с полями:
+            - snapshot (str): Файл снимка (export --format arrow|parquet)
+            - weeks (int): Сколько последних недель показать
+
+    Prints:
+        Заметки по статусам и приоритетам, создано и выполнено по неделям,
+        распределение длины текста
+    """
+    from .analytics import open_snapshot, weekly_throughput, body_length_histogram, status_priority_counts
+    started = time.perf_counter()
+    try:
+        batches = open_snapshot(args.snapshot)
+    except (OSError, ValueError) as e:
+        print(f"❌ Не удалось открыть снимок: {e}")
+        return
+    total = sum(batch.num_rows for batch in batches)
+    print(f"📊 Снимок {args.snapshot}: заметок {total}")
+
+    counts = status_priority_counts(batches)
+    print("\n📌 По статусам и приоритетам:")
+    print(f"  {'':<12}" + "".join(f"{priority:>10}" for priority in PRIORITIES))
+    for status in STATUSES:
+        print(f"  {status:<12}" + "".join(f"{counts[status, priority]:>10}" for priority in PRIORITIES))
+
+    weeks = weekly_throughput(batches)[-args.weeks:]
+    print(f"\n📅 По неделям (последние {len(weeks)}):")
+    for week, created, done in weeks:
+        print(f"  {week.isoformat()}  создано: {created:>7}  выполнено: {done:>7}")
+
+    print("\n📏 Длина текста (символов):")
+    for low, high, count in body_length_histogram(batches):
+        label = f"{low}-{high - 1}" if high is not None else f"{low}+"
+        print(f"  {label:>14}: {count}")
+    print(f"\n⏱️ Отчет построен за {time.perf_counter() - started:.3f} с")
+
+
+def _percent(rate):
+    """Доля для вывода (- если данных нет)."""
+    return "-" if rate is None else f"{rate:.0%}"
+
+
+def doctor_cli(args):
+    """
+    Выводит диагностику БД: планы запросов, индексы, таблицы и pg_stat_statements.
+
+    Args:
+        args: Объект аргументов с полями:
+            - seq_scan_limit (int, optional): Порог размера таблицы для Seq Scan в байтах
+            - fail_on_seq_scan (bool): Завершиться с кодом 1, если запрос
+              читает целиком таблицу больше порога
+
+    Prints:
+        Отчет и список найденных проблем
+    """
+    from .doctor import diagnose
+    init_db()
+    try:
+        report = diagnose(args.seq_scan_limit)
+    except Exception as e:
+        print(f"❌ Не удалось выполнить диагностику: {e}")
+        sys.exit(1)
+
+    print(f"🔍 Запросы storage.py (EXPLAIN ANALYZE, порог Seq Scan {format_size(report['limit'])}):")
+    for query in report["queries"]:
+        mark = "❌" if query["slow_scans"] else "ℹ️" if query["full_scan"] else "✅"
+        access = ", ".join(query["indexes"]) or "без индексов"
+        if query["seq_scans"]:
+            scans = ", ".join(f"{relation} ({format_size(size)})" for relation, size in query["seq_scans"])
+            access += f"; Seq Scan: {scans}"
+            if query["full_scan"]:
+                access += " (ожидаемо)"
+        print(f"  {mark} {query['name']:<26} {query['time_ms']:>9.2f} мс  строк: {query['rows']:<6} "
+              f"буферов: {query['hit']} из кэша, {query['read']} с диска  [{access}]")
+
+    print("\n📦 Таблицы:")
+    for table in report["tables"]:
+        vacuum = table["last_vacuum"].strftime("%Y-%m-%d %H:%M") if table["last_vacuum"] else "никогда"
+        print(f"  {table['name']:<24} данные: {format_size(table['table_size']):>9}  "
+              f"индексы: {format_size(table['indexes_size']):>9}  живых: {table['live']:<8} "
+              f"мертвых: {table['dead']:<8} Seq/Index Scan: {table['seq_scan']}/{table['idx_scan']}  "
+              f"кэш: {_percent(table['hit_rate'])}  VACUUM: {vacuum}")
+    print(f"  🪦 Надгробий (deleted) в notes: {report['tombstones']}")
+
+    print("\n🗂️ Индексы:")
+    for index in report["indexes"]:
+        print(f"  {index['name']:<32} {index['table']:<20} {format_size(index['size']):>9}  "
+              f"сканирований: {index['scans']:<8} кэш: {_percent(index['hit_rate'])}")
+
+    statements = report["statements"]
+    if statements is None:
+        print("\nℹ️ pg_stat_statements не установлен (CREATE EXTENSION pg_stat_statements "
+              "и shared_preload_libraries) - статистика запросов недоступна")
+    else:
+        print("\n⏱️ Самые затратные запросы (pg_stat_statements):")
+        for statement in statements:
+            query = " ".join(statement["query"].split())
+            print(f"  {statement['total_ms']:>10.1f} мс  вызовов: {statement['calls']:<7} "
+                  f"среднее: {statement['mean_ms']:.2f} мс  {query[:100]}")
+
+    if not report["problems"]:
+        print("\n✅ Проблем не найдено")
+        return
+    print(f"\n⚠️ Найдено проблем: {len(report['problems'])}")
+    for problem in report["problems"]:
+        print(f"  - {problem}")
+    if args.fail_on_seq_scan and any(query["slow_scans"] for query in report["queries"]):
+        sys.exit(1)
+
+
+def print_sync_stats(stats, elapsed):
+    """
+    Выводит итоги синхронизации каталога.
+
+    Args:
+        stats (dict): Итоги DirectorySync.sync()
+        elapsed (float): Время синхронизации в секундах
+    """
+    changes = [
+        (stats['pulled'], "файлов обновлено из БД"),
+        (stats['pushed'], "заметок обновлено из файлов"),
+        (stats['created'], "заметок создано из файлов"),
+        (stats['deleted_files'], "файлов удалено"),
+        (stats['deleted_notes'], "заметок удалено"),
+    ]
+    summary = ", ".join(f"{title}: {count}" for count, title in changes if count)
+    print(f"🔄 {summary or 'изменений нет'} ({elapsed * 1000:.0f} мс)")
+    for name in stats['conflicts']:
+        print(f"   ⚠️ Конфликт: заметка изменена и в БД, и в файле - локальная версия сохранена в {name}")
+    for error in stats['errors']:
+        print(f"   ❌ {error}")
+
+
+def sync_dir_cli(args):
+    """
+    Синхронизирует заметки с каталогом Markdown-файлов (в обе стороны).
+
+    Args:
+        args: Объект аргументов с полями:
+            - path (str): Каталог
+            - watch (bool): Продолжать синхронизацию при изменениях
+            - interval (float): Период проверки изменений в БД в секундах
+
+    Prints:
+        Итоги каждой синхронизации, конфликты и ошибки разбора файлов
+    """
+    from .syncdir import DirectorySync, INotify
+    init_db()
+    sync = DirectorySync(args.path)
+    started = time.perf_counter()
+    print_sync_stats(sync.sync(), time.perf_counter() - started)
+    if not args.watch:
+        return
+
+    mode = "inotify" if INotify is not None else f"сканирование каждые {args.interval:g} с"
+    print(f"👀 Наблюдение за {args.path} ({mode}), Ctrl+C - выход")
+
+    last = [time.perf_counter()]
+
+    def on_sync(stats):
+        if any(stats.values()):
+            print_sync_stats(stats, time.perf_counter() - last[0])
+        last[0] = time.perf_counter()
+
+    try:
+        sync.watch(args.interval, on_sync)
+    except KeyboardInterrupt:
+        print("\n👋 Синхронизация остановлена")
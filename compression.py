@@ -0,0 +1,118 @@
+"""
+compression.py
+Модуль сжатия текстов заметок.
+
+Включается переменной окружения DB_COMPRESS_BODIES=1. Тексты длиннее
+DB_COMPRESS_MIN_BYTES байт (в UTF-8, по умолчанию 8192) сжимаются на
+клиенте и хранятся в колонке body_z (bytea) вместе с полной длиной
+текста (body_length) и хэшем SHA-256 (body_hash), а колонка body остается
+пустой. Поэтому такие тексты и передаются по сети, и хранятся в сжатом виде.
+
+Алгоритм выбирается переменной DB_COMPRESS_CODEC (zstd, lz4 или zlib);
+по умолчанию используется zstd, если установлен пакет zstandard, затем
+lz4 (пакет lz4), иначе zlib из стандартной библиотеки. Алгоритм
+сохраняется в колонке body_codec, поэтому его можно менять в любой момент.
+"""
+
+import hashlib
+import os
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # Необязательная зависимость
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:  # Необязательная зависимость
+    lz4 = None
+
+
+def _zstd_compress(data):
+    return zstandard.ZstdCompressor(level=3).compress(data)
+
+
+def _zstd_decompress(data):
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+# Алгоритм -> (сжатие, распаковка, доступен ли)
+CODECS = {
+    "zstd": (_zstd_compress, _zstd_decompress, zstandard is not None),
+    "lz4": (lambda data: lz4.frame.compress(data), lambda data: lz4.frame.decompress(data), lz4 is not None),
+    "zlib": (lambda data: zlib.compress(data, 6), zlib.decompress, True),
+}
+
+
+def compression_enabled():
+    """Проверяет, включено ли сжатие текстов (DB_COMPRESS_BODIES)."""
+    return os.getenv('DB_COMPRESS_BODIES', '').lower() in ('1', 'true', 'yes')
+
+
+def default_codec():
+    """
+    Возвращает алгоритм сжатия для новых текстов.
+
+    Returns:
+        str: Имя алгоритма (ключ CODECS)
+
+    Raises:
+        ValueError: Если в DB_COMPRESS_CODEC указан неизвестный или недоступный алгоритм
+    """
+    codec = os.getenv('DB_COMPRESS_CODEC')
+    if codec:
+        if codec not in CODECS or not CODECS[codec][2]:
+            raise ValueError(f"Алгоритм сжатия {codec} недоступен (установлен ли пакет?)")
+        return codec
+    return next(name for name, (_, _, available) in CODECS.items() if available)
+
+
+def pack_body(body):
+    """
+    Готовит текст заметки к записи в БД.
+
+    Args:
+        body (str): Текст заметки
+
+    Returns:
+        tuple: Значения колонок (body, body_z, body_codec, body_length, body_hash).
+        Короткие тексты и тексты при выключенном сжатии не сжимаются:
+        (body, None, None, None, None).
+    """
+    if not compression_enabled():
+        return body, None, None, None, None
+
+    data = body.encode("utf-8")
+    if len(data) < int(os.getenv('DB_COMPRESS_MIN_BYTES', '8192')):
+        return body, None, None, None, None
+
+    codec = default_codec()
+    payload = CODECS[codec][0](data)
+    if len(payload) >= len(data):
+        # Несжимаемые данные хранить в сжатом виде нет смысла
+        return body, None, None, None, None
+    return "", payload, codec, len(body), hashlib.sha256(data).digest()
+
+
+def unpack_body(payload, codec, digest=None):
+    """
+    Распаковывает текст заметки.
+
+    Args:
+        payload (bytes): Сжатый текст
+        codec (str): Алгоритм сжатия
+        digest (bytes, optional): Ожидаемый хэш SHA-256 текста
+
+    Returns:
+        str: Текст заметки
+
+    Raises:
+        ValueError: Если алгоритм недоступен или текст поврежден
+    """
+    if codec not in CODECS or not CODECS[codec][2]:
+        raise ValueError(f"Для чтения заметки нужен алгоритм сжатия {codec} (установлен ли пакет?)")
+    data = CODECS[codec][1](bytes(payload))
+    if digest is not None and hashlib.sha256(data).digest() != bytes(digest):
+        raise ValueError("Сжатый текст заметки поврежден: хэш не совпадает")
+    return data.decode("utf-8")
@@ -5,14 +5,107 @@ database.py
 
 # Импорты
 import os
+import threading
+import time
 import psycopg2                    # Библиотека для работы с PostgreSQL
 from psycopg2.extras import RealDictCursor  # Курсор, возвращающий данные в виде словаря
 from dotenv import load_dotenv     # Для загрузки переменных из .env файла
 from contextlib import contextmanager  # Для создания контекстных менеджеров
+from .partitions import manage_partitions, partition_marker, partitioning_enabled  # Секционирование notes по месяцам
 
 # Загружаем переменные окружения из .env файла
 load_dotenv()
 
+# Версия схемы БД. Увеличивайте при каждом изменении init_database():
+# если комментарий таблицы notes совпадает, инициализация занимает один запрос
+SCHEMA_VERSION = 3
+SCHEMA_COMMENT = f"notebookk schema {SCHEMA_VERSION}"
+
+# Подключение, закрепленное за потоком (см. Database.session)
+_local = threading.local()
+
+# Состояние маршрутизации чтения на реплики (см. Database.get_read_connection)
+_routing_lock = threading.Lock()
+_routing = {
+    'last_write_lsn': 0,   # LSN после последней записи этого процесса
+    'next_replica': 0,     # Для выбора реплик по кругу
+    'down_until': {},      # (host, port) -> до какого времени реплика считается недоступной
+    'replayed': {},        # (host, port) -> последний известный примененный репликой LSN
+}
+
+
+def replica_addresses():
+    """
+    Возвращает адреса реплик для чтения из переменной окружения DB_READ_REPLICAS.
+
+    Формат: host[:port] через запятую, например "replica1:5433,replica2".
+    Имя БД, пользователь и пароль - те же, что у основного сервера.
+
+    Returns:
+        list[tuple[str, str]]: Пары (хост, порт); пустой список - реплик нет
+    """
+    addresses = []
+    for item in os.getenv('DB_READ_REPLICAS', '').split(','):
+        item = item.strip()
+        if item:
+            host, _, port = item.partition(':')
+            addresses.append((host, port or os.getenv('DB_PORT', '5432')))
+    return addresses
+
+
+def parse_lsn(value):
+    """Переводит LSN PostgreSQL вида '16/B374D848' в число (None - 0)."""
+    if not value:
+        return 0
+    high, _, low = value.partition('/')
+    return (int(high, 16) << 32) + int(low, 16)
+
+
+class _FailoverCursor:
+    """
+    Курсор чтения с реплики (без закрепленной сессии).
+
+    Если реплика перестала отвечать во время запроса, она исключается
+    из маршрутизации, а запрос один раз повторяется на основном сервере -
+    вызывающий код получает результат, а не ошибку.
+
+    Attributes:
+        connection (psycopg2.connection): Текущее подключение (после переключения - к основному серверу)
+        replica (tuple | None): Адрес реплики (None после переключения)
+    """
+
+    def __init__(self, connection, replica):
+        self.connection = connection
+        self.replica = replica
+        self._cursor = connection.cursor(cursor_factory=RealDictCursor)
+
+    def execute(self, query, params=None):
+        """Выполняет запрос, при отказе реплики - на основном сервере."""
+        try:
+            return self._cursor.execute(query, params)
+        except psycopg2.OperationalError:
+            if self.replica is None:
+                raise
+            Database.mark_replica_down(self.replica)
+            self.replica = None
+            self._cursor.close()
+            self.connection.close()
+            self.connection = Database.get_connection()
+            self._cursor = self.connection.cursor(cursor_factory=RealDictCursor)
+            return self._cursor.execute(query, params)
+
+    def close(self):
+        """Закрывает курсор (подключение закрывает get_cursor)."""
+        if not self._cursor.closed:
+            self._cursor.close()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        # fetchone, fetchall, rowcount и прочее - от текущего курсора
+        return getattr(self._cursor, name)
+
 
 class Database:
     """
@@ -21,10 +114,14 @@ class Database:
     """
 
     @staticmethod
-    def get_connection():
+    def get_connection(host=None, port=None):
         """
         Создает и возвращает подключение к БД.
 
+        Args:
+            host (str, optional): Хост (по умолчанию DB_HOST - основной сервер)
+            port (str, optional): Порт (по умолчанию DB_PORT)
+
         Returns:
             psycopg2.connection: Объект подключения к PostgreSQL
         """
@@ -34,8 +131,8 @@ class Database:
                 'dbname': os.getenv('DB_NAME', 'notebookk_db'),      # Имя БД (по умолчанию 'notebookk_db')
                 'user': os.getenv('DB_USER', 'postgres'),           # Пользователь (по умолчанию 'postgres')
                 'password': os.getenv('DB_PASSWORD', ''),           # Пароль (по умолчанию пустая строка)
-                'host': os.getenv('DB_HOST', 'localhost'),          # Хост (по умолчанию 'localhost')
-                'port': os.getenv('DB_PORT', '5432'),               # Порт (по умолчанию 5432)
+                'host': host or os.getenv('DB_HOST', 'localhost'),  # Хост (по умолчанию 'localhost')
+                'port': port or os.getenv('DB_PORT', '5432'),       # Порт (по умолчанию 5432)
                 'connect_timeout': 10,                               # Таймаут подключения 10 секунд
                 'sslmode': 'disable',                                # Отключаем SSL (для локальной разработки)
                 'client_encoding': 'UTF8'                            # Кодировка UTF-8
@@ -63,69 +160,439 @@ class Database:
             print(f"❌ Неожиданная ошибка: {e}")
             raise
 
+    @staticmethod
+    def get_read_connection():
+        """
+        Открывает подключение к реплике для чтения (DB_READ_REPLICAS).
+
+        Реплики выбираются по кругу. Реплика пропускается, если к ней не
+        удалось подключиться (на DB_REPLICA_RETRY_SECONDS секунд, по умолчанию 30)
+        или если она еще не применила последнюю запись этого процесса
+        (read-your-writes: сравниваются LSN записи на основном сервере
+        и pg_last_wal_replay_lsn() на реплике).
+
+        Returns:
+            tuple: Подключение только для чтения и адрес реплики (хост, порт)
+            или (None, None), если подходящей реплики нет и читать нужно
+            с основного сервера
+        """
+        addresses = replica_addresses()
+        retry = float(os.getenv('DB_REPLICA_RETRY_SECONDS', '30'))
+        for _ in range(len(addresses)):
+            with _routing_lock:
+                address = addresses[_routing['next_replica'] % len(addresses)]
+                _routing['next_replica'] += 1
+                if _routing['down_until'].get(address, 0) > time.monotonic():
+                    continue
+                need_lsn = _routing['last_write_lsn']
+                known_lsn = _routing['replayed'].get(address, 0)
+
+            try:
+                conn = Database.get_connection(*address)
+            except psycopg2.OperationalError:
+                Database.mark_replica_down(address, retry)
+                continue
+
+            try:
+                conn.set_session(readonly=True)
+                if known_lsn < need_lsn:
+                    with conn.cursor() as cursor:
+                        cursor.execute("SELECT pg_last_wal_replay_lsn()::text")
+                        known_lsn = parse_lsn(cursor.fetchone()[0])
+                    with _routing_lock:
+                        _routing['replayed'][address] = known_lsn
+                if known_lsn >= need_lsn:
+                    return conn, address
+                print(f"⏳ Реплика {address[0]}:{address[1]} еще не получила последние изменения")
+            except psycopg2.OperationalError:
+                Database.mark_replica_down(address, retry)
+            conn.close()
+        return None, None
+
+    @staticmethod
+    def mark_replica_down(address, seconds=None):
+        """
+        Временно исключает реплику из маршрутизации (переключение на основной сервер).
+
+        Args:
+            address (tuple[str, str]): Хост и порт реплики
+            seconds (float, optional): На сколько секунд (по умолчанию DB_REPLICA_RETRY_SECONDS)
+        """
+        if seconds is None:
+            seconds = float(os.getenv('DB_REPLICA_RETRY_SECONDS', '30'))
+        print(f"⚠️ Реплика {address[0]}:{address[1]} недоступна - чтение с основного сервера")
+        with _routing_lock:
+            _routing['down_until'][address] = time.monotonic() + seconds
+
+    @staticmethod
+    def remember_write(conn):
+        """
+        Запоминает LSN основного сервера после фиксации записи.
+
+        Следующие чтения этого процесса не пойдут на реплики, которые
+        еще не применили эту запись. Без реплик (и в сессии на реплике)
+        ничего не делает.
+
+        Args:
+            conn (psycopg2.connection): Подключение к основному серверу
+        """
+        if not replica_addresses() or getattr(_local, 'replica', None):
+            return
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT pg_current_wal_lsn()::text")
+            lsn = parse_lsn(cursor.fetchone()[0])
+        conn.commit()  # Не оставляем открытой транзакцию с этим запросом
+        with _routing_lock:
+            _routing['last_write_lsn'] = max(_routing['last_write_lsn'], lsn)
+
     @staticmethod
     @contextmanager
-    def get_cursor():
+    def get_cursor(readonly=False):
         """
         Контекстный менеджер для работы с курсором.
         Автоматическое управление жизненным циклом подключения к БД.
         Гарантировать, что соединение всегда будет правильно закрыто, даже при ошибках.
         Автоматически закрывает соединение и курсор.
 
+        Args:
+            readonly (bool): Запрос только читает данные - его можно выполнить
+                на реплике (см. get_read_connection), если они настроены;
+                если реплика перестанет отвечать, запрос один раз повторяется
+                на основном сервере
+
         Yields:
             psycopg2.cursor: Курсор для выполнения SQL-запросов
 
+        Внутри Database.session() используется закрепленное подключение,
+        а внутри Database.transaction() изменения фиксируются не здесь,
+        а в конце транзакции.
+
         Пример использования:
             with Database.get_cursor() as cursor:
                 cursor.execute("SELECT * FROM notes")
                 results = cursor.fetchall()
         """
+        pinned = getattr(_local, 'conn', None)
+        in_transaction = getattr(_local, 'in_transaction', False)
+        replica = getattr(_local, 'replica', None) if pinned else None
         conn = None
         cursor = None
         try:
-            # Получаем подключение к БД
-            conn = Database.get_connection()
-            # Создаем спец. курсор, который возвращает данные в виде словаря
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            # Получаем подключение к БД (закрепленное, к реплике или к основному серверу)
+            if not pinned and readonly:
+                conn, replica = Database.get_read_connection()
+            if conn is not None:
+                # Если реплика перестанет отвечать во время запроса, он будет
+                # повторен на основном сервере
+                cursor = _FailoverCursor(conn, replica)
+            else:
+                conn = pinned or Database.get_connection()
+                # Создаем спец. курсор, который возвращает данные в виде словаря
+                cursor = conn.cursor(cursor_factory=RealDictCursor)
             # Возвращаем курсор в блок with, отдаем его наружу
             yield cursor
-            # Если все успешно, фиксируем изменения
-            conn.commit()
+            # Если все успешно, фиксируем изменения (если не внутри transaction())
+            if not in_transaction:
+                cursor.connection.commit()
+                if not readonly:
+                    Database.remember_write(conn)
 
         except Exception as e:
-            # Если произошла ошибка, откатываем изменения
-            if conn:
-                conn.rollback()
+            # Если произошла ошибка, откатываем изменения (транзакцию откатит transaction())
+            if cursor is not None and not cursor.connection.closed and not in_transaction:
+                cursor.connection.rollback()
+            if isinstance(cursor, _FailoverCursor):
+                replica = cursor.replica
+            if replica and isinstance(e, psycopg2.OperationalError):
+                # Реплика перестала отвечать - следующие чтения пойдут на другие серверы
+                Database.mark_replica_down(replica)
             print(f"❌ Ошибка БД: {e}")
             raise  # Пробрасываем исключение
 
         finally:
-            # В любом случае закрываем курсор и соединение
-            if cursor:
+            # В любом случае закрываем курсор и соединение (закрепленное закроет session())
+            if cursor is not None:
+                connection = cursor.connection
                 cursor.close()
-            if conn:
+                if connection is not pinned:
+                    connection.close()
+            elif conn and conn is not pinned:
                 conn.close()
 
+    @staticmethod
+    @contextmanager
+    def session(readonly=False):
+        """
+        Закрепляет одно подключение за текущим потоком.
+
+        Все вызовы get_cursor() внутри блока (в том числе из функций storage)
+        используют это подключение, а не открывают новое. Вложенные сессии
+        используют подключение внешней.
+
+        Args:
+            readonly (bool): В блоке только чтение - подключение можно
+                открыть к реплике (см. get_read_connection)
+
+        Yields:
+            psycopg2.connection: Закрепленное подключение
+
+        Пример использования:
+            with Database.session():
+                for note in notes:
+                    save_note(note)   # Одно подключение на все вызовы
+        """
+        conn = getattr(_local, 'conn', None)
+        if conn is not None:
+            yield conn
+            return
+
+        conn, replica = Database.get_read_connection() if readonly else (None, None)
+        conn = conn or Database.get_connection()
+        _local.conn = conn
+        _local.replica = replica
+        try:
+            yield conn
+        finally:
+            _local.conn = None
+            _local.replica = None
+            _local.in_transaction = False
+            conn.close()
+
+    @staticmethod
+    @contextmanager
+    def transaction():
+        """
+        Объединяет все запросы внутри блока в одну транзакцию.
+
+        Изменения фиксируются в конце блока одним COMMIT, а при ошибке
+        откатываются целиком. Открывает сессию, если ее еще нет.
+
+        Пример использования:
+            with Database.transaction():
+                save_note(first)
+                delete_note_by_id(second_id)
+        """
+        with Database.session() as conn:
+            if getattr(_local, 'in_transaction', False):
+                # Вложенная транзакция - часть внешней
+                yield conn
+                return
+
+            _local.in_transaction = True
+            try:
+                yield conn
+                conn.commit()
+                Database.remember_write(conn)
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                _local.in_transaction = False
+
+    @staticmethod
+    def migrate_enum_columns(cursor):
+        """
+        Переводит колонки status и priority из VARCHAR в перечислимые типы.
+
+        Недопустимые значения заменяются значениями по умолчанию. Колонка
+        priority_rank и индексы, зависящие от этих колонок, удаляются и
+        затем создаются заново в init_database().
+
+        Args:
+            cursor: Курсор открытой транзакции
+        """
+        cursor.execute("""
+            SELECT data_type
+            FROM information_schema.columns
+            WHERE table_name = 'notes' AND column_name = 'status'
+        """)
+        row = cursor.fetchone()
+        if not row or row['data_type'] != 'character varying':
+            return
+
+        print("🔧 Миграция: status/priority -> перечислимые типы")
+        cursor.execute("""
+            UPDATE notes SET status = 'todo'
+            WHERE status NOT IN ('todo', 'in_progress', 'done')
+        """)
+        cursor.execute("""
+            UPDATE notes SET priority = 'medium'
+            WHERE priority NOT IN ('low', 'medium', 'high')
+        """)
+
+        # Зависимые объекты не дают изменить тип колонки
+        cursor.execute("DROP INDEX IF EXISTS idx_notes_next")
+        cursor.execute("DROP INDEX IF EXISTS idx_notes_open")
+        cursor.execute("ALTER TABLE notes DROP COLUMN IF EXISTS priority_rank")
+
+        cursor.execute("""
+            ALTER TABLE notes
+                ALTER COLUMN status DROP DEFAULT,
+                ALTER COLUMN status TYPE note_status USING status::note_status,
+                ALTER COLUMN status SET DEFAULT 'todo',
+                ALTER COLUMN priority DROP DEFAULT,
+                ALTER COLUMN priority TYPE note_priority USING priority::note_priority,
+                ALTER COLUMN priority SET DEFAULT 'medium'
+        """)
+
     @staticmethod
     def init_database():
         """
         Инициализирует базу данных: создает таблицу, если она не существует.
         Вызывается при первом запуске приложения.
+
+        Если схема уже актуальна (см. SCHEMA_VERSION), а секции обслужены
+        в этом месяце (см. partitions.partition_marker), выполняется только
+        один проверочный запрос.
         """
         try:
             with Database.get_cursor() as cursor:
+                cursor.execute("""
+                    SELECT obj_description(to_regclass('notes'), 'pg_class') AS schema,
+                           obj_description(to_regclass('notes_default'), 'pg_class') AS partitions
+                """)
+                state = cursor.fetchone()
+                if state['schema'] == SCHEMA_COMMENT:
+                    if not partitioning_enabled() or state['partitions'] == partition_marker():
+                        return
+                    if state['partitions'] is not None:
+                        # Схема актуальна, таблица уже секционирована - нужно
+                        # только обслужить секции (новый месяц или другие настройки)
+                        manage_partitions(cursor)
+                        return
+
+                # Перечислимые типы для статуса и приоритета: 4 байта вместо строки
+                # в каждой строке и допустимы только значения из models.STATUSES/PRIORITIES
+                cursor.execute("""
+                    DO $$ BEGIN
+                        CREATE TYPE note_status AS ENUM ('todo', 'in_progress', 'done');
+                    EXCEPTION WHEN duplicate_object THEN NULL;
+                    END $$
+                """)
+                cursor.execute("""
+                    DO $$ BEGIN
+                        CREATE TYPE note_priority AS ENUM ('low', 'medium', 'high');
+                    EXCEPTION WHEN duplicate_object THEN NULL;
+                    END $$
+                """)
+
                 # Создаем таблицу notes, если она не существует
                 cursor.execute("""
                     CREATE TABLE IF NOT EXISTS notes (
                         id SERIAL PRIMARY KEY,           -- Автоинкрементный первичный ключ
                         title VARCHAR(255) NOT NULL,     -- Заголовок (макс 255 символов)
                         body TEXT NOT NULL,              -- Текст заметки
-                        status VARCHAR(20) NOT NULL DEFAULT 'todo',  -- Статус со значением по умолчанию
-                        priority VARCHAR(20) NOT NULL DEFAULT 'medium',  -- Приоритет со значением по умолчанию
+                        status note_status NOT NULL DEFAULT 'todo',  -- Статус со значением по умолчанию
+                        priority note_priority NOT NULL DEFAULT 'medium',  -- Приоритет со значением по умолчанию
                         created TIMESTAMP DEFAULT CURRENT_TIMESTAMP,  -- Дата создания: хранит дату и время, подставляет автоматически значение, и берет текущее время
-                        updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP   -- Дата обновления (текущее время)
+                        updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,  -- Дата обновления (текущее время)
+                        deleted BOOLEAN NOT NULL DEFAULT FALSE        -- Признак удаления ("надгробие" для синхронизации)
+                    )
+                """)
+
+                # Миграция таблиц, созданных до появления мягкого удаления
+                cursor.execute("""
+                    ALTER TABLE notes ADD COLUMN IF NOT EXISTS deleted BOOLEAN NOT NULL DEFAULT FALSE
+                """)
+
+                # Миграция таблиц, где статус и приоритет хранились строками
+                Database.migrate_enum_columns(cursor)
+
+                # Числовой ранг приоритета (low=1, medium=2, high=3, см. models.PRIORITY_RANK).
+                # Вычисляемая колонка всегда согласована с priority
+                cursor.execute("""
+                    ALTER TABLE notes ADD COLUMN IF NOT EXISTS priority_rank SMALLINT
+                    GENERATED ALWAYS AS (
+                        CASE priority
+                            WHEN 'high' THEN 3
+                            WHEN 'medium' THEN 2
+                            WHEN 'low' THEN 1
+                            ELSE 0
+                        END
+                    ) STORED
+                """)
+
+                # Сжатые тексты (DB_COMPRESS_BODIES, см. compression.py): сжатые данные,
+                # алгоритм, длина текста в символах и хэш SHA-256 для проверки; теги заметок
+                for table in ("notes", "notes_archive"):
+                    cursor.execute(f"""
+                        ALTER TABLE IF EXISTS {table}      -- Новый архив создается ниже сразу с ними
+                            ADD COLUMN IF NOT EXISTS body_z BYTEA,
+                            ADD COLUMN IF NOT EXISTS body_codec VARCHAR(16),
+                            ADD COLUMN IF NOT EXISTS body_length INTEGER,
+                            ADD COLUMN IF NOT EXISTS body_hash BYTEA,
+                            ADD COLUMN IF NOT EXISTS tags TEXT[] NOT NULL DEFAULT '{{}}'   -- Теги (models.normalize_tags)
+                    """)
+
+                # Архив завершенных заметок (команда archive) и заметок отсоединенных секций.
+                # Читается только по явному запросу (--include-archive), поэтому не замедляет
+                # работу с notes. Создается до секционирования (см. detach_old_partitions)
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS notes_archive (
+                        id INTEGER PRIMARY KEY,
+                        title VARCHAR(255) NOT NULL,
+                        body TEXT NOT NULL,
+                        status note_status NOT NULL,
+                        priority note_priority NOT NULL,
+                        created TIMESTAMP,
+                        updated TIMESTAMP,
+                        archived TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,  -- Время переноса в архив
+                        body_z BYTEA,
+                        body_codec VARCHAR(16),
+                        body_length INTEGER,
+                        body_hash BYTEA,
+                        tags TEXT[] NOT NULL DEFAULT '{}'
                     )
                 """)
+                # По времени архивации клиенты узнают о перенесенных заметках (changes_since)
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_notes_archive_archived ON notes_archive (archived)
+                """)
+                # Тексты в архиве сжимаются lz4 (PostgreSQL 14+, иначе остается pglz по умолчанию)
+                cursor.execute("""
+                    DO $$ BEGIN
+                        ALTER TABLE notes_archive ALTER COLUMN body SET COMPRESSION lz4;
+                    EXCEPTION WHEN OTHERS THEN NULL;
+                    END $$
+                """)
+
+                # Секционирование по месяцам (если включено) - до создания индексов,
+                # индексы создаются на секционированной таблице и всех секциях
+                manage_partitions(cursor)
+
+                # Индекс по времени изменения для выборки изменений (changes_since)
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_notes_updated ON notes (updated)
+                """)
+
+                # Индекс по дате создания: сортировка списков и фильтры --since/--until
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_notes_created ON notes (created)
+                """)
+
+                # Частичный индекс по открытым заметкам для очереди задач (команда next).
+                # INCLUDE позволяет отвечать на запрос только по индексу (index-only scan)
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_notes_next
+                    ON notes (priority_rank DESC, created)
+                    INCLUDE (id, title, status, priority)
+                    WHERE status <> 'done' AND NOT deleted
+                """)
+
+                # Частичный индекс для списка незавершенных заметок: запросы
+                # со status <> 'done' (или конкретным открытым статусом) не читают
+                # завершенные заметки, которых со временем большинство
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_notes_open
+                    ON notes (created DESC)
+                    WHERE status <> 'done' AND NOT deleted
+                """)
+
+                # GIN-индекс по тегам: фильтр tags @> ARRAY[...] (любая комбинация тегов)
+                # выполняется поиском по индексу
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_notes_tags ON notes USING gin (tags)
+                """)
 
                 # Создаем полнотекстовый индекс для быстрого поиска
                 # GIN индекс ускоряет поиск по тексту
@@ -134,6 +601,8 @@ class Database:
                     CREATE INDEX IF NOT EXISTS idx_notes_search 
                     ON notes USING gin(to_tsvector('russian', title || ' ' || body))
                 """)
+
+                cursor.execute(f"COMMENT ON TABLE notes IS '{SCHEMA_COMMENT}'")
                 print("✅ База данных инициализирована")
 
         except Exception as e:
@@ -141,9 +610,18 @@ class Database:
             raise
 
 
+# Схема проверяется один раз за процесс: повторные вызовы init_db()
+# (например, каждая команда в shell) не обращаются к БД
+_initialized = False
+
+
 def init_db():
     """
     Публичная функция для инициализации БД.
     Используется в других модулях приложения.
     """
-    Database.init_database()
\ No newline at end of file
+    global _initialized
+    if _initialized:
+        return
+    Database.init_database()
+    _initialized = True
\ No newline at end of file
@@ -0,0 +1,359 @@
+"""
+dedupe.py
+Модуль поиска почти одинаковых заметок (MinHash + LSH).
+
+Текст заметки (заголовок и тело) разбивается на шинглы - последовательности
+из SHINGLE_SIZE слов, - и для каждой заметки вычисляется подпись MinHash
+из NUM_PERM чисел. Доля совпадающих чисел в подписях двух заметок
+оценивает сходство Жаккара их множеств шинглов.
+
+Чтобы не сравнивать все пары заметок, подписи делятся на BANDS полос
+(LSH): кандидатами считаются только заметки, у которых совпала хотя бы
+одна полоса целиком. Кандидаты с оценкой сходства не ниже порога
+объединяются в группы.
+
+Подписи сохраняются в локальном кэше и пересчитываются только для
+заметок, у которых изменилось время updated. Если установлен NumPy,
+подписи вычисляются векторно, иначе - на чистом Python (заметно медленнее).
+"""
+
+import os
+import random
+import struct
+import zlib
+
+try:
+    import numpy
+except ImportError:  # Необязательная зависимость
+    numpy = None
+
+from .database import Database
+from .options import DEFAULT_THRESHOLD
+from .paths import EPOCH, data_file, to_micros
+from .search_index import TOKEN_RE, normalize
+from .storage import get_notes_by_ids, note_versions, update_notes, delete_notes
+
+# Длина шингла в словах
+SHINGLE_SIZE = 3
+
+# Размер подписи MinHash и число полос LSH (по NUM_PERM // BANDS чисел в полосе).
+# При 16 полосах по 4 числа заметки со сходством 0.8 становятся кандидатами
+# с вероятностью ~0.9999, а со сходством 0.3 - ~0.12
+NUM_PERM = 64
+BANDS = 16
+
+# Корзины LSH до этого размера проверяются попарно, большие - относительно первой заметки
+SMALL_BUCKET = 32
+
+# Сколько заметок загружается из БД одним запросом при пересчете подписей
+LOAD_BATCH = 1000
+
+# Сколько шинглов обрабатывается за раз при векторном вычислении (ограничивает память)
+_HASH_CHUNK = 4096
+
+# Хэш-функции вида (a * x + b) mod p: произведение a * x < 2**62 помещается в uint64
+_PRIME = (1 << 31) - 1
+_rng = random.Random(20260101)  # Постоянное зерно: подписи в кэше должны оставаться сравнимыми
+_A = [_rng.randrange(1, _PRIME) for _ in range(NUM_PERM)]
+_B = [_rng.randrange(0, _PRIME) for _ in range(NUM_PERM)]
+if numpy is not None:
+    _A_NP = numpy.array(_A, dtype=numpy.uint64)[:, None]
+    _B_NP = numpy.array(_B, dtype=numpy.uint64)[:, None]
+
+_SIGNATURE = struct.Struct(f"<{NUM_PERM}I")
+
+# Подпись текста без слов: такие заметки в группы не объединяются
+EMPTY_SIGNATURE = _SIGNATURE.pack(*[_PRIME] * NUM_PERM)
+
+# Формат кэша (little-endian): заголовок magic "NBKM", версия (uint16),
+# размер подписи (uint16), число записей (uint32); записи: id (int64),
+# updated в микросекундах (int64, -1 - нет), подпись (NUM_PERM x uint32)
+CACHE_MAGIC = b"NBKM"
+CACHE_VERSION = 1
+_HEADER = struct.Struct("<4sHHI")
+_RECORD = struct.Struct("<qq")
+
+
+def minhash_cache_path():
+    """
+    Возвращает путь к кэшу подписей MinHash (переменная NOTEBOOKK_MINHASH_CACHE,
+    по умолчанию - файл minhash-*.bin этой БД, см. paths.data_file).
+
+    Returns:
+        str: Путь к кэшу
+    """
+    return data_file('NOTEBOOKK_MINHASH_CACHE', 'minhash.bin')
+
+
+def shingles(text):
+    """
+    Разбивает текст на шинглы и хэширует их.
+
+    Args:
+        text (str): Текст заметки
+
+    Returns:
+        set[int]: 31-битные хэши шинглов (для текста короче SHINGLE_SIZE слов -
+        один шингл из всех слов, для текста без слов - пустое множество)
+    """
+    tokens = TOKEN_RE.findall(normalize(text))
+    if len(tokens) <= SHINGLE_SIZE:
+        return {zlib.crc32(" ".join(tokens).encode("utf-8")) & _PRIME} if tokens else set()
+    return {
+        zlib.crc32(" ".join(tokens[i:i + SHINGLE_SIZE]).encode("utf-8")) & _PRIME
+        for i in range(len(tokens) - SHINGLE_SIZE + 1)
+    }
+
+
+def signature(text):
+    """
+    Вычисляет подпись MinHash текста.
+
+    Args:
+        text (str): Текст заметки
+
+    Returns:
+        bytes: Подпись (NUM_PERM чисел uint32); EMPTY_SIGNATURE для текста без слов
+    """
+    hashes = shingles(text)
+    if not hashes:
+        return EMPTY_SIGNATURE
+
+    if numpy is None:
+        return _SIGNATURE.pack(*(min((a * x + b) % _PRIME for x in hashes) for a, b in zip(_A, _B)))
+
+    values = numpy.fromiter(hashes, dtype=numpy.uint64, count=len(hashes))
+    result = numpy.full(NUM_PERM, _PRIME, dtype=numpy.uint64)
+    for start in range(0, len(values), _HASH_CHUNK):
+        chunk = values[None, start:start + _HASH_CHUNK]
+        numpy.minimum(result, ((_A_NP * chunk + _B_NP) % _PRIME).min(axis=1), out=result)
+    return result.astype("<u4").tobytes()
+
+
+def note_signature(note):
+    """Вычисляет подпись заметки по заголовку и тексту."""
+    return signature(f"{note.title}\n{note.body}")
+
+
+def similarity(sig_a, sig_b):
+    """
+    Оценивает сходство Жаккара двух заметок по подписям.
+
+    Args:
+        sig_a (bytes): Подпись первой заметки
+        sig_b (bytes): Подпись второй заметки
+
+    Returns:
+        float: Доля совпадающих чисел подписи (от 0 до 1)
+    """
+    same = sum(x == y for x, y in zip(memoryview(sig_a).cast("I"), memoryview(sig_b).cast("I")))
+    return same / NUM_PERM
+
+
+def read_cache(path=None):
+    """
+    Читает кэш подписей.
+
+    Args:
+        path (str, optional): Путь к файлу (по умолчанию minhash_cache_path())
+
+    Returns:
+        dict[int, tuple[int, bytes]]: ID заметки -> (updated в микросекундах, подпись).
+        Если кэша нет, он поврежден или построен с другими параметрами - пустой словарь.
+    """
+    path = path or minhash_cache_path()
+    if not os.path.exists(path) or os.path.getsize(path) < _HEADER.size:
+        return {}
+
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, num_perm, count = _HEADER.unpack_from(data, 0)
+        if magic != CACHE_MAGIC or version != CACHE_VERSION or num_perm != NUM_PERM:
+            return {}
+
+        entries = {}
+        size = _RECORD.size + _SIGNATURE.size
+        offset = _HEADER.size
+        for _ in range(count):
+            note_id, updated_us = _RECORD.unpack_from(data, offset)
+            start = offset + _RECORD.size
+            entries[note_id] = (updated_us, data[start:start + _SIGNATURE.size])
+            offset += size
+        return entries
+
+    except Exception as e:
+        print(f"⚠️ Кэш подписей поврежден и будет пересоздан: {e}")
+        return {}
+
+
+def write_cache(entries, path=None):
+    """
+    Записывает кэш подписей (атомарно, через временный файл).
+
+    Args:
+        entries (dict[int, tuple[int, bytes]]): ID заметки -> (updated в микросекундах, подпись)
+        path (str, optional): Путь к файлу (по умолчанию minhash_cache_path())
+    """
+    path = path or minhash_cache_path()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, NUM_PERM, len(entries)))
+            for note_id, (updated_us, sig) in entries.items():
+                f.write(_RECORD.pack(note_id, updated_us))
+                f.write(sig)
+        os.replace(tmp_path, path)
+
+    except Exception as e:
+        print(f"⚠️ Не удалось сохранить кэш подписей: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def update_signatures(path=None, on_progress=None):
+    """
+    Возвращает подписи всех заметок, пересчитывая только изменившиеся.
+
+    Из БД сначала читаются только ID и время изменения заметок; тексты
+    загружаются порциями по LOAD_BATCH лишь для новых и измененных заметок.
+
+    Args:
+        path (str, optional): Путь к кэшу (по умолчанию minhash_cache_path())
+        on_progress (callable, optional): Вызывается после каждой порции как
+            on_progress(пересчитано, всего к пересчету)
+
+    Returns:
+        tuple[dict[int, bytes], int]: Подписи по ID заметок и число пересчитанных
+    """
+    cached = read_cache(path)
+    versions = {note_id: to_micros(updated) for note_id, updated in note_versions().items()}
+    stale = [note_id for note_id, updated_us in versions.items()
+             if note_id not in cached or cached[note_id][0] != updated_us]
+
+    # Удаленные заметки выпадают из кэша вместе с versions
+    entries = {note_id: cached[note_id] for note_id in versions if note_id in cached}
+    done = 0
+    for start in range(0, len(stale), LOAD_BATCH):
+        for note in get_notes_by_ids(stale[start:start + LOAD_BATCH]):
+            entries[note.id] = (to_micros(note.updated), note_signature(note))
+        done = min(start + LOAD_BATCH, len(stale))
+        if on_progress:
+            on_progress(done, len(stale))
+
+    if stale or len(entries) != len(cached):
+        write_cache(entries, path)
+    return {note_id: sig for note_id, (_, sig) in entries.items()}, len(stale)
+
+
+def find_clusters(signatures, threshold=DEFAULT_THRESHOLD):
+    """
+    Находит группы почти одинаковых заметок.
+
+    Args:
+        signatures (dict[int, bytes]): Подписи по ID заметок
+        threshold (float): Минимальная оценка сходства для объединения
+
+    Returns:
+        list[list[int]]: Группы ID (от двух заметок), большие группы сначала
+    """
+    parent = {}
+
+    def find(note_id):
+        root = note_id
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while note_id != root:  # Сжатие путей
+            parent[note_id], note_id = root, parent[note_id]
+        return root
+
+    def join(a, b):
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b and similarity(signatures[a], signatures[b]) >= threshold:
+            root = min(root_a, root_b)
+            parent[max(root_a, root_b)] = root
+            parent.setdefault(root, root)
+
+    items = [(note_id, sig) for note_id, sig in signatures.items() if sig != EMPTY_SIGNATURE]
+    width = _SIGNATURE.size // BANDS
+    for band in range(BANDS):
+        # Полосы обрабатываются по одной, чтобы не держать в памяти все корзины сразу
+        buckets = {}
+        start = band * width
+        for note_id, sig in items:
+            buckets.setdefault(sig[start:start + width], []).append(note_id)
+
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            if len(members) <= SMALL_BUCKET:
+                for i, a in enumerate(members):
+                    for b in members[i + 1:]:
+                        join(a, b)
+            else:
+                # Большая корзина: попарная проверка стала бы квадратичной
+                for b in members[1:]:
+                    join(members[0], b)
+
+    clusters = {}
+    for note_id in parent:
+        clusters.setdefault(find(note_id), []).append(note_id)
+    groups = [sorted(ids) for ids in clusters.values() if len(ids) > 1]
+    groups.sort(key=lambda ids: (-len(ids), ids[0]))
+    return groups
+
+
+def plan_merge(notes, threshold=DEFAULT_THRESHOLD):
+    """
+    Определяет, какие заметки группы будут объединены.
+
+    Остается последняя измененная заметка. Группа найдена по цепочкам
+    похожих пар, поэтому ее участники могут быть мало похожи на
+    оставленную заметку - такие заметки не удаляются.
+
+    Args:
+        notes (list[Note]): Заметки группы
+        threshold (float): Минимальное сходство с оставленной заметкой
+
+    Returns:
+        tuple[Note, list[Note]] | None: Оставленная заметка и удаляемые дубликаты
+        (None, если в группе меньше двух заметок)
+    """
+    if len(notes) < 2:
+        return None
+    keep = max(notes, key=lambda note: (note.updated or EPOCH, note.id))
+    keep_sig = note_signature(keep)
+    duplicates = [note for note in notes
+                  if note.id != keep.id and similarity(keep_sig, note_signature(note)) >= threshold]
+    return keep, duplicates
+
+
+def merge_cluster(ids, threshold=DEFAULT_THRESHOLD):
+    """
+    Объединяет группу дубликатов в одну заметку.
+
+    Остается последняя измененная заметка (см. plan_merge()); она получает
+    теги объединенных заметок, они удаляются. Заметки, сходство которых
+    с оставленной ниже threshold, не изменяются. Выполняется одной транзакцией.
+
+    Args:
+        ids (list[int]): ID заметок группы
+        threshold (float): Минимальное сходство с оставленной заметкой
+
+    Returns:
+        tuple[Note, list[int]] | None: Оставленная заметка и ID удаленных
+        (None, если объединять нечего)
+    """
+    with Database.transaction():
+        plan = plan_merge(get_notes_by_ids(ids), threshold)
+        if not plan or not plan[1]:
+            return None
+        keep, duplicates = plan
+        tags = sorted({tag for note in [keep] + duplicates for tag in note.tags})
+        if tags != keep.tags:
+            update_notes([keep.id], {"tags": tags})
+            keep.tags = tags
+        removed = delete_notes([note.id for note in duplicates])
+        return keep, removed
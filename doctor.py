@@ -0,0 +1,315 @@
+"""
+doctor.py
+Модуль диагностики производительности БД (команда doctor).
+
+Проверяет:
+- планы канонических запросов storage.py: каждый выполняется через
+  EXPLAIN (ANALYZE, BUFFERS) и проверяется, какие индексы он использует
+  и не читает ли он целиком (Seq Scan) таблицу больше заданного размера;
+- использование индексов (число сканирований, доля чтений из кэша);
+- таблицы: размеры, живые и "мертвые" строки (после массовых UPDATE
+  в save_notes() и удалений), надгробия (deleted), время последнего VACUUM;
+- самые затратные запросы из pg_stat_statements, если расширение установлено.
+
+Тексты запросов берутся из констант storage.py, которые используют и
+сами функции storage.py. Запросы, которые по смыслу читают всю таблицу
+(полный список, note_versions, tag_counts), сюда не входят; поиск по
+подстроке и выборка для архивации читают таблицу ожидаемо - такое
+чтение показывается, но не считается проблемой.
+"""
+
+import datetime
+import json
+import os
+
+import psycopg2
+
+from .database import Database
+from .options import parse_size, format_size
+from .storage import (NOTE_COLUMNS, SYNC_OVERLAP, filter_conditions, LIST_NOTES_SQL, SEARCH_CONDITION,
+                      CHANGES_SINCE_SQL, NOTE_BY_ID_SQL, NEXT_NOTES_SQL, CLAIM_CANDIDATES_SQL,
+                      RECENT_IDS_SQL, ARCHIVE_CANDIDATES_SQL, TOMBSTONE_CANDIDATES_SQL, ID_RANGE_SQL)
+
+# Размер таблицы, начиная с которого полное чтение (Seq Scan) в запросе считается проблемой
+DEFAULT_SEQ_SCAN_LIMIT = "8MB"
+
+# "Мертвых" строк больше этой доли от живых - таблице нужен VACUUM
+DEAD_TUPLES_RATIO = 0.2
+
+# Доля чтений индекса из кэша, ниже которой индекс не помещается в shared_buffers
+INDEX_HIT_RATE = 0.9
+
+# Узлы плана, читающие таблицу целиком
+_SEQ_SCAN_NODES = ("Seq Scan", "Parallel Seq Scan")
+
+
+def seq_scan_limit():
+    """Порог размера таблицы для Seq Scan из DB_SEQ_SCAN_LIMIT (по умолчанию 8MB)."""
+    return parse_size(os.getenv('DB_SEQ_SCAN_LIMIT', DEFAULT_SEQ_SCAN_LIMIT))
+
+
+def _where(**filters):
+    """Условия filter_conditions(), объединенные через AND (как в query_notes)."""
+    conditions, params = filter_conditions(**filters)
+    return " AND ".join(conditions) or "TRUE", params
+
+
+def canonical_queries(sample):
+    """
+    Возвращает канонические запросы storage.py с типичными параметрами.
+
+    Запросы, которые изменяют данные, представлены своей выборкой строк
+    (без FOR UPDATE), поэтому проверка ничего не меняет и не блокирует.
+
+    Args:
+        sample (dict): Типичные значения: id (существующий ID) и tag (существующий тег)
+
+    Returns:
+        list[tuple[str, str, list, bool]]: (функция storage.py, SQL, параметры,
+        ожидается ли полное чтение таблицы)
+    """
+    week_ago = datetime.date.today() - datetime.timedelta(days=7)
+    queries = []
+    for label, filters in (("load_notes(status='todo')", {"status": "todo"}),
+                           ("load_notes(since=...)", {"since": week_ago}),
+                           ("load_notes(tags=[...])", {"tags": [sample["tag"]]})):
+        where, params = _where(**filters)
+        queries.append((label, LIST_NOTES_SQL.format(columns=NOTE_COLUMNS, where=where), params, False))
+    keyword = "%notebookk%"
+    id_range = " AND ".join(["NOT deleted", "id BETWEEN %s AND %s"])
+    queries += [
+        # ILIKE '%...%' не может использовать индекс - поиск всегда читает таблицу
+        ("search_notes", LIST_NOTES_SQL.format(columns=NOTE_COLUMNS, where=f"({SEARCH_CONDITION})"),
+         [keyword, keyword], True),
+        ("changes_since", CHANGES_SINCE_SQL.format(columns=NOTE_COLUMNS),
+         [datetime.datetime.now() - SYNC_OVERLAP], False),
+        ("get_note_by_id", NOTE_BY_ID_SQL, [sample["id"]], False),
+        ("next_notes", NEXT_NOTES_SQL, [10], False),
+        ("claim_next_notes", CLAIM_CANDIDATES_SQL, [1], False),
+        ("recent_note_ids", RECENT_IDS_SQL, [5], False),
+        # Фоновая архивация: индекса по завершенным заметкам нет, порция
+        # ищется чтением таблицы
+        ("archive_done_notes", ARCHIVE_CANDIDATES_SQL, [datetime.timedelta(days=90), 1000], True),
+        # Фоновая очистка надгробий: так же ищется чтением таблицы
+        ("purge_tombstones", TOMBSTONE_CANDIDATES_SQL, [datetime.timedelta(days=180), 1000], True),
+        ("load_id_range", ID_RANGE_SQL.format(where=id_range), [max(sample["id"] - 10000, 0), sample["id"]],
+         False),
+    ]
+    return queries
+
+
+def _sample_values(cursor):
+    """Выбирает существующие ID и тег, чтобы планы соответствовали реальным запросам."""
+    cursor.execute("""
+        SELECT (SELECT max(id) FROM notes) AS id,
+               (SELECT tag FROM notes, unnest(tags) AS tag LIMIT 1) AS tag
+    """)
+    data = cursor.fetchone()
+    return {"id": data["id"] or 1, "tag": data["tag"] or "work"}
+
+
+def _walk_plan(node):
+    """Обходит узлы плана EXPLAIN (FORMAT JSON) в глубину."""
+    yield node
+    for child in node.get("Plans", ()):
+        yield from _walk_plan(child)
+
+
+def explain_query(cursor, sql, params):
+    """
+    Выполняет запрос через EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) и разбирает план.
+
+    Args:
+        cursor: Курсор БД
+        sql (str): Запрос
+        params (list): Параметры запроса
+
+    Returns:
+        dict: time_ms и planning_ms (время выполнения и планирования), rows,
+        hit и read (блоки из кэша и с диска), indexes (использованные индексы),
+        seq_scans (таблицы, прочитанные целиком)
+    """
+    cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}", params)
+    result = next(iter(cursor.fetchone().values()))
+    if isinstance(result, str):
+        result = json.loads(result)
+    root = result[0]
+    plan = root["Plan"]
+    nodes = list(_walk_plan(plan))
+    return {
+        "time_ms": root.get("Execution Time", 0.0),
+        "planning_ms": root.get("Planning Time", 0.0),
+        "rows": plan.get("Actual Rows", 0),
+        "hit": plan.get("Shared Hit Blocks", 0),
+        "read": plan.get("Shared Read Blocks", 0),
+        "indexes": sorted({node["Index Name"] for node in nodes if "Index Name" in node}),
+        "seq_scans": sorted({node["Relation Name"] for node in nodes
+                             if node["Node Type"] in _SEQ_SCAN_NODES and "Relation Name" in node}),
+    }
+
+
+def check_queries(cursor, limit):
+    """
+    Проверяет планы канонических запросов.
+
+    Args:
+        cursor: Курсор БД
+        limit (int): Порог размера таблицы для Seq Scan в байтах
+
+    Returns:
+        list[dict]: Для каждого запроса - результат explain_query() и поля
+        name, seq_scans (пары (таблица, размер в байтах)), full_scan (полное
+        чтение ожидается) и slow_scans (таблицы больше limit, прочитанные
+        целиком; для full_scan - всегда пусто)
+    """
+    results = []
+    for name, sql, params, full_scan in canonical_queries(_sample_values(cursor)):
+        result = explain_query(cursor, sql, params)
+        sizes = []
+        for relation in result["seq_scans"]:
+            cursor.execute("SELECT pg_relation_size(%s::regclass) AS size", (relation,))
+            sizes.append((relation, cursor.fetchone()["size"]))
+        slow = [] if full_scan else [relation for relation, size in sizes if size > limit]
+        result.update(name=name, seq_scans=sizes, full_scan=full_scan, slow_scans=slow)
+        results.append(result)
+    return results
+
+
+def table_stats(cursor):
+    """
+    Собирает статистику таблиц текущей схемы.
+
+    Returns:
+        list[dict]: name, table_size, indexes_size, live, dead, seq_scan, idx_scan,
+        hit_rate (доля чтений из кэша или None), last_vacuum (последний VACUUM
+        или autovacuum) - крупные таблицы сначала
+    """
+    cursor.execute("""
+        SELECT s.relname AS name,
+               pg_table_size(s.relid) AS table_size,
+               pg_indexes_size(s.relid) AS indexes_size,
+               s.n_live_tup AS live, s.n_dead_tup AS dead,
+               s.seq_scan, COALESCE(s.idx_scan, 0) AS idx_scan,
+               io.heap_blks_hit::float / NULLIF(io.heap_blks_hit + io.heap_blks_read, 0) AS hit_rate,
+               GREATEST(s.last_vacuum, s.last_autovacuum) AS last_vacuum
+        FROM pg_stat_user_tables s
+        JOIN pg_statio_user_tables io USING (relid)
+        WHERE s.schemaname = current_schema()
+        ORDER BY pg_total_relation_size(s.relid) DESC
+    """)
+    return cursor.fetchall()
+
+
+def index_stats(cursor):
+    """
+    Собирает статистику использования индексов текущей схемы.
+
+    Returns:
+        list[dict]: table, name, size, scans (число сканирований с момента
+        сброса статистики), hit_rate (доля чтений из кэша или None)
+    """
+    cursor.execute("""
+        SELECT s.relname AS table, s.indexrelname AS name,
+               pg_relation_size(s.indexrelid) AS size,
+               s.idx_scan AS scans,
+               io.idx_blks_hit::float / NULLIF(io.idx_blks_hit + io.idx_blks_read, 0) AS hit_rate
+        FROM pg_stat_user_indexes s
+        JOIN pg_statio_user_indexes io USING (indexrelid)
+        WHERE s.schemaname = current_schema()
+        ORDER BY s.relname, s.indexrelname
+    """)
+    return cursor.fetchall()
+
+
+def tombstone_count(cursor):
+    """Число надгробий - заметок, помеченных удаленными (deleted), но не удаленных из notes."""
+    cursor.execute("SELECT COUNT(*) AS count FROM notes WHERE deleted")
+    return cursor.fetchone()["count"]
+
+
+def top_statements(cursor, limit=10):
+    """
+    Возвращает самые затратные запросы к notes из pg_stat_statements.
+
+    Args:
+        cursor: Курсор БД
+        limit (int): Количество запросов
+
+    Returns:
+        list[dict] | None: query, calls, total_ms, mean_ms, rows - по убыванию
+        общего времени; None, если расширение не установлено
+    """
+    cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_stat_statements'")
+    if cursor.fetchone() is None:
+        return None
+    # До PostgreSQL 13 колонки назывались total_time/mean_time
+    cursor.execute("""
+        SELECT attname FROM pg_attribute
+        WHERE attrelid = 'pg_stat_statements'::regclass AND attname = 'total_exec_time'
+    """)
+    suffix = "exec_time" if cursor.fetchone() else "time"
+    cursor.execute(f"""
+        SELECT query, calls, total_{suffix} AS total_ms, mean_{suffix} AS mean_ms, rows
+        FROM pg_stat_statements
+        WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+          AND query ILIKE '%%notes%%'
+        ORDER BY total_{suffix} DESC
+        LIMIT %s
+    """, (limit,))
+    return cursor.fetchall()
+
+
+def find_problems(report, limit):
+    """
+    Составляет список проблем по отчету diagnose().
+
+    Returns:
+        list[str]: Описания проблем (пустой список - все в порядке)
+    """
+    problems = []
+    for query in report["queries"]:
+        for relation, size in query["seq_scans"]:
+            if relation in query["slow_scans"]:
+                problems.append(f"{query['name']}: Seq Scan по {relation} ({format_size(size)} > {format_size(limit)})")
+    for table in report["tables"]:
+        if table["live"] and table["dead"] > table["live"] * DEAD_TUPLES_RATIO:
+            problems.append(f"{table['name']}: мертвых строк {table['dead']} при {table['live']} живых - нужен VACUUM")
+    for index in report["indexes"]:
+        if index["scans"] == 0:
+            problems.append(f"{index['name']}: индекс не используется ({format_size(index['size'])})")
+        elif index["hit_rate"] is not None and index["hit_rate"] < INDEX_HIT_RATE:
+            problems.append(f"{index['name']}: из кэша только {index['hit_rate']:.0%} чтений")
+    return problems
+
+
+def diagnose(limit=None):
+    """
+    Собирает полный отчет о состоянии БД (через основной сервер).
+
+    Args:
+        limit (int, optional): Порог размера таблицы для Seq Scan в байтах
+            (по умолчанию seq_scan_limit())
+
+    Returns:
+        dict: queries (check_queries()), tables (table_stats()), indexes
+        (index_stats()), tombstones, statements (top_statements() или None),
+        limit и problems (find_problems())
+    """
+    limit = seq_scan_limit() if limit is None else limit
+    with Database.session():
+        with Database.get_cursor(readonly=True) as cursor:
+            report = {
+                "queries": check_queries(cursor, limit),
+                "tables": table_stats(cursor),
+                "indexes": index_stats(cursor),
+                "tombstones": tombstone_count(cursor),
+            }
+        try:
+            with Database.get_cursor(readonly=True) as cursor:
+                report["statements"] = top_statements(cursor)
+        except psycopg2.Error:
+            # Расширение создано, но не загружено через shared_preload_libraries
+            report["statements"] = None
+    report["limit"] = limit
+    report["problems"] = find_problems(report, limit)
+    return report
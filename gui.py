@@ -6,13 +6,301 @@
 через интуитивно понятный графический интерфейс.
 """
 
+import itertools
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import ttk, messagebox, scrolledtext
-from .storage import load_notes, save_note, delete_note_by_id, get_note_by_id
-from .models import Note
+from .storage import (load_notes, save_note, delete_note_by_id, changes_since, next_notes, claim_next_notes,
+                      edit_note, ConflictError, get_note_by_id, read_body_range, find_in_body, body_previews)
+from .models import Note, STATUSES, PRIORITIES
+from .search_index import SearchIndex, FacetIndex, SortIndex
+from .snapshot import read_snapshot, write_snapshot
+from .write_behind import WriteBehindQueue, write_behind_enabled
 from notebookk.database import init_db
 
 
+# Поля фильтров списка (теги - многозначное поле)
+FACET_FIELDS = ("status", "priority", "tags")
+
+# Сколько символов текста заметки загружается в список (длинные тексты
+# дочитываются частями при просмотре, поиск в списке видит только начало)
+BODY_PREVIEW_CHARS = 65536
+
+# Сколько текстов заметок из снимка загружается одним запросом
+BODY_BATCH = 1000
+
+# Сколько строк таблицы выводится сразу; следующие - при прокрутке к концу
+ROW_WINDOW = 200
+
+# Пауза после ввода символа в поле поиска до обновления списка (мс)
+SEARCH_DELAY_MS = 150
+
+
+def intersect(*sets):
+    """
+    Пересекает множества ID, пропуская незаданные (None) фильтры.
+
+    Returns:
+        set[int] | None: Пересечение или None, если ни одно множество не задано
+    """
+    sets = sorted((ids for ids in sets if ids is not None), key=len)
+    if not sets:
+        return None
+    return sets[0].intersection(*sets[1:])
+
+
+def format_count(count):
+    """Форматирует число с разделением разрядов пробелом: 1204 -> '1 204'."""
+    return f"{count:,}".replace(",", " ")
+
+
+class TaskRunner:
+    """
+    Выполняет операции с БД в фоновых потоках, не блокируя окно.
+
+    Результаты передаются обработчикам в главном потоке: завершение задач
+    проверяется через root.after, так как tkinter нельзя вызывать из других
+    потоков. Каждая задача может блокировать группы действий (кнопок),
+    пока она выполняется.
+
+    Attributes:
+        pending (dict[Future, tuple]): Выполняемые задачи с их описанием
+    """
+
+    POLL_MS = 50  # Период проверки завершения задач
+
+    def __init__(self, root, on_change=None, max_workers=4):
+        """
+        Args:
+            root (tk.Tk): Корневое окно tkinter
+            on_change (callable, optional): Вызывается при изменении набора выполняемых задач
+            max_workers (int): Максимальное число фоновых потоков
+        """
+        self.root = root
+        self.on_change = on_change
+        self.pending = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="notebookk-db")
+        self._polling = False
+
+    def submit(self, func, *args, on_done=None, on_error=None, label=None, locks=()):
+        """
+        Запускает функцию в фоновом потоке.
+
+        Args:
+            func (callable): Функция для выполнения
+            *args: Аргументы функции
+            on_done (callable, optional): Обработчик результата (в главном потоке)
+            on_error (callable, optional): Обработчик исключения (в главном потоке)
+            label (str, optional): Описание задачи для строки состояния
+            locks (iterable[str]): Группы действий, недоступные во время выполнения
+
+        Returns:
+            concurrent.futures.Future: Фоновая задача
+        """
+        future = self._executor.submit(func, *args)
+        self.pending[future] = (on_done, on_error, label, tuple(locks))
+        self._changed()
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.POLL_MS, self._poll)
+        return future
+
+    def is_locked(self, action):
+        """Проверяет, заблокировано ли действие выполняемой задачей."""
+        return any(action in locks for _, _, _, locks in self.pending.values())
+
+    def labels(self):
+        """Возвращает описания выполняемых задач."""
+        return [label for _, _, label, _ in self.pending.values() if label]
+
+    def shutdown(self):
+        """Останавливает пул потоков, не дожидаясь выполняемых задач."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _poll(self):
+        """Передает результаты завершенных задач обработчикам."""
+        try:
+            for future in [f for f in self.pending if f.done()]:
+                on_done, on_error, label, _ = self.pending.pop(future)
+                # Ошибка одного обработчика (например, TclError в уже закрытом окне)
+                # не должна мешать обработке остальных задач
+                try:
+                    self._changed()
+                    error = future.exception()
+                    if error is None:
+                        if on_done:
+                            on_done(future.result())
+                    elif on_error:
+                        on_error(error)
+                    else:
+                        messagebox.showerror("Ошибка", f"{label or 'Операция'}: {error}")
+                except Exception as e:
+                    print(f"⚠️ Ошибка обработчика задачи '{label or 'Операция'}': {e}")
+        finally:
+            # Проверка продолжается, пока есть задачи, даже если обработчик упал
+            if self.pending:
+                self.root.after(self.POLL_MS, self._poll)
+            else:
+                self._polling = False
+
+    def _changed(self):
+        if self.on_change:
+            self.on_change()
+
+
+class ChunkedText:
+    """
+    Постраничный вывод длинного текста в текстовое поле.
+
+    В поле одновременно находится не больше MAX_CHUNKS частей по CHUNK_CHARS
+    символов: при прокрутке к краю подгружается следующая (или предыдущая)
+    часть, а самая дальняя удаляется. Поэтому открытие и прокрутка текста
+    в десятки мегабайт не зависят от его размера.
+
+    Attributes:
+        length (int): Полная длина текста в символах
+        start (int): Позиция первого символа в поле
+        end (int): Позиция за последним символом в поле
+    """
+
+    CHUNK_CHARS = 32768
+    MAX_CHUNKS = 6
+    EDGE = 0.1  # Доля прокрутки от края, при которой подгружается соседняя часть
+
+    def __init__(self, text_area, length, fetch, on_change=None):
+        """
+        Args:
+            text_area (scrolledtext.ScrolledText): Поле для вывода (только чтение)
+            length (int): Полная длина текста в символах
+            fetch (callable): fetch(start, count, callback) - получает фрагмент
+                текста и передает его в callback (сразу или позже)
+            on_change (callable, optional): Вызывается после изменения показанной части
+        """
+        self.text = text_area
+        self.length = length
+        self.fetch = fetch
+        self.on_change = on_change
+        self.start = self.end = 0
+        self._chunks = []       # Длины частей в поле
+        self._loading = False
+        self._generation = 0    # Номер текущего окна: ответы для старых окон отбрасываются
+        self.text.configure(yscrollcommand=self._on_scroll, state=tk.DISABLED)
+        self.text.tag_configure("match", background="#ffeb3b")
+
+    def show(self, position=0, highlight=0):
+        """
+        Показывает текст, начиная с части, в которой находится позиция.
+
+        Args:
+            position (int): Позиция символа, который нужно показать
+            highlight (int): Сколько символов от позиции выделить (0 - не выделять)
+        """
+        self._generation += 1
+        generation = self._generation
+        chunk_start = position - position % self.CHUNK_CHARS
+        self._loading = True
+
+        def loaded(text):
+            if generation != self._generation:
+                return
+            self.text.configure(state=tk.NORMAL)
+            self.text.delete(1.0, tk.END)
+            self.text.insert(tk.END, text)
+            self.text.configure(state=tk.DISABLED)
+            self.start, self.end = chunk_start, chunk_start + len(text)
+            self._chunks = [len(text)]
+            self._loading = False
+            if highlight:
+                self.highlight(position, highlight)
+            self._changed()
+
+        self.fetch(chunk_start, self.CHUNK_CHARS, loaded)
+
+    def highlight(self, position, count):
+        """Выделяет и прокручивает к фрагменту, если он находится в поле."""
+        self.text.tag_remove("match", 1.0, tk.END)
+        if not self.start <= position < self.end:
+            return
+        first = f"1.0 + {position - self.start} chars"
+        self.text.tag_add("match", first, f"{first} + {count} chars")
+        self.text.see(first)
+
+    def text_range(self):
+        """Возвращает (начало, конец) показанной части текста."""
+        return self.start, self.end
+
+    def _changed(self):
+        if self.on_change:
+            self.on_change()
+
+    def _on_scroll(self, first, last):
+        """Обработчик прокрутки: обновляет полосу прокрутки и подгружает соседние части."""
+        self.text.vbar.set(first, last)
+        if self._loading:
+            return
+        if float(last) >= 1 - self.EDGE and self.end < self.length:
+            self._load_next()
+        elif float(first) <= self.EDGE and self.start > 0:
+            self._load_previous()
+
+    def _load_next(self):
+        """Дописывает следующую часть в конец поля."""
+        generation = self._generation
+        self._loading = True
+
+        def loaded(text):
+            if generation != self._generation:
+                return
+            self._loading = False
+            if not text:
+                # Текст оказался короче ожидаемого (например, изменен)
+                self.length = self.end
+                return
+            self.text.configure(state=tk.NORMAL)
+            self.text.insert(tk.END, text)
+            self.end += len(text)
+            self._chunks.append(len(text))
+            if len(self._chunks) > self.MAX_CHUNKS:
+                # Удаляем верхнюю часть, сохраняя видимое место текста
+                top = self.text.count(1.0, self.text.index("@0,0"), "chars") or (0,)
+                removed = self._chunks.pop(0)
+                self.text.delete(1.0, f"1.0 + {removed} chars")
+                self.start += removed
+                self.text.yview(f"1.0 + {max(top[0] - removed, 0)} chars")
+            self.text.configure(state=tk.DISABLED)
+            self._changed()
+
+        self.fetch(self.end, self.CHUNK_CHARS, loaded)
+
+    def _load_previous(self):
+        """Вставляет предыдущую часть в начало поля."""
+        generation = self._generation
+        count = min(self.CHUNK_CHARS, self.start)
+        self._loading = True
+
+        def loaded(text):
+            if generation != self._generation:
+                return
+            self._loading = False
+            if not text:
+                return
+            self.text.configure(state=tk.NORMAL)
+            top = self.text.count(1.0, self.text.index("@0,0"), "chars") or (0,)
+            self.text.insert(1.0, text)
+            self.start -= len(text)
+            self._chunks.insert(0, len(text))
+            if len(self._chunks) > self.MAX_CHUNKS:
+                # Удаляем нижнюю часть
+                removed = self._chunks.pop()
+                self.text.delete(f"end - {removed + 1} chars", tk.END)
+                self.end -= removed
+            self.text.yview(f"1.0 + {top[0] + len(text)} chars")
+            self.text.configure(state=tk.DISABLED)
+            self._changed()
+
+        self.fetch(self.start - count, count, loaded)
+
+
 class NoteApp:
     """
     Главный класс графического интерфейса приложения notebookk.
@@ -20,9 +308,18 @@ class NoteApp:
     Attributes:
         root (tk.Tk): Основное окно приложения
         notes (list[Note]): Список загруженных заметок
+        search_index (SearchIndex): Индекс для поиска по заметкам (None, пока строится)
+        facets (FacetIndex): Индекс по статусу и приоритету для фильтров
+        sorter (SortIndex): Кэш сортировок по колонкам таблицы
+        sync_cursor (datetime.datetime): Время последнего известного изменения в БД
+        tasks (TaskRunner): Исполнитель фоновых операций с БД
+        writer (WriteBehindQueue): Очередь отложенной записи (None - запись сразу)
         next_id (int): Следующий ID для новой заметки
+        snapshot_loaded (bool): Прочитан ли локальный снимок (см. load_snapshot)
     """
 
+    WRITER_POLL_MS = 200  # Период проверки результатов отложенной записи
+
     def __init__(self, root):
         """
         Инициализирует графический интерфейс.
@@ -35,12 +332,32 @@ class NoteApp:
         self.root.geometry("1000x650")
         self.root.configure(bg="#f4f4f4")
 
-        # Инициализируем БД
-        init_db()
-
-        # Загружаем заметки и определяем следующий ID
-        self.notes = load_notes()
-        self.next_id = max([n.id for n in self.notes], default=0) + 1
+        # Заметки из локального снимка появятся сразу после построения окна (см. load_snapshot)
+        self.notes, self.sync_cursor = [], None
+        self.next_id = 1
+        self.snapshot_loaded = False  # Пока снимок не прочитан, сохранять его нельзя
+
+        # Фасеты и сортировки строятся быстро, поисковый индекс - в фоне (см. build_search_index)
+        self.search_index = None
+        self._index_journal = None  # Изменения, сделанные во время построения индекса
+        self.facets = FacetIndex(FACET_FIELDS, self.notes, multi=("tags",))
+        self.sorter = SortIndex(self.notes)
+        self.sort_column = None      # None - порядок по умолчанию (новые сверху)
+        self.sort_descending = False
+        self._updating_filters = False  # Защита от рекурсии при обновлении счетчиков
+        self._refresh_job = None        # Отложенное обновление списка (ввод в поле поиска)
+
+        # Строки таблицы: ID в порядке вывода, значения колонок и еще не выведенные ID
+        self._rows = []
+        self._row_values = {}
+        self._more_rows = iter(())
+
+        # Все обращения к БД выполняются в фоне, окно не зависает
+        self.tasks = TaskRunner(self.root, on_change=self.update_busy_state)
+        self.status_message = ""  # Сообщение строки состояния, когда нет фоновых операций
+
+        # Отложенная запись (операции из прошлого запуска показываются вместе со снимком)
+        self.writer = WriteBehindQueue() if write_behind_enabled() else None
 
         # Строим интерфейс
         self.build_ui()
@@ -49,6 +366,10 @@ class NoteApp:
         # Центрируем окно на экране
         self.center_window()
 
+        # Читаем снимок и сверяем его с БД в фоновом потоке, сохраняем снимок при закрытии
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.load_snapshot()
+
     def center_window(self):
         """Центрирует окно приложения на экране."""
         self.root.update_idletasks()
@@ -93,13 +414,18 @@ class NoteApp:
         )
         self.body_text.pack(pady=(0, 20))
 
+        # Теги
+        tk.Label(left, text="Теги (через запятую)", bg="#f4f4f4", font=("Segoe UI", 10)).pack(anchor="w")
+        self.tags_entry = tk.Entry(left, width=40, font=("Segoe UI", 10))
+        self.tags_entry.pack(pady=(0, 10))
+
         # Выбор статуса
         tk.Label(left, text="Статус", bg="#f4f4f4", font=("Segoe UI", 10)).pack(anchor="w")
         self.status_var = tk.StringVar(value="todo")
         ttk.Combobox(
             left,
             textvariable=self.status_var,
-            values=["todo", "in_progress", "done"],
+            values=list(STATUSES),
             state="readonly",
             width=37,
             font=("Segoe UI", 10)
@@ -111,14 +437,14 @@ class NoteApp:
         ttk.Combobox(
             left,
             textvariable=self.priority_var,
-            values=["low", "medium", "high"],
+            values=list(PRIORITIES),
             state="readonly",
             width=37,
             font=("Segoe UI", 10)
         ).pack(pady=(0, 25))
 
         # Кнопка добавления
-        tk.Button(
+        self.add_button = tk.Button(
             left,
             text="✅ Добавить заметку",
             bg="#2196F3",
@@ -127,7 +453,8 @@ class NoteApp:
             height=2,
             command=self.add_note,
             cursor="hand2"
-        ).pack(fill=tk.X)
+        )
+        self.add_button.pack(fill=tk.X)
 
         # === Правая панель: список заметок ===
         right = tk.Frame(self.root, bg="#f4f4f4")
@@ -139,7 +466,8 @@ class NoteApp:
         tk.Label(search_frame, text="🔍 Поиск:", bg="#f4f4f4", font=("Segoe UI", 10)).pack(side=tk.LEFT)
         self.search_var = tk.StringVar()
         # Привязываем событие изменения текста для автоматического поиска
-        self.search_var.trace("w", lambda *args: self.refresh_list())
+        # (список обновляется после паузы в наборе, а не на каждый символ)
+        self.search_var.trace("w", lambda *args: self.schedule_refresh())
         tk.Entry(
             search_frame,
             textvariable=self.search_var,
@@ -152,62 +480,91 @@ class NoteApp:
         filter_frame.pack(fill=tk.X, pady=(0, 10))
 
         tk.Label(filter_frame, text="📊 Статус:", bg="#f4f4f4", font=("Segoe UI", 10)).pack(side=tk.LEFT)
-        self.filter_status = tk.StringVar()
+        # Значения комбобоксов фильтров содержат счетчики, например "todo (1 204)"
+        self.filter_status = tk.StringVar(value="Все")
         self.filter_status.trace("w", lambda *args: self.refresh_list())
-        ttk.Combobox(
+        self.filter_status_box = ttk.Combobox(
             filter_frame,
             textvariable=self.filter_status,
-            values=["Все", "todo", "in_progress", "done"],
-            width=15,
+            values=["Все", *STATUSES],
+            state="readonly",
+            width=18,
             font=("Segoe UI", 10)
-        ).pack(side=tk.LEFT, padx=5)
-        self.filter_status.set("Все")
+        )
+        self.filter_status_box.pack(side=tk.LEFT, padx=5)
 
         tk.Label(filter_frame, text="🎯 Приоритет:", bg="#f4f4f4", font=("Segoe UI", 10)).pack(side=tk.LEFT,
                                                                                               padx=(20, 0))
-        self.filter_priority = tk.StringVar()
+        self.filter_priority = tk.StringVar(value="Все")
         self.filter_priority.trace("w", lambda *args: self.refresh_list())
-        ttk.Combobox(
+        self.filter_priority_box = ttk.Combobox(
             filter_frame,
             textvariable=self.filter_priority,
-            values=["Все", "low", "medium", "high"],
-            width=15,
+            values=["Все", *PRIORITIES],
+            state="readonly",
+            width=18,
             font=("Segoe UI", 10)
-        ).pack(side=tk.LEFT, padx=5)
-        self.filter_priority.set("Все")
+        )
+        self.filter_priority_box.pack(side=tk.LEFT, padx=5)
+
+        tk.Label(filter_frame, text="🏷️ Тег:", bg="#f4f4f4", font=("Segoe UI", 10)).pack(side=tk.LEFT, padx=(20, 0))
+        self.filter_tag = tk.StringVar(value="Все")
+        self.filter_tag.trace("w", lambda *args: self.refresh_list())
+        self.filter_tag_box = ttk.Combobox(
+            filter_frame,
+            textvariable=self.filter_tag,
+            values=["Все"],
+            state="readonly",
+            width=18,
+            font=("Segoe UI", 10)
+        )
+        self.filter_tag_box.pack(side=tk.LEFT, padx=5)
 
         # Таблица заметок
-        columns = ("id", "title", "status", "priority", "created")
+        columns = ("id", "title", "status", "priority", "tags", "created")
         self.tree = ttk.Treeview(right, columns=columns, show="headings", height=15)
 
-        # Настраиваем заголовки колонок
-        self.tree.heading("id", text="ID")
-        self.tree.heading("title", text="Заголовок")
-        self.tree.heading("status", text="Статус")
-        self.tree.heading("priority", text="Приоритет")
-        self.tree.heading("created", text="Создано")
+        # Настраиваем заголовки колонок (клик по заголовку - сортировка)
+        self.column_titles = {
+            "id": "ID",
+            "title": "Заголовок",
+            "status": "Статус",
+            "priority": "Приоритет",
+            "tags": "Теги",
+            "created": "Создано"
+        }
+        for column, text in self.column_titles.items():
+            self.tree.heading(column, text=text, command=lambda c=column: self.sort_by(c))
 
         # Настраиваем ширину колонок
         self.tree.column("id", width=50, anchor="center")
-        self.tree.column("title", width=300, anchor="w")
+        self.tree.column("title", width=250, anchor="w")
         self.tree.column("status", width=100, anchor="center")
         self.tree.column("priority", width=100, anchor="center")
-        self.tree.column("created", width=150, anchor="center")
+        self.tree.column("tags", width=120, anchor="w")
+        self.tree.column("created", width=130, anchor="center")
 
         # Добавляем скроллбар
-        scrollbar = ttk.Scrollbar(right, orient=tk.VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscroll=scrollbar.set)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree_scrollbar = ttk.Scrollbar(right, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscroll=self.on_tree_scroll)
+        self.tree_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.tree.pack(fill=tk.BOTH, expand=True)
 
         # Привязываем двойной клик для просмотра заметки
         self.tree.bind("<Double-1>", self.show_full_note)
 
+        # Строка состояния: выполняемые операции с БД и индикатор загрузки
+        status_frame = tk.Frame(right, bg="#f4f4f4")
+        status_frame.pack(fill=tk.X)
+        self.progress = ttk.Progressbar(status_frame, mode="indeterminate", length=120)
+        self.status_label = tk.Label(status_frame, text="", bg="#f4f4f4", fg="#666666", font=("Segoe UI", 9))
+        self.status_label.pack(side=tk.LEFT)
+
         # Панель кнопок
         btn_frame = tk.Frame(right, bg="#f4f4f4")
         btn_frame.pack(pady=10)
 
-        tk.Button(
+        self.delete_button = tk.Button(
             btn_frame,
             text="🗑️ Удалить выбранную",
             bg="#f44336",
@@ -215,15 +572,37 @@ class NoteApp:
             font=("Segoe UI", 10, "bold"),
             command=self.delete_note,
             cursor="hand2"
-        ).pack(side=tk.LEFT, padx=5)
+        )
+        self.delete_button.pack(side=tk.LEFT, padx=5)
 
         tk.Button(
+            btn_frame,
+            text="✏️ Изменить",
+            bg="#2196F3",
+            fg="white",
+            font=("Segoe UI", 10, "bold"),
+            command=self.edit_selected_note,
+            cursor="hand2"
+        ).pack(side=tk.LEFT, padx=5)
+
+        self.sync_button = tk.Button(
             btn_frame,
             text="🔄 Обновить список",
             bg="#4CAF50",
             fg="white",
             font=("Segoe UI", 10, "bold"),
-            command=self.refresh_list,
+            command=self.sync_notes,
+            cursor="hand2"
+        )
+        self.sync_button.pack(side=tk.LEFT, padx=5)
+
+        tk.Button(
+            btn_frame,
+            text="⏭️ Что дальше?",
+            bg="#FF9800",
+            fg="white",
+            font=("Segoe UI", 10, "bold"),
+            command=self.show_next_notes,
             cursor="hand2"
         ).pack(side=tk.LEFT, padx=5)
 
@@ -253,74 +632,496 @@ class NoteApp:
             title,
             body,
             self.status_var.get(),
-            self.priority_var.get()
+            self.priority_var.get(),
+            tags=self.tags_entry.get()
         )
 
-        # Сохраняем в БД
-        try:
-            save_notes(note)  # Этот метод обновит ID и created
-            self.next_id = max(self.next_id, note.id + 1)
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось сохранить заметку: {e}")
+        if self.writer:
+            # Отложенная запись: заметка сразу появляется в списке, в БД попадет в фоне
+            self.writer.add(note)
+            self.notes.insert(0, note)
+            self.index_note(note)
+            self.title_entry.delete(0, tk.END)
+            self.body_text.delete(1.0, tk.END)
+            self.tags_entry.delete(0, tk.END)
+            self.refresh_list()
+            self.title_entry.focus()
             return
 
-        # Обновляем локальный список
-        self.notes = load_notes()
+        def saved(result):
+            self.next_id = max(self.next_id, note.id + 1)
 
-        # Очищаем форму
-        self.title_entry.delete(0, tk.END)
-        self.body_text.delete(1.0, tk.END)
+            # Обновляем локальный список и индексы (новая заметка - самая свежая)
+            self.notes.insert(0, note)
+            self.index_note(note)
+
+            # Очищаем форму
+            self.title_entry.delete(0, tk.END)
+            self.body_text.delete(1.0, tk.END)
+            self.tags_entry.delete(0, tk.END)
+
+            # Обновляем список и показываем сообщение
+            self.refresh_list()
+            messagebox.showinfo(
+                "Успех",
+                f"✅ Заметка добавлена!\n\n"
+                f"ID: {note.id}\n"
+                f"Заголовок: {title[:50]}{'...' if len(title) > 50 else ''}"
+            )
 
-        # Обновляем список и показываем сообщение
-        self.refresh_list()
-        messagebox.showinfo(
-            "Успех",
-            f"✅ Заметка добавлена!\n\n"
-            f"ID: {note.id}\n"
-            f"Заголовок: {title[:50]}{'...' if len(title) > 50 else ''}"
-        )
+        def failed(error):
+            messagebox.showerror("Ошибка", f"Не удалось сохранить заметку: {error}")
 
+        # Сохраняем в БД в фоне (save_note обновит ID и created)
+        self.tasks.submit(save_note, note, on_done=saved, on_error=failed,
+                          label="Сохранение заметки", locks=("add",))
+
+    def update_busy_state(self):
+        """
+        Показывает выполняемые операции с БД и блокирует конфликтующие действия.
+        """
+        labels = self.tasks.labels()
+        if labels:
+            self.status_label.config(text="⏳ " + ", ".join(labels) + "...")
+            if not self.progress.winfo_ismapped():
+                self.progress.pack(side=tk.LEFT, padx=(0, 10), before=self.status_label)
+                self.progress.start(15)
+        else:
+            if self.progress.winfo_ismapped():
+                self.progress.stop()
+                self.progress.pack_forget()
+            self.status_label.config(text=self.status_message)
+
+        for action, button in (("add", self.add_button),
+                               ("delete", self.delete_button),
+                               ("sync", self.sync_button)):
+            button.config(state=tk.DISABLED if self.tasks.is_locked(action) else tk.NORMAL)
+
+    def load_snapshot(self):
+        """
+        Читает локальный снимок заметок в фоне и показывает его.
+
+        Окно к этому моменту уже построено. После снимка в список добавляются
+        операции из очереди отложенной записи, и начинается сверка с БД.
+        """
+        def done(result):
+            notes, self.sync_cursor = result
+            self.snapshot_loaded = True
+            # Заметки, добавленные, пока читался снимок, - самые свежие
+            added = {n.id for n in self.notes}
+            self.notes = self.notes + [n for n in notes if n.id not in added]
+            self.facets = FacetIndex(FACET_FIELDS, self.notes, multi=("tags",))
+            self.sorter = SortIndex(self.notes)
+            self.next_id = max([n.id for n in self.notes] + [self.next_id - 1]) + 1
+            if self.writer:
+                self.apply_pending_writes()
+                self.root.after(self.WRITER_POLL_MS, self.poll_writer)
+            self.refresh_list()
+            self.reconcile_with_db()
+
+        self.tasks.submit(read_snapshot, on_done=done,
+                          label="Чтение локального снимка", locks=("sync",))
+
+    def reconcile_with_db(self):
+        """
+        Сверяет заметки из снимка с БД в фоне.
+
+        Если снимок есть, загружаются только изменения после его курсора,
+        иначе - все заметки. После сверки строится поисковый индекс
+        и сохраняется новый снимок.
+        """
+        cursor_ts = self.sync_cursor
+
+        def load():
+            init_db()
+            if cursor_ts is None:
+                notes = load_notes(body_limit=BODY_PREVIEW_CHARS)
+                return notes, None, max((n.updated for n in notes if n.updated), default=None)
+            return changes_since(cursor_ts, BODY_PREVIEW_CHARS)
+
+        def done(result):
+            changed, deleted_ids, self.sync_cursor = result
+            if deleted_ids is None:
+                # Полная загрузка: заменяем список целиком
+                self.notes = changed
+                self.facets = FacetIndex(FACET_FIELDS, self.notes, multi=("tags",))
+                self.sorter = SortIndex(self.notes)
+                self.next_id = max([n.id for n in self.notes], default=0) + 1
+            else:
+                self.apply_changes(changed, deleted_ids)
+            if self.writer:
+                self.apply_pending_writes()
+            self.status_message = ""
+            self.refresh_list()
+            self.build_search_index()
+
+        def failed(error):
+            self.status_message = f"⚠️ Нет связи с БД, показан локальный снимок: {error}"
+            self.build_search_index()
+
+        self.tasks.submit(load, on_done=done, on_error=failed,
+                          label="Синхронизация с базой данных", locks=("sync",))
+
+    def build_search_index(self):
+        """
+        Строит поисковый индекс в фоновом потоке.
+
+        Пока индекс строится, поиск работает перебором, а изменения списка
+        записываются в журнал и применяются к индексу после построения.
+        Заметки из снимка приходят без текста - перед построением индекса
+        начало их текстов загружается из БД порциями по BODY_BATCH.
+        """
+        notes = list(self.notes)
+        self._index_journal = []
+
+        def build():
+            missing = [n for n in notes if n.id > 0 and not n.body and n.body_length]
+            try:
+                for start in range(0, len(missing), BODY_BATCH):
+                    batch = missing[start:start + BODY_BATCH]
+                    previews = body_previews([n.id for n in batch], BODY_PREVIEW_CHARS)
+                    for note in batch:
+                        note.body = previews.get(note.id, "")
+            except Exception as e:
+                # Без связи с БД индекс строится по тому, что уже загружено
+                print(f"⚠️ Не удалось загрузить тексты заметок: {e}")
+            return SearchIndex(notes)
+
+        def done(index):
+            for entry in self._index_journal:
+                if isinstance(entry, Note):
+                    index.add(entry)
+                else:
+                    index.remove(entry)
+            self._index_journal = None
+            self.search_index = index
+            self.save_snapshot()
+
+        def failed(error):
+            self._index_journal = None
+            print(f"⚠️ Не удалось построить поисковый индекс: {error}")
+
+        self.tasks.submit(build, on_done=done, on_error=failed,
+                          label="Построение поискового индекса")
+
+    def save_snapshot(self):
+        """Сохраняет локальный снимок заметок в фоновом потоке."""
+        # Еще не записанные заметки (с временными ID) хранит журнал отложенной записи
+        notes, cursor_ts = [n for n in self.notes if n.id > 0], self.sync_cursor
+        self.tasks.submit(write_snapshot, notes, cursor_ts)
+
+    def on_close(self):
+        """Дожидается отложенной записи, сохраняет снимок заметок и закрывает окно."""
+        self.tasks.shutdown()
+        if self.writer:
+            self.writer.close()
+            self.apply_changes(*self.writer_results())
+        if self.snapshot_loaded:
+            write_snapshot([n for n in self.notes if n.id > 0], self.sync_cursor)
+        self.root.destroy()
+
+    def apply_pending_writes(self):
+        """Показывает в списке операции из очереди отложенной записи."""
+        self.apply_changes(self.writer.pending_notes(), self.writer.pending_deletes())
+
+    def writer_results(self):
+        """
+        Забирает результаты отложенной записи.
+
+        Returns:
+            tuple[list[Note], list[int]]: Сохраненные заметки и временные ID,
+            которые они заменяют (аргументы для apply_changes)
+        """
+        results = self.writer.drain()
+        return [note for _, note in results], [temp_id for temp_id, _ in results]
+
+    def poll_writer(self):
+        """
+        Заменяет временные заметки сохраненными и показывает задержку записи.
+        """
+        saved, temp_ids = self.writer_results()
+        if saved:
+            self.apply_changes(saved, temp_ids)
+            self.refresh_list()
+
+        count, lag = self.writer.backlog()
+        if count:
+            self.status_message = f"💾 Не сохранено в БД: {count} (задержка {lag:.1f} с)"
+            if self.writer.last_error:
+                self.status_message += f" — ⚠️ {self.writer.last_error}"
+        elif self.writer.dead_letters:
+            # Очередь пуста, но часть операций не записана (файл отказов)
+            self.status_message = f"💾 ⚠️ {self.writer.last_error}"
+        elif self.status_message.startswith("💾"):
+            self.status_message = ""
+        self.update_busy_state()
+        self.root.after(self.WRITER_POLL_MS, self.poll_writer)
+
+    def index_note(self, note):
+        """
+        Добавляет (или обновляет) заметку во всех индексах.
+
+        Args:
+            note (Note): Заметка
+        """
+        self.facets.add(note)
+        self.sorter.add(note)
+        if self.search_index is not None:
+            self.search_index.add(note)
+        if self._index_journal is not None:
+            self._index_journal.append(note)
+
+    def unindex_note(self, note_id):
+        """
+        Удаляет заметку из всех индексов.
+
+        Args:
+            note_id (int): ID заметки
+        """
+        self.facets.remove(note_id)
+        self.sorter.remove(note_id)
+        if self.search_index is not None:
+            self.search_index.remove(note_id)
+        if self._index_journal is not None:
+            self._index_journal.append(note_id)
+
+    def find_note(self, note_id):
+        """
+        Находит заметку в локальном списке.
+
+        Args:
+            note_id (int): ID заметки
+
+        Returns:
+            Note: Заметка или None, если ее нет в списке
+        """
+        return next((n for n in self.notes if n.id == note_id), None)
+
+    def search(self, query):
+        """
+        Ищет заметки по подстроке в заголовке или тексте.
+
+        Args:
+            query (str): Поисковый запрос
+
+        Returns:
+            set[int]: Множество ID найденных заметок
+        """
+        if self.search_index is not None:
+            return self.search_index.search(query)
+        # Индекс еще строится - ищем перебором
+        query = query.lower()
+        return {n.id for n in self.notes if query in n.title.lower() or query in n.body.lower()}
+
+    def sync_notes(self):
+        """
+        Загружает из БД только изменения с момента последней синхронизации
+        и применяет их к локальному списку.
+        """
+        def done(result):
+            changed, deleted_ids, self.sync_cursor = result
+            self.status_message = ""
+            self.apply_changes(changed, deleted_ids)
+            self.refresh_list()
+
+        def failed(error):
+            messagebox.showerror("Ошибка", f"Не удалось обновить список: {error}")
+
+        self.tasks.submit(changes_since, self.sync_cursor, BODY_PREVIEW_CHARS, on_done=done, on_error=failed,
+                          label="Обновление списка", locks=("sync",))
+
+    def apply_changes(self, changed, deleted_ids):
+        """
+        Применяет изменения к локальному списку заметок и индексам.
+
+        Повторное применение тех же изменений ничего не меняет.
+
+        Args:
+            changed (list[Note]): Новые и измененные заметки
+            deleted_ids (list[int]): ID удаленных заметок
+        """
+        removed = set(deleted_ids) | {note.id for note in changed}
+        if not removed:
+            return
+
+        for note_id in removed:
+            self.unindex_note(note_id)
+        for note in changed:
+            self.index_note(note)
+
+        self.notes = [n for n in self.notes if n.id not in removed] + changed
+        # Список почти отсортирован, поэтому сортировка обходится дешево
+        self.notes.sort(key=lambda n: n.created, reverse=True)
+        self.next_id = max(self.next_id, max((n.id + 1 for n in changed), default=0))
+
+    def schedule_refresh(self):
+        """Обновляет список после паузы SEARCH_DELAY_MS (повторный вызов откладывает обновление)."""
+        if self._refresh_job is not None:
+            self.root.after_cancel(self._refresh_job)
+        self._refresh_job = self.root.after(SEARCH_DELAY_MS, self.refresh_list)
 
     def refresh_list(self, event=None):
         """
         Обновляет список заметок с учетом фильтров и поиска.
 
+        Выводятся только первые ROW_WINDOW строк (следующие - при прокрутке,
+        см. on_tree_scroll), а строки, которые уже есть в таблице, не
+        пересоздаются. Поэтому обновление не зависит от числа заметок.
+
         Args:
             event: Событие tkinter (опционально)
         """
-        # Очищаем текущий список
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        if self._updating_filters:
+            return
+        if self._refresh_job is not None:
+            self.root.after_cancel(self._refresh_job)
+            self._refresh_job = None
 
         # Получаем текущие значения фильтров
-        search = self.search_var.get().lower()
-        f_status = self.filter_status.get()
-        f_priority = self.filter_priority.get()
-
-        # Преобразуем "Все" в пустую строку для фильтрации
-        if f_status == "Все":
-            f_status = ""
-        if f_priority == "Все":
-            f_priority = ""
-
-        # Добавляем отфильтрованные заметки
-        for note in self.notes:
-            # Фильтрация по поиску
-            if search and search not in note.title.lower() and search not in note.body.lower():
-                continue
-            # Фильтрация по статусу
-            if f_status and note.status != f_status:
-                continue
-            # Фильтрация по приоритету
-            if f_priority and note.priority != f_priority:
-                continue
-
-            # Добавляем заметку в таблицу
-            self.tree.insert(
-                "",
-                tk.END,
-                values=(note.id, note.title, note.status, note.priority, note.created)
-            )
+        search = self.search_var.get()
+        f_status = self.filter_value(self.filter_status)
+        f_priority = self.filter_value(self.filter_priority)
+        f_tag = self.filter_value(self.filter_tag)
+
+        # Каждый фильтр - множество ID (None - фильтр не задан)
+        found = self.search(search) if search else None
+        by_status = self.facets.select(status=f_status)
+        by_priority = self.facets.select(priority=f_priority)
+        by_tag = self.facets.select(tags=f_tag)
+        visible = intersect(found, by_status, by_priority, by_tag)
+
+        # Счетчики каждого фильтра учитывают остальные фильтры
+        self.update_filter_counts(self.filter_status, self.filter_status_box, "status",
+                                  intersect(found, by_priority, by_tag))
+        self.update_filter_counts(self.filter_priority, self.filter_priority_box, "priority",
+                                  intersect(found, by_status, by_tag))
+        self.update_filter_counts(self.filter_tag, self.filter_tag_box, "tags",
+                                  intersect(found, by_status, by_priority))
+
+        # Порядок строк: выбранная сортировка или по умолчанию (новые сверху)
+        if self.sort_column:
+            self._more_rows = self.sorter.ordered(self.sort_column, self.sort_descending, visible)
+        else:
+            self._more_rows = self.sorter.ordered("created", True, visible)
+        self.render_rows(list(itertools.islice(self._more_rows, ROW_WINDOW)))
+
+    def render_rows(self, ids):
+        """
+        Приводит строки таблицы к списку ID, меняя только отличающиеся строки.
+
+        Строки исчезнувших заметок удаляются одним вызовом, новые вставляются
+        на свои места, оставшиеся при необходимости переставляются, а их
+        значения обновляются, только если заметка изменилась.
+
+        Args:
+            ids (list[int]): ID заметок в порядке вывода
+        """
+        wanted = set(ids)
+        gone = [note_id for note_id in self._rows if note_id not in wanted]
+        if gone:
+            self.tree.delete(*map(str, gone))
+            for note_id in gone:
+                del self._row_values[note_id]
+
+        # Оставшиеся строки в текущем порядке; переставленные пропускаются
+        kept = [note_id for note_id in self._rows if note_id in wanted]
+        moved = set()
+        position = 0
+        for index, note_id in enumerate(ids):
+            while position < len(kept) and kept[position] in moved:
+                position += 1
+            note = self.sorter.get(note_id)
+            values = (note.id, note.title, note.status, note.priority, ", ".join(note.tags), note.created)
+            if note_id not in self._row_values:
+                self.tree.insert("", index, iid=str(note_id), values=values)
+            else:
+                if position < len(kept) and kept[position] == note_id:
+                    position += 1
+                else:
+                    self.tree.move(str(note_id), "", index)
+                    moved.add(note_id)
+                if self._row_values[note_id] != values:
+                    self.tree.item(str(note_id), values=values)
+            self._row_values[note_id] = values
+        self._rows = list(ids)
+
+    def on_tree_scroll(self, first, last):
+        """Обновляет полосу прокрутки и выводит следующие строки у конца таблицы."""
+        self.tree_scrollbar.set(first, last)
+        if float(last) >= 0.9:
+            more = [note_id for note_id in itertools.islice(self._more_rows, ROW_WINDOW)
+                    if note_id not in self._row_values and self.sorter.get(note_id) is not None]
+            if more:
+                self.render_rows(self._rows + more)
+
+    def sort_by(self, column):
+        """
+        Сортирует таблицу по колонке; повторный клик меняет направление.
+
+        Args:
+            column (str): Имя колонки
+        """
+        if self.sort_column == column:
+            self.sort_descending = not self.sort_descending
+        else:
+            self.sort_column = column
+            self.sort_descending = False
+
+        for name, text in self.column_titles.items():
+            if name == column:
+                text += " ▼" if self.sort_descending else " ▲"
+            self.tree.heading(name, text=text)
+
+        self.refresh_list()
+
+    @staticmethod
+    def filter_value(var):
+        """
+        Извлекает значение фильтра из текста комбобокса.
+
+        Args:
+            var (tk.StringVar): Переменная комбобокса, например "todo (1 204)"
+
+        Returns:
+            str: Значение фильтра ("todo") или пустая строка для "Все"
+        """
+        value = var.get().split(" (")[0].strip()
+        return "" if value == "Все" else value
+
+    def update_filter_counts(self, var, box, field, within):
+        """
+        Показывает в комбобоксе фильтра количество заметок для каждого значения.
+
+        Args:
+            var (tk.StringVar): Переменная комбобокса
+            box (ttk.Combobox): Комбобокс фильтра
+            field (str): Поле заметки ("status", "priority" или "tags")
+            within (set[int] | None): ID заметок, прошедших остальные фильтры
+        """
+        counts = self.facets.counts(field, within)
+        total = len(self.notes) if within is None else len(within)
+        if field == "tags":
+            # Теги заранее не известны: показываем встречающиеся, самые частые сначала
+            values = sorted((tag for tag, count in counts.items() if count), key=lambda tag: (-counts[tag], tag))
+            current = self.filter_value(var)
+            if current and current not in values:
+                values.append(current)
+        else:
+            values = STATUSES if field == "status" else PRIORITIES
+
+        labels = {"": f"Все ({format_count(total)})"}
+        for value in values:
+            labels[value] = f"{value} ({format_count(counts.get(value, 0))})"
+        box["values"] = list(labels.values())
+
+        # Обновляем счетчик и в выбранном значении, не запуская повторную фильтрацию
+        current = self.filter_value(var)
+        if current in labels and var.get() != labels[current]:
+            self._updating_filters = True
+            try:
+                var.set(labels[current])
+            finally:
+                self._updating_filters = False
 
     def show_full_note(self, event):
         """
@@ -338,9 +1139,8 @@ class NoteApp:
         note_id = item["values"][0]
 
         # Находим заметку по ID
-        try:
-            note = next(n for n in self.notes if n.id == note_id)
-        except StopIteration:
+        note = self.find_note(note_id)
+        if not note:
             messagebox.showerror("Ошибка", "Заметка не найдена!")
             return
 
@@ -400,6 +1200,23 @@ class NoteApp:
             font=("Segoe UI", 10)
         ).pack(side=tk.LEFT, padx=5)
 
+        if note.tags:
+            tk.Label(
+                meta_frame,
+                text=f"🏷️ {', '.join(note.tags)}",
+                bg="#f4f4f4",
+                font=("Segoe UI", 10)
+            ).pack(side=tk.LEFT, padx=5)
+
+        # Поиск по тексту (на стороне БД, если текст загружен не целиком)
+        search_frame = tk.Frame(win, bg="#f4f4f4")
+        search_frame.pack(fill=tk.X, padx=20)
+        tk.Label(search_frame, text="🔍", bg="#f4f4f4").pack(side=tk.LEFT)
+        find_entry = tk.Entry(search_frame, font=("Segoe UI", 10))
+        find_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        position_label = tk.Label(search_frame, text="", bg="#f4f4f4", fg="#666666", font=("Segoe UI", 9))
+        position_label.pack(side=tk.RIGHT)
+
         # Текст заметки с прокруткой
         text_frame = tk.Frame(win)
         text_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
@@ -416,22 +1233,326 @@ class NoteApp:
         )
         text_area.pack(fill=tk.BOTH, expand=True)
 
-        # Вставляем текст и делаем доступным для копирования
-        text_area.insert(tk.END, note.body)
-        text_area.configure(state=tk.DISABLED)  # Только для чтения
+        def fetch(start, count, callback):
+            if note.body_complete:
+                callback(note.body[start:start + count])
+            else:
+                self.tasks.submit(read_body_range, note.id, start, count,
+                                  on_done=callback, label="Загрузка текста")
+
+        def show_position():
+            start, end = viewer.text_range()
+            if note.body_length > end - start:
+                position_label.config(text=f"символы {start + 1}–{end} из {note.body_length}")
+
+        # Текст выводится частями, поэтому длинные заметки открываются мгновенно
+        viewer = ChunkedText(text_area, note.body_length, fetch, on_change=show_position)
+        viewer.show(0)
+
+        last_match = {"pos": -1}
+
+        def find_next(event=None):
+            query = find_entry.get()
+            if not query:
+                return
+            start = last_match["pos"] + 1
+
+            def found(pos):
+                if pos is None and start > 0:
+                    # Дошли до конца - ищем с начала
+                    last_match["pos"] = -1
+                    find_next()
+                    return
+                if pos is None:
+                    position_label.config(text="не найдено")
+                    return
+                last_match["pos"] = pos
+                if viewer.start <= pos and pos + len(query) <= viewer.end:
+                    viewer.highlight(pos, len(query))
+                else:
+                    viewer.show(pos, len(query))
+
+            if note.body_complete:
+                pos = note.body.lower().find(query.lower(), start)
+                found(pos if pos >= 0 else None)
+            else:
+                self.tasks.submit(find_in_body, note.id, query, start,
+                                  on_done=found, label="Поиск в тексте")
+
+        def reset_search(event=None):
+            last_match["pos"] = -1
+
+        find_entry.bind("<Return>", find_next)
+        find_entry.bind("<KeyRelease>", lambda event: None if event.keysym == "Return" else reset_search())
 
         # Добавляем кнопку копирования
         btn_frame = tk.Frame(win, bg="#f4f4f4")
         btn_frame.pack(pady=(0, 10))
 
+        tk.Button(
+            btn_frame,
+            text="🔎 Найти далее",
+            command=find_next,
+            cursor="hand2",
+            font=("Segoe UI", 10)
+        ).pack(side=tk.LEFT, padx=5)
+
+        def copy():
+            # Выделенный фрагмент копируется сразу, весь текст - после загрузки
+            if text_area.tag_ranges(tk.SEL):
+                self.copy_to_clipboard(text_area.get(tk.SEL_FIRST, tk.SEL_LAST))
+            else:
+                self.copy_note_body(note)
+
         tk.Button(
             btn_frame,
             text="📋 Копировать текст",
-            command=lambda: self.copy_to_clipboard(note.body),
+            command=copy,
+            cursor="hand2",
+            font=("Segoe UI", 10)
+        ).pack(side=tk.LEFT, padx=5)
+
+        def edit():
+            win.destroy()
+            self.open_editor(note)
+
+        tk.Button(
+            btn_frame,
+            text="✏️ Изменить",
+            command=edit,
             cursor="hand2",
             font=("Segoe UI", 10)
         ).pack(side=tk.LEFT, padx=5)
 
+    def edit_selected_note(self):
+        """Открывает редактор для выбранной заметки."""
+        selection = self.tree.selection()
+        if not selection:
+            messagebox.showwarning("Внимание", "Выберите заметку для изменения")
+            return
+
+        note = self.find_note(self.tree.item(selection[0])["values"][0])
+        if not note:
+            messagebox.showerror("Ошибка", "Заметка не найдена!")
+            return
+        self.open_editor(note)
+
+    def open_editor(self, note):
+        """
+        Открывает окно редактирования заметки.
+
+        Редактор запоминает версию заметки (updated), с которой начато
+        редактирование. Если при сохранении оказывается, что заметку уже
+        изменил другой пользователь, предлагается перезаписать ее своей
+        версией или загрузить текущую - строки в БД при этом не блокируются.
+
+        Args:
+            note (Note): Заметка для редактирования
+        """
+        if note.id < 0:
+            messagebox.showinfo("Внимание", "Заметка еще сохраняется в БД, попробуйте через несколько секунд")
+            return
+        if not note.body_complete:
+            # В списке только начало текста - редактируем полную версию из БД
+            def loaded(full):
+                if full is None:
+                    messagebox.showerror("Ошибка", "Заметка не найдена!")
+                    return
+                self.open_editor(full)
+
+            self.tasks.submit(get_note_by_id, note.id, on_done=loaded, label="Загрузка заметки")
+            return
+
+        win = tk.Toplevel(self.root)
+        win.title(f"✏️ Заметка #{note.id}")
+        win.geometry("600x520")
+        win.configure(bg="#f4f4f4")
+
+        # Версия заметки, относительно которой вносятся изменения
+        base = {"note": note}
+
+        tk.Label(win, text="Заголовок", bg="#f4f4f4", font=("Segoe UI", 10)).pack(anchor="w", padx=20, pady=(15, 0))
+        title_entry = tk.Entry(win, font=("Segoe UI", 11))
+        title_entry.pack(fill=tk.X, padx=20, pady=(0, 10))
+
+        tk.Label(win, text="Текст заметки", bg="#f4f4f4", font=("Segoe UI", 10)).pack(anchor="w", padx=20)
+        body_text = scrolledtext.ScrolledText(win, wrap=tk.WORD, font=("Segoe UI", 10), height=15)
+        body_text.pack(fill=tk.BOTH, expand=True, padx=20, pady=(0, 10))
+
+        fields_frame = tk.Frame(win, bg="#f4f4f4")
+        fields_frame.pack(fill=tk.X, padx=20)
+        status_var = tk.StringVar()
+        priority_var = tk.StringVar()
+        tk.Label(fields_frame, text="Статус:", bg="#f4f4f4", font=("Segoe UI", 10)).pack(side=tk.LEFT)
+        ttk.Combobox(fields_frame, textvariable=status_var, values=list(STATUSES),
+                     state="readonly", width=12).pack(side=tk.LEFT, padx=(5, 15))
+        tk.Label(fields_frame, text="Приоритет:", bg="#f4f4f4", font=("Segoe UI", 10)).pack(side=tk.LEFT)
+        ttk.Combobox(fields_frame, textvariable=priority_var, values=list(PRIORITIES),
+                     state="readonly", width=12).pack(side=tk.LEFT, padx=5)
+        tk.Label(fields_frame, text="Теги:", bg="#f4f4f4", font=("Segoe UI", 10)).pack(side=tk.LEFT, padx=(15, 0))
+        tags_entry = tk.Entry(fields_frame, font=("Segoe UI", 10))
+        tags_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+
+        def fill(current):
+            title_entry.delete(0, tk.END)
+            title_entry.insert(0, current.title)
+            body_text.delete(1.0, tk.END)
+            body_text.insert(tk.END, current.body)
+            status_var.set(current.status)
+            priority_var.set(current.priority)
+            tags_entry.delete(0, tk.END)
+            tags_entry.insert(0, ", ".join(current.tags))
+
+        def save(version=None):
+            title = title_entry.get().strip()
+            if not title:
+                messagebox.showwarning("Ошибка", "Введите заголовок заметки!", parent=win)
+                return
+            if len(title) > 100:
+                messagebox.showwarning("Ошибка", "Заголовок слишком длинный (макс. 100 символов)", parent=win)
+                return
+
+            draft = Note(note.id, title, body_text.get(1.0, tk.END).strip(),
+                         status_var.get(), priority_var.get(), base["note"].created, tags_entry.get())
+            draft.updated = (version or base["note"]).updated
+            save_button.config(state=tk.DISABLED)
+            self.tasks.submit(edit_note, draft, on_done=saved, on_error=failed,
+                              label="Сохранение изменений", locks=("edit",))
+
+        def saved(result):
+            if result is None:
+                self.apply_changes([], [note.id])
+                self.refresh_list()
+                if win.winfo_exists():
+                    messagebox.showinfo("Внимание", f"Заметка #{note.id} была удалена", parent=win)
+            else:
+                self.apply_changes([result], [])
+                self.refresh_list()
+            win.destroy()
+
+        def failed(error):
+            if not win.winfo_exists():
+                return
+            save_button.config(state=tk.NORMAL)
+            if not isinstance(error, ConflictError):
+                messagebox.showerror("Ошибка", f"Не удалось сохранить заметку: {error}", parent=win)
+                return
+
+            # Показываем в списке актуальную версию
+            current = error.current
+            self.apply_changes([current], [])
+            self.refresh_list()
+
+            answer = messagebox.askyesnocancel(
+                "Конфликт изменений",
+                f"Заметку #{note.id} изменил другой пользователь "
+                f"({current.updated:%Y-%m-%d %H:%M:%S}).\n\n"
+                f"Да - сохранить вашу версию поверх,\n"
+                f"Нет - загрузить текущую версию (ваши правки будут потеряны),\n"
+                f"Отмена - продолжить редактирование.",
+                parent=win
+            )
+            if answer:
+                base["note"] = current
+                save(current)
+            elif answer is False:
+                base["note"] = current
+                fill(current)
+
+        btn_frame = tk.Frame(win, bg="#f4f4f4")
+        btn_frame.pack(pady=15)
+        save_button = tk.Button(
+            btn_frame,
+            text="💾 Сохранить",
+            bg="#4CAF50",
+            fg="white",
+            font=("Segoe UI", 10, "bold"),
+            command=save,
+            cursor="hand2"
+        )
+        save_button.pack(side=tk.LEFT, padx=5)
+        tk.Button(btn_frame, text="Отмена", command=win.destroy, cursor="hand2",
+                  font=("Segoe UI", 10)).pack(side=tk.LEFT, padx=5)
+
+        fill(note)
+        title_entry.focus()
+
+    def show_next_notes(self, limit=10):
+        """
+        Показывает очередь: открытые заметки по убыванию приоритета,
+        с возможностью взять следующую заметку в работу.
+
+        Args:
+            limit (int): Количество заметок в очереди
+        """
+        win = tk.Toplevel(self.root)
+        win.title("⏭️ Что дальше?")
+        win.geometry("700x350")
+        win.configure(bg="#f4f4f4")
+
+        columns = ("id", "title", "status", "priority", "created")
+        tree = ttk.Treeview(win, columns=columns, show="headings", height=10)
+        for column in columns:
+            tree.heading(column, text=self.column_titles[column])
+        tree.column("id", width=50, anchor="center")
+        tree.column("title", width=300, anchor="w")
+        tree.column("status", width=100, anchor="center")
+        tree.column("priority", width=100, anchor="center")
+        tree.column("created", width=130, anchor="center")
+        tree.pack(fill=tk.BOTH, expand=True, padx=20, pady=(20, 10))
+
+        def show(notes):
+            if not win.winfo_exists():
+                return
+            tree.delete(*tree.get_children())
+            for note in notes:
+                tree.insert("", tk.END, values=(note.id, note.title, note.status, note.priority, note.created))
+
+        def load():
+            self.tasks.submit(next_notes, limit, on_done=show, label="Загрузка очереди")
+
+        def claimed(notes):
+            if not notes:
+                messagebox.showinfo("Очередь", "Нет заметок со статусом todo", parent=win)
+                return
+            self.apply_changes(notes, [])
+            self.refresh_list()
+            load()
+            note = notes[0]
+            messagebox.showinfo("В работе", f"🚀 Взята в работу заметка #{note.id}\n\n{note.title}", parent=win)
+
+        tk.Button(
+            win,
+            text="🚀 Взять в работу",
+            bg="#2196F3",
+            fg="white",
+            font=("Segoe UI", 10, "bold"),
+            command=lambda: self.tasks.submit(claim_next_notes, 1, on_done=claimed,
+                                              label="Получение задачи"),
+            cursor="hand2"
+        ).pack(pady=(0, 15))
+
+        load()
+
+    def copy_note_body(self, note):
+        """
+        Копирует весь текст заметки, при необходимости дочитав его из БД в фоне.
+
+        Args:
+            note (Note): Заметка
+        """
+        if note.body_complete:
+            self.copy_to_clipboard(note.body)
+            return
+
+        def loaded(full):
+            if full is None:
+                messagebox.showerror("Ошибка", "Заметка не найдена!")
+                return
+            self.copy_to_clipboard(full.body)
+
+        self.tasks.submit(get_note_by_id, note.id, on_done=loaded, label="Загрузка текста")
+
     def copy_to_clipboard(self, text):
         """Копирует текст в буфер обмена."""
         self.root.clipboard_clear()
@@ -448,8 +1569,8 @@ class NoteApp:
         item = self.tree.item(selection[0])
         note_id = item["values"][0]
 
-        # Находим заметку для показа информации
-        note_to_delete = get_note_by_id(note_id)
+        # Находим заметку для показа информации (в локальном списке, без запроса к БД)
+        note_to_delete = self.find_note(note_id)
         if not note_to_delete:
             messagebox.showerror("Ошибка", "Заметка не найдена!")
             return
@@ -467,23 +1588,37 @@ class NoteApp:
         if not confirm:
             return
 
-        # Удаляем заметку из БД
-        try:
-            delete_note_by_id(note_id)
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось удалить заметку: {e}")
+        if self.writer:
+            # Отложенная запись: удаляем из списка сразу, из БД - в фоне
+            self.writer.delete(note_id)
+            self.notes = [n for n in self.notes if n.id != note_id]
+            self.unindex_note(note_id)
+            self.refresh_list()
             return
 
-        # Обновляем локальный список
-        self.notes = load_notes()
+        def deleted(result):
+            # Обновляем локальный список и индексы
+            self.notes = [n for n in self.notes if n.id != note_id]
+            self.unindex_note(note_id)
 
-        # Обновляем список
-        self.refresh_list()
+            # Обновляем список
+            self.refresh_list()
+
+            if result is None:
+                messagebox.showinfo("Внимание", f"Заметка #{note_id} уже была удалена")
+                return
+
+            # Показываем сообщение об успехе
+            messagebox.showinfo(
+                "Успех",
+                f"✅ Заметка удалена!\n\n"
+                f"ID: {note_id}\n"
+                f"Заголовок: {note_to_delete.title}"
+            )
+
+        def failed(error):
+            messagebox.showerror("Ошибка", f"Не удалось удалить заметку: {error}")
 
-        # Показываем сообщение об успехе
-        messagebox.showinfo(
-            "Успех",
-            f"✅ Заметка удалена!\n\n"
-            f"ID: {note_id}\n"
-            f"Заголовок: {note_to_delete.title}"
-        )
\ No newline at end of file
+        # Удаляем заметку из БД в фоне
+        self.tasks.submit(delete_note_by_id, note_id, on_done=deleted, on_error=failed,
+                          label="Удаление заметки", locks=("delete",))
\ No newline at end of file
@@ -8,10 +8,106 @@
 """
 
 import argparse
+import datetime
+import re
 import sys
 import tkinter as tk
 from .gui import NoteApp
 from .commands import add_note, list_notes, search_notes_cli as search_notes, delete_note_cli as delete_note
+from .commands import next_notes_cli, archive_notes_cli, batch_cli, update_notes_cli, edit_note_cli, tags_cli
+from .commands import dedupe_cli, import_cli, export_cli, report_cli, sync_dir_cli, doctor_cli
+from .shell import shell_cli
+from .models import STATUSES, PRIORITIES
+from .options import DEFAULT_THRESHOLD, FORMATS, IMPORT_FORMATS, parse_size as parse_byte_size
+
+def parse_date(value):
+    """
+    Преобразует аргумент командной строки в дату.
+
+    Args:
+        value (str): Дата в формате YYYY-MM-DD
+
+    Returns:
+        datetime.date: Дата
+    """
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"неверная дата '{value}', ожидается YYYY-MM-DD")
+
+
+def parse_duration(value):
+    """
+    Преобразует длительность вида 90d, 2w или 12h в timedelta.
+
+    Args:
+        value (str): Число и единица измерения (d - дни, w - недели, h - часы)
+
+    Returns:
+        datetime.timedelta: Длительность
+    """
+    match = re.fullmatch(r"(\d+)([dwh])", value.strip())
+    if not match:
+        raise argparse.ArgumentTypeError(f"неверная длительность '{value}', ожидается например 90d, 2w, 12h")
+    amount, unit = int(match.group(1)), match.group(2)
+    return {
+        'd': datetime.timedelta(days=amount),
+        'w': datetime.timedelta(weeks=amount),
+        'h': datetime.timedelta(hours=amount)
+    }[unit]
+
+
+def parse_positive_int(value):
+    """
+    Преобразует строку в целое число больше нуля.
+
+    Args:
+        value (str): Число
+
+    Returns:
+        int: Число
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"ожидается целое число больше нуля, получено '{value}'")
+    return number
+
+
+def parse_size(value):
+    """
+    Преобразует размер вида 8MB или 512kB в байты.
+
+    Args:
+        value (str): Число и необязательная единица (B, kB, MB, GB, TB)
+
+    Returns:
+        int: Размер в байтах
+    """
+    try:
+        return parse_byte_size(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def add_selection_arguments(parser):
+    """
+    Добавляет аргументы отбора заметок для массовых команд (update/delete).
+
+    Args:
+        parser (argparse.ArgumentParser): Парсер подкоманды
+    """
+    parser.add_argument('--id', type=int, nargs='+', help='ID заметок (можно несколько)')
+    parser.add_argument('--status', choices=STATUSES, help='Заметки с этим статусом')
+    parser.add_argument('--priority', choices=PRIORITIES, help='Заметки с этим приоритетом')
+    parser.add_argument('--since', type=parse_date, help='Созданные начиная с даты (YYYY-MM-DD)')
+    parser.add_argument('--until', type=parse_date, help='Созданные по дату включительно (YYYY-MM-DD)')
+    parser.add_argument('--before', type=parse_date, help='Созданные до даты, не включая ее (YYYY-MM-DD)')
+    parser.add_argument('--tag', action='append', help='Заметки с этим тегом (можно несколько - все сразу)')
+    parser.add_argument('--dry-run', action='store_true', help='Только показать количество подходящих заметок')
+
 
 def setup_cli_parser():
     """
@@ -22,7 +118,20 @@ def setup_cli_parser():
             - add: Добавить новую заметку
             - list: Показать список заметок
             - search: Поиск заметок по ключевому слову
-            - delete: Удалить заметку по ID
+            - delete: Удалить заметки по ID или по фильтру
+            - update: Изменить заметки по ID или по фильтру
+            - edit: Отредактировать заметку с проверкой одновременных изменений
+            - tags: Количество заметок по тегам
+            - dedupe: Найти и объединить почти одинаковые заметки
+            - next: Следующие открытые заметки по приоритету
+            - archive: Перенести завершенные заметки в архив
+            - batch: Выполнить пакет операций из файла JSON Lines
+            - import: Параллельный импорт заметок из JSON Lines/CSV
+            - export: Параллельная выгрузка заметок в JSON Lines/CSV/Arrow/Parquet
+            - report: Отчет по колоночному снимку (Arrow/Parquet)
+            - sync-dir: Двусторонняя синхронизация с каталогом Markdown-файлов
+            - doctor: Диагностика индексов, раздувания таблиц и медленных запросов
+            - shell: Интерактивный режим с одним подключением к БД
     """
     parser = argparse.ArgumentParser(
         prog="notebookk",
@@ -30,8 +139,23 @@ def setup_cli_parser():
         epilog="Примеры:\n"
                "  python -m notebookk add --title 'Заголовок' --body 'Текст'\n"
                "  python -m notebookk list --status todo\n"
+               "  python -m notebookk list --tag работа --tag срочно\n"
+               "  python -m notebookk list --since 2026-01-01 --until 2026-01-31\n"
                "  python -m notebookk search --keyword 'важно'\n"
                "  python -m notebookk delete --id 1\n"
+               "  python -m notebookk delete --status done --before 2026-01-01 --dry-run\n"
+               "  python -m notebookk update --id 3 4 5 --set-status done\n"
+               "  python -m notebookk edit --id 3  # Открыть в $EDITOR\n"
+               "  python -m notebookk dedupe --threshold 0.9 --merge\n"
+               "  python -m notebookk next -n 5 --claim\n"
+               "  python -m notebookk archive --older-than 90d\n"
+               "  python -m notebookk batch ops.jsonl --tx-size 500\n"
+               "  python -m notebookk import notes.csv --workers 8 --connections 4\n"
+               "  python -m notebookk export notes.jsonl --status done\n"
+               "  python -m notebookk export notes.arrow && python -m notebookk report notes.arrow\n"
+               "  python -m notebookk sync-dir ~/notes --watch\n"
+               "  python -m notebookk doctor --seq-scan-limit 1MB --fail-on-seq-scan\n"
+               "  python -m notebookk shell\n"
                "  python -m notebookk --gui  # Запуск графического интерфейса"
     )
 
@@ -52,15 +176,16 @@ def setup_cli_parser():
     add_parser.add_argument(
         '--status',
         default='todo',
-        choices=['todo', 'in_progress', 'done'],
+        choices=STATUSES,
         help='Статус заметки (default: todo)'
     )
     add_parser.add_argument(
         '--priority',
         default='medium',
-        choices=['low', 'medium', 'high'],
+        choices=PRIORITIES,
         help='Приоритет заметки (default: medium)'
     )
+    add_parser.add_argument('--tag', action='append', help='Тег заметки (можно несколько)')
     add_parser.set_defaults(func=add_note)
 
     # Команда list
@@ -71,14 +196,18 @@ def setup_cli_parser():
     )
     list_parser.add_argument(
         '--status',
-        choices=['todo', 'in_progress', 'done'],
+        choices=STATUSES,
         help='Фильтр по статусу'
     )
     list_parser.add_argument(
         '--priority',
-        choices=['low', 'medium', 'high'],
+        choices=PRIORITIES,
         help='Фильтр по приоритету'
     )
+    list_parser.add_argument('--since', type=parse_date, help='Созданные начиная с даты (YYYY-MM-DD)')
+    list_parser.add_argument('--until', type=parse_date, help='Созданные по дату включительно (YYYY-MM-DD)')
+    list_parser.add_argument('--include-archive', action='store_true', help='Показать также заметки из архива')
+    list_parser.add_argument('--tag', action='append', help='Заметки с этим тегом (можно несколько - все сразу)')
     list_parser.set_defaults(func=list_notes)
 
     # Команда search
@@ -88,17 +217,234 @@ def setup_cli_parser():
         description='Поиск заметок по ключевому слову в заголовке или тексте'
     )
     search_parser.add_argument('--keyword', required=True, help='Ключевое слово для поиска')
+    search_parser.add_argument('--include-archive', action='store_true', help='Искать также в архиве')
+    search_parser.add_argument('--tag', action='append', help='Только заметки с этим тегом (можно несколько)')
+    search_parser.add_argument(
+        '--include-compressed',
+        action='store_true',
+        help='Искать также в сжатых текстах (DB_COMPRESS_BODIES; все они загружаются и распаковываются)'
+    )
     search_parser.set_defaults(func=search_notes)
 
     # Команда delete
     delete_parser = subparsers.add_parser(
         'delete',
-        help='Удалить заметку',
-        description='Удаление заметки по её ID'
+        help='Удалить заметки',
+        description='Удаление заметок по ID или по условиям отбора одним запросом'
     )
-    delete_parser.add_argument('--id', required=True, type=int, help='ID заметки для удаления')
+    add_selection_arguments(delete_parser)
     delete_parser.set_defaults(func=delete_note)
 
+    # Команда update
+    update_parser = subparsers.add_parser(
+        'update',
+        help='Изменить заметки',
+        description='Изменение полей у заметок по ID или по условиям отбора одним запросом'
+    )
+    add_selection_arguments(update_parser)
+    update_parser.add_argument('--set-title', help='Новый заголовок')
+    update_parser.add_argument('--set-body', help='Новый текст')
+    update_parser.add_argument('--set-status', choices=STATUSES, help='Новый статус')
+    update_parser.add_argument('--set-priority', choices=PRIORITIES, help='Новый приоритет')
+    update_parser.add_argument('--set-tags', help='Новые теги через запятую (пустая строка - убрать все)')
+    update_parser.set_defaults(func=update_notes_cli)
+
+    # Команда edit
+    edit_parser = subparsers.add_parser(
+        'edit',
+        help='Отредактировать заметку',
+        description='Редактирование заметки: без аргументов полей открывает $EDITOR. '
+                    'Сохранение не выполняется, если заметку успели изменить другие'
+    )
+    edit_parser.add_argument('--id', required=True, type=int, help='ID заметки')
+    edit_parser.add_argument('--title', help='Новый заголовок')
+    edit_parser.add_argument('--body', help='Новый текст')
+    edit_parser.add_argument('--status', choices=STATUSES, help='Новый статус')
+    edit_parser.add_argument('--priority', choices=PRIORITIES, help='Новый приоритет')
+    edit_parser.add_argument('--tags', help='Новые теги через запятую')
+    edit_parser.set_defaults(func=edit_note_cli)
+
+    # Команда tags
+    tags_parser = subparsers.add_parser(
+        'tags',
+        help='Показать теги',
+        description='Количество заметок по каждому тегу'
+    )
+    tags_parser.add_argument('--status', choices=STATUSES, help='Учитывать только заметки с этим статусом')
+    tags_parser.add_argument('--tag', action='append', help='Учитывать только заметки с этим тегом')
+    tags_parser.set_defaults(func=tags_cli)
+
+    # Команда dedupe
+    dedupe_parser = subparsers.add_parser(
+        'dedupe',
+        help='Найти дубликаты',
+        description='Поиск почти одинаковых заметок по заголовку и тексту (MinHash/LSH). '
+                    'Подписи заметок кэшируются локально и пересчитываются только для измененных'
+    )
+    dedupe_parser.add_argument(
+        '--threshold',
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help=f'Минимальное сходство заметок от 0 до 1 (default: {DEFAULT_THRESHOLD})'
+    )
+    dedupe_parser.add_argument('--limit', type=int, default=20, help='Сколько групп показать и объединить с --merge (default: 20)')
+    dedupe_parser.add_argument(
+        '--merge',
+        action='store_true',
+        help='Объединить показанные группы (см. --limit): оставить последнюю измененную заметку '
+             'с тегами объединенных'
+    )
+    dedupe_parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='Только показать, какие заметки останутся и какие будут удалены'
+    )
+    dedupe_parser.set_defaults(func=dedupe_cli)
+
+    # Команда next
+    next_parser = subparsers.add_parser(
+        'next',
+        help='Что делать дальше',
+        description='Открытые заметки по убыванию приоритета (при равном - сначала старые)'
+    )
+    next_parser.add_argument('-n', type=int, default=5, help='Количество заметок (default: 5)')
+    next_parser.add_argument(
+        '--claim',
+        action='store_true',
+        help='Взять заметки в работу (todo -> in_progress), безопасно для нескольких обработчиков'
+    )
+    next_parser.set_defaults(func=next_notes_cli)
+
+    # Команда archive
+    archive_parser = subparsers.add_parser(
+        'archive',
+        help='Архивировать завершенные заметки',
+        description='Перенос заметок со статусом done в архив (notes_archive) порциями '
+                    'и удаление устаревших надгробий (отметок об удалении для синхронизации)'
+    )
+    archive_parser.add_argument(
+        '--older-than',
+        type=parse_duration,
+        default=parse_duration('90d'),
+        help='Не изменявшиеся дольше указанного срока: 90d, 2w, 12h (default: 90d)'
+    )
+    archive_parser.add_argument(
+        '--tombstones-older-than',
+        type=parse_duration,
+        default=parse_duration('180d'),
+        help='Удалять надгробия старше срока; он должен быть больше, чем клиент синхронизации '
+             'может пробыть без связи (default: 180d)'
+    )
+    archive_parser.add_argument('--batch-size', type=int, default=1000, help='Размер порции (default: 1000)')
+    archive_parser.set_defaults(func=archive_notes_cli)
+
+    # Команда batch
+    batch_parser = subparsers.add_parser(
+        'batch',
+        help='Выполнить пакет операций',
+        description='Операции add/update/status/delete из файла JSON Lines (по одной в строке) '
+                    'в одном подключении, сгруппированные в транзакции'
+    )
+    batch_parser.add_argument(
+        'file',
+        nargs='?',
+        type=argparse.FileType('r', encoding='utf-8'),
+        default=sys.stdin,
+        help='Файл с операциями (- или не указан: stdin)'
+    )
+    batch_parser.add_argument('--tx-size', type=parse_positive_int, default=100, help='Операций в одной транзакции (default: 100)')
+    batch_parser.add_argument('--errors-only', action='store_true', help='Выводить только ошибки')
+    batch_parser.set_defaults(func=batch_cli)
+
+    # Команда import
+    import_parser = subparsers.add_parser(
+        'import',
+        help='Импортировать заметки из файла',
+        description='Параллельный импорт из JSON Lines или CSV: файл разбирается порциями в пуле процессов '
+                    'и записывается несколькими подключениями. Явно указанные id и created сохраняются, '
+                    'уже импортированные заметки пропускаются, а ID, занятые другими заметками, - ошибки'
+    )
+    import_parser.add_argument('file', help='Файл с заметками')
+    import_parser.add_argument('--format', choices=IMPORT_FORMATS, help='Формат файла (default: по расширению)')
+    import_parser.add_argument('--workers', type=int, help='Процессов разбора (default: по числу ядер)')
+    import_parser.add_argument('--connections', type=int, help='Подключений для записи (default: до 4)')
+    import_parser.set_defaults(func=import_cli)
+
+    # Команда export
+    export_parser = subparsers.add_parser(
+        'export',
+        help='Выгрузить заметки в файл',
+        description='Параллельная выгрузка в JSON Lines, CSV или колоночный снимок Arrow/Parquet '
+                    '(нужны pyarrow и numpy) по возрастанию ID'
+    )
+    export_parser.add_argument('file', help='Файл для выгрузки')
+    export_parser.add_argument('--format', choices=FORMATS, help='Формат файла (default: по расширению)')
+    export_parser.add_argument('--workers', type=int, help='Процессов (default: по числу ядер)')
+    export_parser.add_argument('--status', choices=STATUSES, help='Только заметки с этим статусом')
+    export_parser.add_argument('--tag', action='append', help='Только заметки с этим тегом (можно несколько)')
+    export_parser.set_defaults(func=export_cli)
+
+    # Команда report
+    report_parser = subparsers.add_parser(
+        'report',
+        help='Отчет по колоночному снимку',
+        description='Заметки по статусам и приоритетам, создано/выполнено по неделям и распределение '
+                    'длины текста по снимку export --format arrow|parquet, без обращения к БД'
+    )
+    report_parser.add_argument('snapshot', help='Файл снимка (.arrow или .parquet)')
+    report_parser.add_argument('--weeks', type=int, default=12, help='Сколько последних недель показать (default: 12)')
+    report_parser.set_defaults(func=report_cli)
+
+    # Команда sync-dir
+    sync_dir_parser = subparsers.add_parser(
+        'sync-dir',
+        help='Синхронизировать с каталогом Markdown',
+        description='Двусторонняя синхронизация: по файлу <id>-<заголовок>.md на заметку. '
+                    'Перезаписываются только изменившиеся файлы и заметки'
+    )
+    sync_dir_parser.add_argument('path', help='Каталог с заметками')
+    sync_dir_parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='Продолжать синхронизацию при изменениях (inotify, если установлен inotify_simple)'
+    )
+    sync_dir_parser.add_argument(
+        '--interval',
+        type=float,
+        default=2.0,
+        help='Период проверки изменений в БД, секунд (default: 2)'
+    )
+    sync_dir_parser.set_defaults(func=sync_dir_cli)
+
+    # Команда doctor
+    doctor_parser = subparsers.add_parser(
+        'doctor',
+        help='Диагностика производительности БД',
+        description='Планы запросов storage.py (EXPLAIN ANALYZE, BUFFERS), использование индексов, '
+                    'размеры таблиц и мертвые строки, pg_stat_statements (если установлен)'
+    )
+    doctor_parser.add_argument(
+        '--seq-scan-limit',
+        type=parse_size,
+        help='Размер таблицы, полное чтение которой считается проблемой (default: DB_SEQ_SCAN_LIMIT или 8MB)'
+    )
+    doctor_parser.add_argument(
+        '--fail-on-seq-scan',
+        action='store_true',
+        help='Завершиться с кодом 1, если запрос читает целиком таблицу больше порога (для тестов и CI)'
+    )
+    doctor_parser.set_defaults(func=doctor_cli)
+
+    # Команда shell
+    shell_parser = subparsers.add_parser(
+        'shell',
+        help='Интерактивный режим',
+        description='Команды вводятся как в командной строке и выполняются через одно подключение к БД; '
+                    'list и search отвечают из кэша заметок, после каждой команды выводится время'
+    )
+    shell_parser.add_argument('--no-pager', action='store_true', help='Не использовать пейджер для длинного вывода')
+    shell_parser.set_defaults(func=shell_cli, parser=parser)
+
     # Общий аргумент для GUI
     parser.add_argument(
         '--gui',
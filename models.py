@@ -7,6 +7,33 @@
 
 import datetime
 
+from .compression import unpack_body
+
+# Допустимые значения статуса и приоритета (в порядке "от начала к концу")
+STATUSES = ("todo", "in_progress", "done")
+PRIORITIES = ("low", "medium", "high")
+
+# Числовые ранги для сортировки (а не по алфавиту: high < low < medium)
+STATUS_RANK = {status: rank for rank, status in enumerate(STATUSES, start=1)}
+PRIORITY_RANK = {priority: rank for rank, priority in enumerate(PRIORITIES, start=1)}
+
+
+def normalize_tags(tags):
+    """
+    Приводит теги к единому виду: нижний регистр, без пробелов по краям и повторов.
+
+    Args:
+        tags (iterable[str] | str): Теги (строку можно передать через запятую)
+
+    Returns:
+        list[str]: Отсортированный список тегов
+    """
+    if not tags:
+        return []
+    if isinstance(tags, str):
+        tags = tags.split(",")
+    return sorted({tag.strip().lower() for tag in tags if tag and tag.strip()})
+
 
 class Note:
     """
@@ -19,9 +46,12 @@ class Note:
         status (str): Статус заметки (todo/in_progress/done)
         priority (str): Приоритет заметки (low/medium/high)
         created (str): Дата и время создания в формате 'YYYY-MM-DD HH:MM'
+        updated (datetime.datetime): Время последнего изменения в БД (None - еще не сохранена)
+        body_length (int): Полная длина текста; больше len(body), если загружено только начало
+        tags (list[str]): Теги заметки (см. normalize_tags)
     """
 
-    def __init__(self, id, title, body, status="todo", priority="medium"):
+    def __init__(self, id, title, body, status="todo", priority="medium", created=None, tags=()):
         """
         Инициализирует новую заметку.
 
@@ -31,13 +61,57 @@ class Note:
             body (str): Текст заметки
             status (str): Статус заметки (default: "todo")
             priority (str): Приоритет заметки (default: "medium")
+            created (str): Дата создания (default: текущее время)
+            tags (iterable[str]): Теги заметки
         """
         self.id = id
         self.title = title
         self.body = body
         self.status = status
         self.priority = priority
-        self.created = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+        self.created = created or datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+        self.updated = None
+        self.body_length = len(body)
+        self.tags = normalize_tags(tags)
+
+    @property
+    def body(self):
+        """Текст заметки (сжатый текст распаковывается при первом обращении)."""
+        if self._body is None:
+            self._body = unpack_body(*self._packed)
+            self._packed = None
+        return self._body
+
+    @body.setter
+    def body(self, value):
+        self._body = value
+        self._packed = None
+
+    def set_packed_body(self, payload, codec, length, digest=None):
+        """
+        Задает сжатый текст заметки (см. compression.py), не распаковывая его.
+
+        Args:
+            payload (bytes): Сжатый текст
+            codec (str): Алгоритм сжатия
+            length (int): Длина текста в символах
+            digest (bytes, optional): Хэш SHA-256 текста для проверки
+        """
+        self._body = None
+        self._packed = (payload, codec, digest)
+        self.body_length = length
+
+    @property
+    def packed(self):
+        """Хранится ли текст в сжатом виде (еще не распакован)."""
+        return self._body is None
+
+    @property
+    def body_complete(self):
+        """Загружен ли текст заметки целиком."""
+        if self._body is None:
+            return True  # Сжатый текст всегда загружается целиком
+        return len(self._body) >= self.body_length
 
     def to_dict(self):
         """
@@ -52,7 +126,9 @@ class Note:
             "body": self.body,
             "status": self.status,
             "priority": self.priority,
-            "created": self.created
+            "created": self.created,
+            "updated": self.updated.isoformat() if self.updated else None,
+            "tags": self.tags
         }
 
     @staticmethod
@@ -71,9 +147,12 @@ class Note:
             data["title"],
             data["body"],
             data.get("status", "todo"),
-            data.get("priority", "medium")
+            data.get("priority", "medium"),
+            tags=data.get("tags", ())
         )
         note.created = data.get("created", note.created)
+        if data.get("updated"):
+            note.updated = datetime.datetime.fromisoformat(data["updated"])
         return note
 
     def __repr__(self):
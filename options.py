@@ -0,0 +1,53 @@
+"""
+options.py
+Модуль значений по умолчанию и преобразований аргументов командной строки.
+
+Их использует парсер main.py, поэтому модуль не импортирует ничего
+тяжелого (NumPy, pyarrow, модули команд): разбор аргументов не должен
+замедлять запуск и не должен зависеть от необязательных пакетов.
+Модули команд (dedupe.py, transfer.py, analytics.py, doctor.py)
+берут эти значения отсюда.
+"""
+
+import re
+
+# Порог сходства заметок по умолчанию для dedupe (см. dedupe.py)
+DEFAULT_THRESHOLD = 0.8
+
+# Форматы колоночных снимков (см. analytics.py)
+SNAPSHOT_FORMATS = ("arrow", "parquet")
+
+# Форматы импорта; экспорт поддерживает также колоночные снимки (см. transfer.py)
+IMPORT_FORMATS = ("jsonl", "csv")
+FORMATS = IMPORT_FORMATS + SNAPSHOT_FORMATS
+
+_SIZE_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(b|kb|mb|gb|tb)?\s*$", re.IGNORECASE)
+_SIZE_UNITS = {"b": 1, "kb": 2**10, "mb": 2**20, "gb": 2**30, "tb": 2**40}
+
+
+def parse_size(value):
+    """
+    Преобразует размер вида 8MB, 512kB или 1048576 в байты.
+
+    Args:
+        value (str): Число и необязательная единица (B, kB, MB, GB, TB)
+
+    Returns:
+        int: Размер в байтах
+
+    Raises:
+        ValueError: Если размер записан неверно
+    """
+    match = _SIZE_RE.match(str(value))
+    if not match:
+        raise ValueError(f"неверный размер '{value}', ожидается например 8MB, 512kB")
+    return int(float(match.group(1)) * _SIZE_UNITS[(match.group(2) or "b").lower()])
+
+
+def format_size(size):
+    """Форматирует размер в байтах для вывода (например, 12.5 MB)."""
+    for unit in ("B", "kB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
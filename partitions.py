@@ -0,0 +1,242 @@
+"""
+partitions.py
+Модуль секционирования таблицы notes по месяцам.
+
+Включается переменной окружения DB_PARTITIONED=1. Тогда таблица notes
+секционируется по диапазонам created (одна секция на месяц), секции на
+DB_PARTITION_MONTHS_AHEAD месяцев вперед создаются автоматически при
+инициализации БД, а секции старше DB_PARTITION_RETENTION_MONTHS месяцев
+(если задано) отсоединяются от таблицы и остаются отдельными таблицами.
+Заметки отсоединяемой секции копируются в архив (notes_archive): клиенты
+синхронизации узнают о них как о перенесенных в архив (changes_since).
+
+Обслуживание секций выполняется раз в месяц и при изменении настроек:
+после него на секцию по умолчанию ставится отметка (partition_marker()),
+и пока она актуальна, инициализация БД секции не проверяет.
+"""
+
+import datetime
+import os
+import re
+
+# Имя секции: notes_y2026m01
+PARTITION_NAME_RE = re.compile(r"^notes_y(\d{4})m(\d{2})$")
+
+
+def partitioning_enabled():
+    """Проверяет, включено ли секционирование (DB_PARTITIONED)."""
+    return os.getenv('DB_PARTITIONED', '').lower() in ('1', 'true', 'yes')
+
+
+def _month_start(value):
+    """Возвращает первое число месяца для даты."""
+    return datetime.date(value.year, value.month, 1)
+
+
+def _add_months(month, count):
+    """Сдвигает первое число месяца на count месяцев."""
+    index = month.year * 12 + month.month - 1 + count
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def partition_marker():
+    """
+    Возвращает отметку обслуживания секций для текущего месяца и настроек.
+
+    Returns:
+        str: Комментарий секции notes_default после manage_partitions()
+    """
+    return "notebookk partitions {:%Y-%m} ahead={} retention={}".format(
+        datetime.date.today(),
+        os.getenv('DB_PARTITION_MONTHS_AHEAD', '3'),
+        os.getenv('DB_PARTITION_RETENTION_MONTHS', '')
+    )
+
+
+def partition_name(month):
+    """Возвращает имя секции для месяца."""
+    return f"notes_y{month.year:04d}m{month.month:02d}"
+
+
+def is_partitioned(cursor):
+    """
+    Проверяет, является ли таблица notes секционированной.
+
+    Args:
+        cursor: Курсор БД
+
+    Returns:
+        bool: True, если notes - секционированная таблица
+    """
+    cursor.execute("SELECT relkind FROM pg_class WHERE oid = 'notes'::regclass")
+    return cursor.fetchone()['relkind'] == 'p'
+
+
+def create_partition(cursor, month):
+    """
+    Создает секцию для месяца, если ее еще нет.
+
+    Args:
+        cursor: Курсор БД
+        month (datetime.date): Первое число месяца
+    """
+    name = partition_name(month)
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL AS exists", (name,))
+    if cursor.fetchone()['exists']:
+        return
+
+    # Секцию нельзя создать, если строки за этот месяц уже попали в секцию по умолчанию
+    cursor.execute("SELECT to_regclass('notes_default') IS NOT NULL AS exists")
+    if cursor.fetchone()['exists']:
+        cursor.execute("""
+            SELECT 1 FROM notes_default WHERE created >= %s AND created < %s LIMIT 1
+        """, (month, _add_months(month, 1)))
+        if cursor.fetchone():
+            print(f"⚠️ Секция {name} не создана: данные за этот месяц уже в notes_default")
+            return
+
+    cursor.execute(f"""
+        CREATE TABLE {name}
+        PARTITION OF notes
+        FOR VALUES FROM (%s) TO (%s)
+    """, (month, _add_months(month, 1)))
+
+
+def convert_to_partitioned(cursor):
+    """
+    Переносит данные из обычной таблицы notes в секционированную.
+
+    Выполняется в одной транзакции: старая таблица переименовывается,
+    создается секционированная notes с теми же колонками, секциями
+    для всех месяцев с данными и секцией по умолчанию, данные копируются,
+    последовательность id передается новой таблице, старая удаляется.
+    Первичный ключ становится (id, created) - секционированная таблица
+    требует наличия ключа секционирования в уникальных ограничениях.
+
+    Args:
+        cursor: Курсор открытой транзакции
+    """
+    print("🔧 Миграция: секционирование таблицы notes по месяцам")
+
+    cursor.execute("UPDATE notes SET created = COALESCE(updated, CURRENT_TIMESTAMP) WHERE created IS NULL")
+    cursor.execute("ALTER TABLE notes RENAME TO notes_unpartitioned")
+    cursor.execute("ALTER INDEX notes_pkey RENAME TO notes_unpartitioned_pkey")
+
+    cursor.execute("""
+        CREATE TABLE notes (
+            LIKE notes_unpartitioned INCLUDING DEFAULTS INCLUDING GENERATED INCLUDING CONSTRAINTS
+        ) PARTITION BY RANGE (created)
+    """)
+    cursor.execute("ALTER TABLE notes ALTER COLUMN created SET NOT NULL")
+    cursor.execute("ALTER TABLE notes ADD PRIMARY KEY (id, created)")
+    cursor.execute("CREATE TABLE IF NOT EXISTS notes_default PARTITION OF notes DEFAULT")
+
+    # Секции для всех месяцев, за которые есть данные
+    cursor.execute("SELECT MIN(created) AS first, MAX(created) AS last FROM notes_unpartitioned")
+    bounds = cursor.fetchone()
+    if bounds['first'] is not None:
+        month = _month_start(bounds['first'])
+        while month <= bounds['last'].date():
+            create_partition(cursor, month)
+            month = _add_months(month, 1)
+
+    # Копируем все колонки, кроме вычисляемых
+    cursor.execute("""
+        SELECT column_name
+        FROM information_schema.columns
+        WHERE table_name = 'notes_unpartitioned' AND is_generated = 'NEVER'
+        ORDER BY ordinal_position
+    """)
+    columns = ", ".join(row['column_name'] for row in cursor.fetchall())
+    cursor.execute(f"INSERT INTO notes ({columns}) SELECT {columns} FROM notes_unpartitioned")
+
+    cursor.execute("ALTER SEQUENCE notes_id_seq OWNED BY notes.id")
+    cursor.execute("DROP TABLE notes_unpartitioned")
+
+
+def ensure_partitions(cursor, months_ahead=None):
+    """
+    Создает секции для текущего и следующих месяцев.
+
+    Args:
+        cursor: Курсор БД
+        months_ahead (int, optional): Сколько месяцев вперед
+            (по умолчанию DB_PARTITION_MONTHS_AHEAD или 3)
+    """
+    if months_ahead is None:
+        months_ahead = int(os.getenv('DB_PARTITION_MONTHS_AHEAD', '3'))
+    month = _month_start(datetime.date.today())
+    for offset in range(months_ahead + 1):
+        create_partition(cursor, _add_months(month, offset))
+
+
+def detach_old_partitions(cursor, retention_months=None):
+    """
+    Отсоединяет секции старше срока хранения.
+
+    Отсоединенная секция остается обычной таблицей с тем же именем:
+    ее можно заархивировать или удалить, а запросы к notes ее больше не читают.
+    Заметки секции (кроме удаленных) перед отсоединением копируются в архив
+    notes_archive: иначе клиенты синхронизации не узнали бы, что их больше нет.
+
+    Args:
+        cursor: Курсор БД
+        retention_months (int, optional): Срок хранения в месяцах
+            (по умолчанию DB_PARTITION_RETENTION_MONTHS; не задан - ничего не делать)
+
+    Returns:
+        list[str]: Имена отсоединенных секций
+    """
+    if retention_months is None:
+        value = os.getenv('DB_PARTITION_RETENTION_MONTHS')
+        if not value:
+            return []
+        retention_months = int(value)
+
+    cutoff = _add_months(_month_start(datetime.date.today()), -retention_months)
+    cursor.execute("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'notes'::regclass
+    """)
+
+    detached = []
+    for row in cursor.fetchall():
+        match = PARTITION_NAME_RE.match(row['relname'])
+        if not match:
+            continue
+        month = datetime.date(int(match.group(1)), int(match.group(2)), 1)
+        if _add_months(month, 1) <= cutoff:
+            cursor.execute(f"""
+                INSERT INTO notes_archive (id, title, body, body_z, body_codec, body_length, body_hash,
+                                           status, priority, tags, created, updated)
+                SELECT id, title, body, body_z, body_codec, body_length, body_hash,
+                       status, priority, tags, created, updated
+                FROM {row['relname']}
+                WHERE NOT deleted
+                ON CONFLICT (id) DO NOTHING
+            """)
+            cursor.execute(f"ALTER TABLE notes DETACH PARTITION {row['relname']}")
+            detached.append(row['relname'])
+            print(f"📦 Секция {row['relname']} отсоединена от notes")
+    return detached
+
+
+def manage_partitions(cursor):
+    """
+    Приводит секционирование в соответствие с настройками:
+    при необходимости преобразует таблицу, создает будущие секции
+    и отсоединяет устаревшие. Ничего не делает, если DB_PARTITIONED не задан.
+    Таблица notes_archive уже должна существовать (см. detach_old_partitions).
+
+    Args:
+        cursor: Курсор открытой транзакции
+    """
+    if not partitioning_enabled():
+        return
+    if not is_partitioned(cursor):
+        convert_to_partitioned(cursor)
+    ensure_partitions(cursor)
+    detach_old_partitions(cursor)
+    cursor.execute(f"COMMENT ON TABLE notes_default IS '{partition_marker()}'")
@@ -0,0 +1,73 @@
+"""
+paths.py
+Модуль общих помощников для локальных файлов приложения.
+
+Локальные файлы (снимок списка для GUI, журнал отложенной записи, кэш
+подписей MinHash, история shell) хранятся в каталоге ~/.notebookk.
+Если содержимое файла относится к конкретной БД, в его имя добавляются
+хост, порт и имя БД, поэтому разные базы не перезаписывают файлы друг друга.
+
+Время в двоичных форматах (снимок, кэш подписей, колоночные снимки)
+хранится как целое число микросекунд от 1970-01-01 (to_micros/from_micros).
+"""
+
+import datetime
+import os
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def data_dir():
+    """Возвращает каталог локальных файлов (~/.notebookk)."""
+    return os.path.join(os.path.expanduser("~"), ".notebookk")
+
+
+def data_file(env_var, name, per_database=True):
+    """
+    Возвращает путь к локальному файлу приложения.
+
+    Args:
+        env_var (str): Переменная окружения, которой путь можно задать явно
+        name (str): Имя файла, например "snapshot.bin"
+        per_database (bool): Свой файл для каждой БД: "snapshot-<хост>-<порт>-<БД>.bin"
+
+    Returns:
+        str: Путь к файлу
+    """
+    path = os.getenv(env_var)
+    if path:
+        return path
+    if per_database:
+        stem, ext = os.path.splitext(name)
+        name = "{}-{}-{}-{}{}".format(
+            stem,
+            os.getenv('DB_HOST', 'localhost'),
+            os.getenv('DB_PORT', '5432'),
+            os.getenv('DB_NAME', 'notebookk_db'),
+            ext
+        )
+    return os.path.join(data_dir(), name)
+
+
+def to_micros(value):
+    """
+    Переводит время в микросекунды от 1970-01-01 (без учета часового пояса).
+
+    Args:
+        value (datetime.datetime | str | None): Время или строка ISO 8601
+
+    Returns:
+        int: Микросекунды (-1, если времени нет)
+    """
+    if not value:
+        return -1
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value)
+    return (value.replace(tzinfo=None) - EPOCH) // datetime.timedelta(microseconds=1)
+
+
+def from_micros(value):
+    """Обратное к to_micros() преобразование (None для -1)."""
+    if value < 0:
+        return None
+    return EPOCH + datetime.timedelta(microseconds=int(value))
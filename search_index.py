@@ -0,0 +1,434 @@
+"""
+search_index.py
+Модуль индексов для быстрого поиска и фильтрации заметок в GUI.
+
+Содержит классы:
+- SearchIndex - инвертированный индекс по словам заметок
+- FacetIndex - множества ID заметок по значениям статуса/приоритета
+- SortIndex - кэш отсортированных перестановок для колонок таблицы
+Все индексы обновляются инкрементально при добавлении/удалении заметок.
+"""
+
+import bisect
+import re
+
+from .models import STATUS_RANK, PRIORITY_RANK
+
+# Слово - непрерывная последовательность букв, цифр и подчеркиваний (включая кириллицу)
+TOKEN_RE = re.compile(r"\w+")
+
+# Длина n-грамм для индекса по словарю
+GRAM_SIZE = 3
+
+# Если кандидатов меньше, оставшиеся слова запроса проверяются по тексту, без индекса
+VERIFY_LIMIT = 2000
+
+# Если фильтр оставил меньше 1/SMALL_SELECTION заметок, SortIndex.ordered()
+# сортирует только их, а не перебирает всю перестановку
+SMALL_SELECTION = 8
+
+
+def normalize(text):
+    """
+    Приводит текст к виду, в котором он хранится в индексе.
+
+    Args:
+        text (str): Исходный текст
+
+    Returns:
+        str: Текст в нижнем регистре
+    """
+    return text.lower()
+
+
+def _grams(token):
+    """Возвращает множество n-грамм слова (для слов короче GRAM_SIZE - пустое)."""
+    return {token[i:i + GRAM_SIZE] for i in range(len(token) - GRAM_SIZE + 1)}
+
+
+class SearchIndex:
+    """
+    Инвертированный индекс по заголовкам и текстам заметок.
+
+    Для каждого слова хранится список (множество) ID заметок, в которых оно
+    встречается. Поверх словаря построен индекс по n-граммам, поэтому поиск
+    подстроки (и префикса) внутри слова не требует перебора всех заметок:
+    для каждого слова запроса находятся подходящие слова словаря, их
+    списки объединяются, а списки разных слов запроса пересекаются.
+    Оставшиеся кандидаты проверяются по нормализованному тексту, так что
+    результат совпадает с обычным поиском подстроки.
+
+    Attributes:
+        texts (dict[int, str]): Нормализованный текст заметки по ее ID
+    """
+
+    def __init__(self, notes=()):
+        """
+        Строит индекс по списку заметок.
+
+        Args:
+            notes (iterable[Note]): Заметки для индексации
+        """
+        self.texts = {}
+        self._postings = {}   # слово -> множество ID заметок
+        self._grams = {}      # n-грамма -> множество слов словаря
+        self._last = None     # (запрос, результат) предыдущего поиска
+        for note in notes:
+            self.add(note)
+
+    def __len__(self):
+        return len(self.texts)
+
+    def add(self, note):
+        """
+        Добавляет заметку в индекс (или переиндексирует уже существующую).
+
+        Args:
+            note (Note): Заметка для индексации
+        """
+        if note.id in self.texts:
+            self.remove(note.id)
+        self._last = None
+
+        # Разделитель \x00 не может встретиться в запросе, поэтому
+        # совпадение "через границу" заголовка и текста невозможно
+        text = normalize(note.title) + "\x00" + normalize(note.body)
+        self.texts[note.id] = text
+
+        for token in set(TOKEN_RE.findall(text)):
+            ids = self._postings.get(token)
+            if ids is None:
+                # Новое слово в словаре - индексируем его n-граммы
+                ids = self._postings[token] = set()
+                for gram in _grams(token):
+                    self._grams.setdefault(gram, set()).add(token)
+            ids.add(note.id)
+
+    def remove(self, note_id):
+        """
+        Удаляет заметку из индекса.
+
+        Args:
+            note_id (int): ID заметки
+        """
+        text = self.texts.pop(note_id, None)
+        if text is None:
+            return
+        self._last = None
+
+        for token in set(TOKEN_RE.findall(text)):
+            ids = self._postings.get(token)
+            if ids is None:
+                continue
+            ids.discard(note_id)
+            if not ids:
+                # Слово больше нигде не встречается - убираем его из словаря
+                del self._postings[token]
+                for gram in _grams(token):
+                    tokens = self._grams.get(gram)
+                    if tokens is not None:
+                        tokens.discard(token)
+                        if not tokens:
+                            del self._grams[gram]
+
+    def _tokens_containing(self, fragment):
+        """
+        Находит слова словаря, содержащие заданный фрагмент.
+
+        Args:
+            fragment (str): Нормализованный фрагмент слова
+
+        Returns:
+            iterable[str]: Подходящие слова словаря
+        """
+        if len(fragment) < GRAM_SIZE:
+            # Для коротких фрагментов перебираем словарь - он намного меньше текстов
+            return [token for token in self._postings if fragment in token]
+
+        # Пересекаем множества слов по всем n-граммам фрагмента, начиная с самого короткого
+        candidates = None
+        for gram in sorted(_grams(fragment), key=lambda g: len(self._grams.get(g, ()))):
+            tokens = self._grams.get(gram)
+            if not tokens:
+                return []
+            candidates = set(tokens) if candidates is None else candidates & tokens
+            if not candidates:
+                return []
+        return [token for token in candidates if fragment in token]
+
+    def search(self, query):
+        """
+        Ищет заметки, в заголовке или тексте которых есть подстрока query.
+
+        Args:
+            query (str): Поисковый запрос (регистр не учитывается)
+
+        Returns:
+            set[int]: Множество ID найденных заметок
+        """
+        query = normalize(query)
+        if not query:
+            return set(self.texts)
+
+        # При наборе запрос обычно уточняет предыдущий - ищем среди его результатов
+        if self._last is not None and self._last[0] in query:
+            result = {note_id for note_id in self._last[1] if query in self.texts[note_id]}
+        else:
+            result = self._search(query)
+        self._last = (query, result)
+        return set(result)
+
+    def _search(self, query):
+        """Поиск по индексу без учета предыдущего запроса (query уже нормализован)."""
+        # Самые длинные фрагменты обычно самые избирательные
+        fragments = sorted(set(TOKEN_RE.findall(query)), key=len, reverse=True)
+        if not fragments or len(fragments[0]) < 2:
+            # Нет букв и цифр или только одиночные символы - индекс не поможет,
+            # проверка текстов обойдется дешевле объединения огромных списков
+            return {note_id for note_id, text in self.texts.items() if query in text}
+
+        # Для каждого фрагмента запроса собираем заметки, где есть подходящее слово,
+        # и пересекаем с уже найденными кандидатами
+        candidates = None
+        for fragment in fragments:
+            if candidates is not None and len(candidates) <= VERIFY_LIMIT:
+                break
+            ids = set()
+            for token in self._tokens_containing(fragment):
+                ids |= self._postings[token]
+            candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                return set()
+
+        # Окончательная проверка: запрос может состоять из нескольких слов
+        return {note_id for note_id in candidates if query in self.texts[note_id]}
+
+
+class FacetIndex:
+    """
+    Индекс заметок по значениям полей (фасетам), например статусу и приоритету.
+
+    Для каждого значения поля хранится множество ID заметок, поэтому
+    комбинация фильтров вычисляется пересечением множеств, а количество
+    заметок для каждого значения известно без перебора списка.
+    Многозначные поля (например, теги) индексируются по каждому значению.
+    """
+
+    def __init__(self, fields, notes=(), multi=()):
+        """
+        Строит индекс по списку заметок.
+
+        Args:
+            fields (iterable[str]): Имена атрибутов Note, по которым строится индекс
+            notes (iterable[Note]): Заметки для индексации
+            multi (iterable[str]): Поля из fields, значения которых - списки
+        """
+        self.fields = tuple(fields)
+        self.multi = frozenset(multi)
+        self._ids = {field: {} for field in self.fields}  # поле -> значение -> множество ID
+        self._values = {}                                  # ID -> значения полей
+        for note in notes:
+            self.add(note)
+
+    def add(self, note):
+        """
+        Добавляет заметку в индекс (или обновляет значения уже существующей).
+
+        Args:
+            note (Note): Заметка для индексации
+        """
+        self.remove(note.id)
+        values = tuple(
+            tuple(getattr(note, field)) if field in self.multi else getattr(note, field)
+            for field in self.fields
+        )
+        self._values[note.id] = values
+        for field, value in self._pairs(values):
+            self._ids[field].setdefault(value, set()).add(note.id)
+
+    def remove(self, note_id):
+        """
+        Удаляет заметку из индекса.
+
+        Args:
+            note_id (int): ID заметки
+        """
+        values = self._values.pop(note_id, None)
+        if values is None:
+            return
+        for field, value in self._pairs(values):
+            ids = self._ids[field][value]
+            ids.discard(note_id)
+            if not ids and field in self.multi:
+                # Значения многозначных полей не ограничены - пустые не храним
+                del self._ids[field][value]
+
+    def _pairs(self, values):
+        """Перебирает пары (поле, значение), раскрывая многозначные поля."""
+        for field, value in zip(self.fields, values):
+            if field in self.multi:
+                for item in value:
+                    yield field, item
+            else:
+                yield field, value
+
+    def ids(self, field, value):
+        """
+        Возвращает множество ID заметок с заданным значением поля.
+
+        Args:
+            field (str): Имя поля
+            value (str): Значение поля
+
+        Returns:
+            set[int]: Множество ID (не изменять - это внутренние данные индекса)
+        """
+        return self._ids[field].get(value, set())
+
+    def select(self, **filters):
+        """
+        Находит заметки, подходящие под все фильтры сразу.
+
+        Args:
+            **filters: Значения полей; пустые значения не фильтруют
+
+        Returns:
+            set[int] | None: Множество ID или None, если ни один фильтр не задан
+        """
+        sets = sorted(
+            (self.ids(field, value) for field, value in filters.items() if value),
+            key=len
+        )
+        if not sets:
+            return None
+        return sets[0].intersection(*sets[1:])
+
+    def counts(self, field, within=None):
+        """
+        Считает количество заметок для каждого значения поля.
+
+        Args:
+            field (str): Имя поля
+            within (set[int] | None): Учитывать только эти ID (None - все заметки)
+
+        Returns:
+            dict[str, int]: Количество заметок по значениям поля
+        """
+        if within is None:
+            return {value: len(ids) for value, ids in self._ids[field].items()}
+        return {value: len(ids & within) for value, ids in self._ids[field].items()}
+
+
+# Ключи сортировки по колонкам таблицы. ID в конце ключа делает его
+# уникальным, поэтому порядок устойчив и заметку легко найти бинарным поиском.
+# Дата создания хранится как 'YYYY-MM-DD HH:MM' - строки в этом формате
+# сравниваются в хронологическом порядке.
+SORT_KEYS = {
+    "id": lambda note: note.id,
+    "title": lambda note: (note.title.casefold(), note.id),
+    "status": lambda note: (STATUS_RANK.get(note.status, 0), note.id),
+    "priority": lambda note: (PRIORITY_RANK.get(note.priority, 0), note.id),
+    "tags": lambda note: (note.tags, note.id),
+    "created": lambda note: (note.created or "", note.id),
+}
+
+
+class SortIndex:
+    """
+    Кэш отсортированных перестановок ID заметок по колонкам.
+
+    Перестановка для колонки строится при первой сортировке, а затем
+    поддерживается вставкой/удалением бинарным поиском, поэтому повторная
+    сортировка (в том числе в обратном порядке) не требует пересортировки.
+    """
+
+    def __init__(self, notes=(), keys=None):
+        """
+        Args:
+            notes (iterable[Note]): Заметки для индексации
+            keys (dict[str, callable], optional): Ключи сортировки (по умолчанию SORT_KEYS)
+        """
+        self.keys = keys or SORT_KEYS
+        self._notes = {note.id: note for note in notes}
+        self._orders = {}  # колонка -> список ID по возрастанию ключа
+
+    def add(self, note):
+        """
+        Добавляет (или обновляет) заметку во всех построенных перестановках.
+
+        Args:
+            note (Note): Заметка
+        """
+        self.remove(note.id)
+        self._notes[note.id] = note
+        for column, order in self._orders.items():
+            key = self.keys[column]
+            bisect.insort(order, note.id, key=lambda note_id: key(self._notes[note_id]))
+
+    def remove(self, note_id):
+        """
+        Удаляет заметку из всех построенных перестановок.
+
+        Args:
+            note_id (int): ID заметки
+        """
+        note = self._notes.get(note_id)
+        if note is None:
+            return
+        for column, order in self._orders.items():
+            key = self.keys[column]
+            pos = bisect.bisect_left(order, key(note), key=lambda other_id: key(self._notes[other_id]))
+            if pos < len(order) and order[pos] == note_id:
+                del order[pos]
+        del self._notes[note_id]
+
+    def get(self, note_id):
+        """Возвращает заметку по ID (None, если ее нет в индексе)."""
+        return self._notes.get(note_id)
+
+    def order(self, column, descending=False):
+        """
+        Возвращает ID заметок, отсортированные по колонке.
+
+        Args:
+            column (str): Имя колонки (ключ SORT_KEYS)
+            descending (bool): Сортировать по убыванию
+
+        Returns:
+            list[int]: ID заметок в порядке сортировки
+        """
+        order = self._orders.get(column)
+        if order is None:
+            key = self.keys[column]
+            order = self._orders[column] = sorted(
+                self._notes, key=lambda note_id: key(self._notes[note_id])
+            )
+        return order[::-1] if descending else order
+
+    def ordered(self, column, descending=False, within=None):
+        """
+        Перебирает ID заметок в порядке сортировки по колонке.
+
+        Итератор ленивый: чтобы показать первые строки таблицы, не нужно
+        перебирать все заметки. Если фильтр оставил немного заметок,
+        сортируются только они.
+
+        Args:
+            column (str): Имя колонки (ключ SORT_KEYS)
+            descending (bool): Сортировать по убыванию
+            within (set[int] | None): Только эти ID (None - все заметки)
+
+        Returns:
+            iterator[int]: ID заметок в порядке сортировки
+        """
+        if within is not None and len(within) * SMALL_SELECTION < len(self._notes):
+            key = self.keys[column]
+            found = [note_id for note_id in within if note_id in self._notes]
+            return iter(sorted(found, key=lambda note_id: key(self._notes[note_id]), reverse=descending))
+
+        self.order(column)
+        order = self._orders[column]
+        ids = reversed(order) if descending else iter(order)
+        if within is None:
+            return ids
+        return (note_id for note_id in ids if note_id in within)
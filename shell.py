@@ -0,0 +1,298 @@
+"""
+shell.py
+Модуль интерактивного режима (команда shell).
+
+Команды вводятся так же, как в командной строке (list --status todo,
+search --keyword важно, delete --id 3 ...), и разбираются тем же
+парсером setup_cli_parser(), но выполняются в одном процессе:
+- все запросы идут через одно подключение (Database.session()),
+  при потере связи оно открывается заново;
+- list и search без --include-archive отвечают из кэша заметок
+  (NoteCache), который перед каждой командой дополняется изменениями
+  из БД (changes_since) - результат такой же свежий, как при запросе к БД;
+- длинный вывод list, search и других просмотровых команд
+  показывается через пейджер ($PAGER, по умолчанию less);
+- после каждой команды выводится время ее выполнения;
+- история команд сохраняется между запусками (если доступен readline).
+"""
+
+import contextlib
+import io
+import os
+import pydoc
+import shlex
+import shutil
+import sys
+import time
+
+try:
+    import readline
+except ImportError:  # Необязательная зависимость (нет в Windows)
+    readline = None
+
+from .commands import list_notes, search_notes_cli
+from .database import Database, init_db
+from .models import normalize_tags
+from .paths import data_file
+from .storage import changes_since, load_notes, search_notes
+
+# Команды, вывод которых показывается через пейджер (остальные могут
+# работать долго или ждать действий пользователя и выводят сразу)
+PAGED_COMMANDS = ("list", "search", "next", "tags", "report", "doctor")
+
+# Команды, недоступные внутри shell
+EXCLUDED_COMMANDS = ("shell",)
+
+# Команды выхода
+EXIT_COMMANDS = ("exit", "quit")
+
+HISTORY_LENGTH = 1000
+
+
+def history_path():
+    """
+    Возвращает путь к файлу истории команд (NOTEBOOKK_SHELL_HISTORY,
+    по умолчанию ~/.notebookk/shell_history - общий для всех БД).
+
+    Returns:
+        str: Путь к файлу истории
+    """
+    return data_file('NOTEBOOKK_SHELL_HISTORY', 'shell_history', per_database=False)
+
+
+class NoteCache:
+    """
+    Кэш заметок (без архива), обновляемый по изменениям из БД.
+
+    Первое обращение загружает все заметки, следующие - только изменения
+    после курсора синхронизации (запрос по индексу idx_notes_updated).
+
+    Attributes:
+        notes (dict): ID -> Note
+        cursor (datetime.datetime | None): Курсор синхронизации (None - кэш пуст)
+    """
+
+    def __init__(self):
+        self.notes = {}
+        self.cursor = None
+
+    def refresh(self):
+        """Применяет изменения из БД, накопившиеся после прошлого обновления."""
+        changed, deleted_ids, cursor = changes_since(self.cursor)
+        for note_id in deleted_ids:
+            self.notes.pop(note_id, None)
+        for note in changed:
+            self.notes[note.id] = note
+        self.cursor = cursor
+
+    def load_notes(self, status=None, priority=None, since=None, until=None, include_archive=False,
+                   body_limit=None, tags=None):
+        """
+        Аналог storage.load_notes() по кэшу (с архивом - запрос к БД).
+
+        Returns:
+            list[Note]: Заметки, новые сверху
+        """
+        if include_archive:
+            return load_notes(status=status, priority=priority, since=since, until=until,
+                              include_archive=True, body_limit=body_limit, tags=tags)
+        self.refresh()
+        tags = set(normalize_tags(tags or ()))
+        since = since.isoformat() if since else None
+        until = until.isoformat() if until else None
+        notes = [
+            note for note in self.notes.values()
+            if (not status or note.status == status)
+            and (not priority or note.priority == priority)
+            # created - строка 'YYYY-MM-DD HH:MM', даты сравниваются как строки
+            and (not since or note.created >= since)
+            and (not until or note.created[:10] <= until)
+            and tags.issubset(note.tags)
+        ]
+        notes.sort(key=lambda note: note.created, reverse=True)
+        return notes
+
+    def search_notes(self, keyword, include_archive=False, tags=None, include_compressed=False):
+        """
+        Аналог storage.search_notes() по кэшу (с архивом - запрос к БД).
+
+        Сжатые тексты уже загружены в кэш, поэтому в них ищется всегда.
+
+        Returns:
+            list[Note]: Заметки, в заголовке или тексте которых есть keyword
+        """
+        if include_archive:
+            return search_notes(keyword, include_archive=True, tags=tags, include_compressed=include_compressed)
+        needle = keyword.lower()
+        return [note for note in self.load_notes(tags=tags)
+                if needle in note.title.lower() or needle in note.body.lower()]
+
+
+class Shell:
+    """
+    Интерактивный цикл команд с одним подключением к БД.
+
+    Attributes:
+        parser (argparse.ArgumentParser): Парсер команд (setup_cli_parser())
+        cache (NoteCache): Кэш заметок для list и search
+        pager (bool): Показывать длинный вывод через пейджер
+    """
+
+    def __init__(self, parser, pager=True):
+        self.parser = parser
+        self.cache = NoteCache()
+        self.pager = pager and sys.stdout.isatty()
+        self.commands = sorted(
+            name for name in self._subcommands() if name not in EXCLUDED_COMMANDS
+        ) + list(EXIT_COMMANDS) + ["help"]
+
+    def _subcommands(self):
+        """Имена подкоманд парсера."""
+        for action in self.parser._subparsers._group_actions:
+            yield from action.choices
+
+    def _complete(self, text, state):
+        """Дополнение имени команды по Tab (readline)."""
+        if readline.get_begidx() > 0:
+            return None
+        matches = [name for name in self.commands if name.startswith(text)]
+        return matches[state] + " " if state < len(matches) else None
+
+    def _load_history(self):
+        """Подключает историю и дополнение команд (если доступен readline)."""
+        if readline is None:
+            return
+        readline.set_completer(self._complete)
+        readline.parse_and_bind("tab: complete")
+        readline.set_history_length(HISTORY_LENGTH)
+        with contextlib.suppress(OSError):
+            readline.read_history_file(history_path())
+
+    def _save_history(self):
+        """Сохраняет историю команд."""
+        if readline is None:
+            return
+        path = history_path()
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            readline.write_history_file(path)
+        except OSError as e:
+            print(f"⚠️ Не удалось сохранить историю команд: {e}")
+
+    def _dispatch(self, args):
+        """Вызывает обработчик команды (list и search - по кэшу заметок)."""
+        if args.func is list_notes:
+            list_notes(args, load=self.cache.load_notes)
+        elif args.func is search_notes_cli:
+            search_notes_cli(args, search=self.cache.search_notes)
+        else:
+            args.func(args)
+
+    def _show(self, output):
+        """Выводит результат команды, длинный - через пейджер."""
+        if self.pager and output.count("\n") > shutil.get_terminal_size().lines - 2:
+            pydoc.pager(output)
+        else:
+            sys.stdout.write(output)
+
+    def execute(self, line):
+        """
+        Выполняет одну строку ввода.
+
+        Args:
+            line (str): Команда с аргументами, как в командной строке
+
+        Returns:
+            bool: False, если введена команда выхода
+        """
+        try:
+            argv = shlex.split(line)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return True
+        if not argv:
+            return True
+        command = argv[0]
+        if command in EXIT_COMMANDS:
+            return False
+        if command == "help":
+            if len(argv) == 1:
+                self.parser.print_help()
+                return True
+            argv = argv[1:] + ["--help"]
+            command = argv[0]
+        if command in EXCLUDED_COMMANDS or command.startswith("-"):
+            print(f"❌ Команда {command} недоступна в shell (help - список команд)")
+            return True
+
+        started = time.perf_counter()
+        output = io.StringIO() if command in PAGED_COMMANDS else None
+        try:
+            # Ошибка разбора или --help завершают только эту команду
+            args = self.parser.parse_args(argv)
+            with contextlib.redirect_stdout(output) if output else contextlib.nullcontext():
+                self._dispatch(args)
+        except SystemExit:
+            pass
+        except KeyboardInterrupt:
+            print("\n⛔ Команда прервана")
+        except Exception as e:
+            print(f"❌ Ошибка: {e}")
+        elapsed = time.perf_counter() - started
+        if output:
+            self._show(output.getvalue())
+        print(f"⏱️ {elapsed * 1000:.1f} мс")
+        return True
+
+    def run(self):
+        """
+        Читает и выполняет команды, пока не будет введен exit или Ctrl+D.
+        """
+        self._load_history()
+        print("📝 notebookk shell: команды как в командной строке (list, search, delete ...), "
+              "help - справка, exit - выход")
+        try:
+            while True:
+                with Database.session() as conn:
+                    init_db()
+                    if not self._loop(conn):
+                        return
+                print("🔌 Соединение с БД потеряно - подключаюсь заново")
+        finally:
+            self._save_history()
+
+    def _loop(self, conn):
+        """
+        Цикл ввода на одном подключении.
+
+        Returns:
+            bool: True, если подключение потеряно и его нужно открыть заново
+        """
+        while True:
+            try:
+                line = input("notebookk> ")
+            except EOFError:
+                print()
+                return False
+            except KeyboardInterrupt:
+                print()
+                continue
+            if not self.execute(line):
+                return False
+            if conn.closed:
+                return True
+
+
+def shell_cli(args):
+    """
+    Запускает интерактивный режим.
+
+    Args:
+        args: Объект аргументов с полями:
+            - parser (argparse.ArgumentParser): Парсер команд
+            - no_pager (bool): Не использовать пейджер
+    """
+    try:
+        Shell(args.parser, pager=not args.no_pager).run()
+    except Exception as e:
+        print(f"❌ Не удалось подключиться к БД: {e}")
@@ -0,0 +1,134 @@
+"""
+snapshot.py
+Модуль локального снимка заметок для быстрого запуска GUI.
+
+Снимок - компактный двоичный файл с индексом заметок (все поля, кроме
+текста) и курсором синхронизации. При запуске он отображается в память
+(mmap) и сразу показывается в окне, а затем сверяется с БД через
+changes_since(). Тексты в снимок не входят: его размер и время чтения
+не зависят от объема текстов, а сами тексты загружаются из БД по
+требованию (см. NoteApp.build_search_index).
+
+Формат файла (little-endian):
+    заголовок: magic "NBKS", версия (uint16), число заметок (uint32),
+               курсор синхронизации в микросекундах (int64, -1 - нет)
+    записи:    id (int64), updated в микросекундах (int64, -1 - нет),
+               created (16 байт ASCII), номера status и priority в STATUSES
+               и PRIORITIES (uint8), длина title в символах (uint32), полная
+               длина текста в символах (uint32), длина строки в байтах (uint32),
+               затем строка UTF-8: title и теги (разделены символом \x1f)
+"""
+
+import mmap
+import os
+import struct
+
+from .models import Note, STATUSES, PRIORITIES
+from .paths import data_file, to_micros, from_micros
+
+SNAPSHOT_MAGIC = b"NBKS"
+SNAPSHOT_VERSION = 4
+
+_HEADER = struct.Struct("<4sHIq")
+_RECORD = struct.Struct("<qq16sBBIII")
+_TAG_SEPARATOR = "\x1f"
+
+
+def snapshot_path():
+    """
+    Возвращает путь к файлу снимка: NOTEBOOKK_SNAPSHOT или файл
+    snapshot-<хост>-<порт>-<БД>.bin в ~/.notebookk (см. paths.data_file).
+
+    Returns:
+        str: Путь к файлу снимка
+    """
+    return data_file('NOTEBOOKK_SNAPSHOT', 'snapshot.bin')
+
+
+def write_snapshot(notes, cursor_ts, path=None):
+    """
+    Записывает снимок заметок на диск.
+
+    Файл сначала пишется во временный, а затем атомарно заменяет старый,
+    поэтому прерванная запись не портит существующий снимок.
+
+    Args:
+        notes (list[Note]): Заметки для сохранения
+        cursor_ts (datetime.datetime | None): Курсор синхронизации с БД
+        path (str, optional): Путь к файлу (по умолчанию snapshot_path())
+    """
+    path = path or snapshot_path()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(notes), to_micros(cursor_ts)))
+            for note in notes:
+                # Одна строка на запись: при чтении - одно декодирование вместо нескольких
+                text = (note.title + _TAG_SEPARATOR.join(note.tags)).encode("utf-8")
+                f.write(_RECORD.pack(
+                    note.id,
+                    to_micros(note.updated),
+                    (note.created or "").encode("ascii"),
+                    STATUSES.index(note.status),
+                    PRIORITIES.index(note.priority),
+                    len(note.title),
+                    note.body_length,
+                    len(text)
+                ))
+                f.write(text)
+        os.replace(tmp_path, path)
+
+    except Exception as e:
+        print(f"⚠️ Не удалось сохранить снимок заметок: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def read_snapshot(path=None):
+    """
+    Читает снимок заметок, отображая файл в память.
+
+    Args:
+        path (str, optional): Путь к файлу (по умолчанию snapshot_path())
+
+    Returns:
+        tuple[list[Note], datetime.datetime | None]: Заметки (с пустым текстом
+        и полной длиной body_length) и курсор синхронизации.
+        Если снимка нет или он поврежден, возвращает ([], None).
+    """
+    path = path or snapshot_path()
+    if not os.path.exists(path) or os.path.getsize(path) < _HEADER.size:
+        return [], None
+
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            magic, version, count, cursor_us = _HEADER.unpack_from(mm, 0)
+            if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+                return [], None
+
+            notes = []
+            offset = _HEADER.size
+            for _ in range(count):
+                (note_id, updated_us, created, status, priority,
+                 title_len, body_length, text_len) = _RECORD.unpack_from(mm, offset)
+                offset += _RECORD.size
+                text = mm[offset:offset + text_len].decode("utf-8")
+                offset += text_len
+                tags = text[title_len:]
+
+                note = Note(note_id, text[:title_len], "", STATUSES[status], PRIORITIES[priority],
+                            created.rstrip(b"\x00").decode("ascii"))
+                note.updated = from_micros(updated_us)
+                # Текст загружается по требованию (note.body_complete == False)
+                note.body_length = body_length
+                # Теги в снимке уже нормализованы
+                note.tags = tags.split(_TAG_SEPARATOR) if tags else []
+                notes.append(note)
+
+            return notes, from_micros(cursor_us)
+
+    except Exception as e:
+        print(f"⚠️ Снимок заметок поврежден и будет пересоздан: {e}")
+        return [], None
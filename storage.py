@@ -3,43 +3,295 @@ storage.py
 Модуль для работы с хранением данных в PostgreSQL.
 """
 
+import collections
+import datetime
+import threading
 from notebookk.database import Database
-from .models import Note
+from .models import Note, PRIORITY_RANK, normalize_tags
+from .compression import pack_body, unpack_body
 import psycopg2
+from psycopg2.extras import execute_values
 
+# Колонки, которые выбираются для построения объекта Note
+NOTE_COLUMNS = """
+    id, title, body, status, priority,
+    TO_CHAR(created, 'YYYY-MM-DD HH24:MI') as created,  -- Преобразование в строку даты
+    updated, tags,
+    body_z, body_codec, body_length, body_hash          -- Сжатый текст (см. compression.py)
+"""
+
+# Колонки текста для записи (значения - compression.pack_body())
+BODY_ASSIGNMENTS = "body = %s, body_z = %s, body_codec = %s, body_length = %s, body_hash = %s"
 
-def load_notes():
+
+def note_columns(body_limit=None):
+    """
+    Возвращает список колонок для построения Note.
+
+    Args:
+        body_limit (int, optional): Загружать только первые body_limit символов
+            текста (и его полную длину body_length). None - текст целиком.
+
+    Returns:
+        str: Фрагмент SQL со списком колонок
+    """
+    if body_limit is None:
+        return NOTE_COLUMNS
+    # Сжатые тексты не передаются: начало текста из них БД получить не может,
+    # а целиком они бывают многомегабайтными. Такие заметки приходят с пустым
+    # текстом и полной длиной body_length - текст читается по требованию
+    # (read_body_range/get_note_by_id)
+    return f"""
+        id, title, left(body, {int(body_limit)}) AS body,
+        COALESCE(body_length, length(body)) AS body_length,
+        status, priority,
+        TO_CHAR(created, 'YYYY-MM-DD HH24:MI') as created,
+        updated, tags,
+        NULL AS body_z, NULL AS body_codec, NULL AS body_hash
+    """
+
+# Поля, которые можно менять через update_matching()
+UPDATABLE_FIELDS = ("title", "body", "status", "priority", "tags")
+
+class ConflictError(Exception):
+    """
+    Заметка была изменена другим клиентом после чтения (см. edit_note).
+
+    Attributes:
+        current (Note): Текущая версия заметки в БД
+    """
+
+    def __init__(self, current):
+        super().__init__(f"Заметка #{current.id} была изменена другим пользователем")
+        self.current = current
+
+
+# Перекрытие окна синхронизации: транзакции, начатые раньше курсора,
+# но зафиксированные позже, все равно попадут в следующую выборку изменений
+SYNC_OVERLAP = datetime.timedelta(seconds=10)
+
+# Тексты запросов, планы которых проверяет doctor.py. Шаблоны с {columns}
+# (note_columns()) и {where} (условия через AND) заполняются через format()
+
+# Список заметок (query_notes). notes.created - колонка таблицы (а не строка
+# TO_CHAR), поэтому сортировку можно выполнить по индексу
+LIST_NOTES_SQL = """
+    SELECT {columns}
+    FROM notes
+    WHERE NOT deleted AND {where}      -- Удаленные заметки остаются в таблице как "надгробия"
+    ORDER BY notes.created DESC -- По убыванию
+"""
+
+# Условие поиска по подстроке (search_notes)
+SEARCH_CONDITION = "title ILIKE %s OR body ILIKE %s"
+
+# Изменения после курсора (changes_since)
+CHANGES_SINCE_SQL = """
+    SELECT {columns}, deleted
+    FROM notes
+    WHERE updated >= %s      -- Использует индекс idx_notes_updated
+    ORDER BY updated
+"""
+
+# Заметка по ID (get_note_by_id)
+NOTE_BY_ID_SQL = f"""
+    SELECT {NOTE_COLUMNS}
+    FROM notes
+    WHERE id = %s AND NOT deleted
+"""
+
+# Очередь открытых заметок (next_notes). notes.created - колонка таблицы,
+# а не строка TO_CHAR: иначе порядок не берется из индекса idx_notes_next
+NEXT_NOTES_SQL = """
+    SELECT id, title, status, priority,
+           TO_CHAR(created, 'YYYY-MM-DD HH24:MI') as created
+    FROM notes
+    WHERE status <> 'done' AND NOT deleted
+    ORDER BY notes.priority_rank DESC, notes.created
+    LIMIT %s
+"""
+
+# Заметки, которые claim_next_notes() берет в работу (там - с FOR UPDATE SKIP LOCKED)
+CLAIM_CANDIDATES_SQL = """
+    SELECT id
+    FROM notes
+    WHERE status = 'todo' AND status <> 'done' AND NOT deleted   -- Условие частичного индекса
+    ORDER BY priority_rank DESC, created
+    LIMIT %s
+"""
+
+# Последние созданные заметки (recent_note_ids)
+RECENT_IDS_SQL = """
+    SELECT id
+    FROM notes
+    WHERE NOT deleted
+    ORDER BY created DESC
+    LIMIT %s
+"""
+
+# Заметки, которые archive_done_notes() переносит в архив (там - с FOR UPDATE SKIP LOCKED)
+ARCHIVE_CANDIDATES_SQL = """
+    SELECT id
+    FROM notes
+    WHERE status = 'done' AND NOT deleted
+      AND updated < LOCALTIMESTAMP - %s
+    LIMIT %s
+"""
+
+# Устаревшие надгробия, которые purge_tombstones() удаляет (там - с FOR UPDATE SKIP LOCKED)
+TOMBSTONE_CANDIDATES_SQL = """
+    SELECT id
+    FROM notes
+    WHERE deleted
+      AND updated < LOCALTIMESTAMP - %s
+    LIMIT %s
+"""
+
+# Порция заметок по диапазону ID (load_id_range)
+ID_RANGE_SQL = f"""
+    SELECT {NOTE_COLUMNS}
+    FROM notes
+    WHERE {{where}}
+    ORDER BY id
+"""
+
+
+def row_to_note(data):
+    """
+    Преобразует строку результата запроса (словарь) в объект Note.
+
+    Args:
+        data (dict): Строка с колонками NOTE_COLUMNS
+
+    Returns:
+        Note: Объект заметки
+    """
+    note = Note(
+        data['id'],
+        data['title'],
+        data['body'],
+        data['status'],
+        data['priority'],
+        data['created']
+    )
+    note.updated = data['updated']
+    # Теги в БД уже нормализованы
+    note.tags = data.get('tags') or []
+    if data.get('body_z') is not None:
+        # Сжатый текст распаковывается при первом обращении к note.body
+        note.set_packed_body(bytes(data['body_z']), data['body_codec'], data['body_length'], data['body_hash'])
+    elif data.get('body_length') is not None:
+        # Загружено только начало текста (см. note_columns)
+        note.body_length = data['body_length']
+    return note
+
+
+def query_notes(cursor, conditions, params, include_archive=False, body_limit=None):
+    """
+    Выбирает заметки по условиям, при необходимости вместе с архивом.
+
+    Args:
+        cursor: Курсор БД
+        conditions (list[str]): SQL-условия, объединяемые через AND
+        params (list): Параметры условий
+        include_archive (bool): Искать также в notes_archive
+        body_limit (int, optional): Загрузить только начало текста (см. note_columns)
+
+    Returns:
+        list[Note]: Заметки, новые сверху
+    """
+    where = " AND ".join(conditions) or "TRUE"
+    columns = note_columns(body_limit)
+    if not include_archive:
+        cursor.execute(LIST_NOTES_SQL.format(columns=columns, where=where), params)
+    else:
+        # Архив читается только по явному запросу
+        cursor.execute(f"""
+            SELECT {columns} FROM notes WHERE NOT deleted AND {where}
+            UNION ALL
+            SELECT {columns} FROM notes_archive WHERE {where}
+            ORDER BY created DESC
+        """, list(params) * 2)
+
+    # Преобразуем словари в объекты Note
+    return [row_to_note(data) for data in cursor.fetchall()]
+
+
+def filter_conditions(ids=None, status=None, priority=None, since=None, until=None, before=None, tags=None):
+    """
+    Строит SQL-условия для фильтров по заметкам.
+
+    Args:
+        ids (list[int], optional): Только заметки с этими ID
+        status (str, optional): Фильтр по статусу
+        priority (str, optional): Фильтр по приоритету
+        since (datetime.date, optional): Созданные начиная с этой даты
+        until (datetime.date, optional): Созданные по эту дату включительно
+        before (datetime.date, optional): Созданные до этой даты (не включая ее)
+        tags (list[str], optional): Заметки, у которых есть все эти теги
+
+    Returns:
+        tuple[list[str], list]: Условия и их параметры
+    """
+    conditions = []
+    params = []
+    if ids is not None:
+        conditions.append("id = ANY(%s)")
+        params.append(list(ids))
+    if status:
+        conditions.append("status = %s")
+        params.append(status)
+        if status != 'done':
+            # Явное условие частичного индекса idx_notes_open
+            conditions.append("status <> 'done'")
+    if priority:
+        conditions.append("priority = %s")
+        params.append(priority)
+    if since:
+        conditions.append("created >= %s")
+        params.append(since)
+    if until:
+        # Константа вычисляется при планировании - секции отбрасываются сразу
+        conditions.append("created < %s::date + 1")
+        params.append(until)
+    if before:
+        conditions.append("created < %s")
+        params.append(before)
+    if tags:
+        # Оператор @> ("содержит все") использует GIN-индекс idx_notes_tags
+        conditions.append("tags @> %s::text[]")
+        params.append(normalize_tags(tags))
+    return conditions, params
+
+
+def load_notes(status=None, priority=None, since=None, until=None, include_archive=False, body_limit=None,
+               tags=None):
     """
     Загружает заметки из базы данных.
 
+    Фильтры выполняются на стороне БД: для открытых статусов запрос
+    использует частичный индекс idx_notes_open и не читает завершенные заметки,
+    а фильтр по датам позволяет отбросить лишние секции (DB_PARTITIONED).
+
+    Args:
+        status (str, optional): Фильтр по статусу
+        priority (str, optional): Фильтр по приоритету
+        since (datetime.date, optional): Созданные начиная с этой даты
+        until (datetime.date, optional): Созданные по эту дату включительно
+        include_archive (bool): Загрузить также заметки из архива
+        body_limit (int, optional): Загрузить только первые body_limit символов текста
+        tags (list[str], optional): Заметки, у которых есть все эти теги
+
     Returns:
         list[Note]: Список объектов Note, загруженных из БД.
         Если таблица не существует, возвращает пустой список.
     """
     try:
-        with Database.get_cursor() as cursor: # ← Контекстный менеджер для работы с БД
-            cursor.execute("""
-                SELECT id, title, body, status, priority, 
-                       TO_CHAR(created, 'YYYY-MM-DD HH24:MI') as created -- Преобразование в строку даты, и переименовывем to_char() в created
-                FROM notes 
-                ORDER BY created DESC -- По убыванию
-            """)
-            notes_data = cursor.fetchall() # ← Получаем все строки результата
-
-            # Преобразуем словари в объекты Note
-            notes = []
-            for data in notes_data:
-                note = Note(
-                    data['id'],
-                    data['title'],
-                    data['body'],
-                    data['status'],
-                    data['priority']
-                )
-                note.created = data['created']
-                notes.append(note)
+        conditions, params = filter_conditions(status=status, priority=priority, since=since, until=until,
+                                               tags=tags)
 
-            return notes
+        with Database.get_cursor(readonly=True) as cursor: # ← Контекстный менеджер для работы с БД
+            return query_notes(cursor, conditions, params, include_archive, body_limit)
 
     except psycopg2.Error as e:
         print(f"⚠️ Ошибка чтения из БД: {e}")
@@ -49,10 +301,64 @@ def load_notes():
         return []
 
 
+def changes_since(cursor_ts, body_limit=None):
+    """
+    Возвращает изменения заметок с момента предыдущей синхронизации.
+
+    Используется для обновления локального списка без полной перезагрузки:
+    передаются только измененные заметки и ID удаленных. Выборка
+    начинается немного раньше курсора (SYNC_OVERLAP), поэтому часть
+    изменений может прийти повторно - применять их нужно идемпотентно.
+
+    Args:
+        cursor_ts (datetime.datetime | None): Курсор предыдущей синхронизации
+            (None - вернуть все заметки)
+        body_limit (int, optional): Загрузить только первые body_limit символов текста
+
+    Returns:
+        tuple[list[Note], list[int], datetime.datetime | None]:
+            Измененные/новые заметки, ID удаленных заметок и новый курсор
+    """
+    columns = note_columns(body_limit)
+    try:
+        # Всегда с основного сервера: реплика с задержкой больше SYNC_OVERLAP
+        # сдвинула бы курсор за изменения, которые до нее еще не дошли
+        with Database.get_cursor() as cursor:
+            if cursor_ts is None:
+                cursor.execute(f"""
+                    SELECT {columns}, deleted
+                    FROM notes
+                    ORDER BY updated
+                """)
+            else:
+                cursor.execute(CHANGES_SINCE_SQL.format(columns=columns), (cursor_ts - SYNC_OVERLAP,))
+            rows = cursor.fetchall()
+
+            changed = [row_to_note(data) for data in rows if not data['deleted']]
+            deleted_ids = [data['id'] for data in rows if data['deleted']]
+
+            if cursor_ts is not None:
+                # Заметки, перенесенные в архив, для клиентов - тоже удаление
+                cursor.execute("""
+                    SELECT id FROM notes_archive WHERE archived >= %s
+                """, (cursor_ts - SYNC_OVERLAP,))
+                deleted_ids.extend(data['id'] for data in cursor.fetchall())
+            # Новый курсор - самое позднее время изменения среди полученных строк
+            stamps = [data['updated'] for data in rows if data['updated']]
+            if cursor_ts:
+                stamps.append(cursor_ts)
+            return changed, deleted_ids, max(stamps, default=None)
+
+    except Exception as e:
+        print(f"⚠️ Ошибка получения изменений: {e}")
+        raise
+
+
 def save_notes(notes):
     """
     Сохраняет все заметки в базу данных.
     ВАЖНО: Этот метод перезаписывает все записи в БД.
+    Заметки, которых нет в списке, помечаются удаленными.
     Используется для синхронизации при удалении/изменении из GUI.
 
     Args:
@@ -60,26 +366,50 @@ def save_notes(notes):
     """
     try:
         with Database.get_cursor() as cursor:
-            # Очищаем таблицу
-            cursor.execute("DELETE FROM notes")
+            # Помечаем удаленными заметки, которых нет в списке
+            cursor.execute("""
+                UPDATE notes
+                SET deleted = TRUE, updated = CURRENT_TIMESTAMP
+                WHERE NOT deleted AND id <> ALL(%s)
+            """, ([note.id for note in notes],))
 
-            # Вставляем все заметки
+            # Обновляем существующие заметки и вставляем новые.
+            # ON CONFLICT (id) здесь не подходит: в секционированной таблице
+            # (DB_PARTITIONED) первичный ключ - (id, created)
             for note in notes:
-                cursor.execute("""
-                    INSERT INTO notes (id, title, body, status, priority, created)
-                    VALUES (%s, %s, %s, %s, %s, %s::timestamp)      -- Явное приведение к типу timestamp
-                    ON CONFLICT (id) DO UPDATE SET     -- Вставка с обработкой конфликтов
-                        title = EXCLUDED.title,     -- EXCLUDED - ссылка на данные которые необходимо вставить
-                        body = EXCLUDED.body,
-                        status = EXCLUDED.status,
-                        priority = EXCLUDED.priority,
+                body = pack_body(note.body)
+                cursor.execute(f"""
+                    UPDATE notes
+                    SET title = %s,
+                        {BODY_ASSIGNMENTS},
+                        status = %s,
+                        priority = %s,
+                        tags = %s::text[],
+                        deleted = FALSE,
                         updated = CURRENT_TIMESTAMP
+                    WHERE id = %s
+                """, (
+                    note.title,
+                    *body,
+                    note.status,
+                    note.priority,
+                    note.tags,
+                    note.id
+                ))
+                if cursor.rowcount:
+                    continue
+
+                cursor.execute("""
+                    INSERT INTO notes (id, title, body, body_z, body_codec, body_length, body_hash,
+                                       status, priority, tags, created)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s::text[], %s::timestamp)  -- Явное приведение к типу timestamp
                 """, (
                     note.id,
                     note.title,
-                    note.body,
+                    *body,
                     note.status,
                     note.priority,
+                    note.tags,
                     note.created
                 ))
 
@@ -98,110 +428,659 @@ def save_note(note):
     try:
         with Database.get_cursor() as cursor:
             cursor.execute("""
-                INSERT INTO notes (title, body, status, priority)
-                VALUES (%s, %s, %s, %s)
-                RETURNING id, TO_CHAR(created, 'YYYY-MM-DD HH24:MI') as created    -- Получает id и дату создания
+                INSERT INTO notes (title, body, body_z, body_codec, body_length, body_hash, status, priority, tags)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s::text[])
+                RETURNING id, TO_CHAR(created, 'YYYY-MM-DD HH24:MI') as created, updated    -- Получает id и даты
             """, (
                 note.title,
-                note.body,
+                *pack_body(note.body),
                 note.status,
-                note.priority
+                note.priority,
+                note.tags
             ))
 
             result = cursor.fetchone()
             note.id = result['id']
             note.created = result['created']
+            note.updated = result['updated']
 
     except Exception as e:
         print(f"❌ Ошибка сохранения заметки: {e}")
         raise
 
+def save_notes_bulk(notes):
+    """
+    Сохраняет несколько новых заметок одним многострочным INSERT.
+
+    Args:
+        notes (list[Note]): Новые заметки; id, created и updated заполняются из БД
+    """
+    if not notes:
+        return
+    try:
+        with Database.get_cursor() as cursor:
+            rows = execute_values(
+                cursor,
+                """
+                INSERT INTO notes (title, body, body_z, body_codec, body_length, body_hash, status, priority, tags)
+                VALUES %s
+                RETURNING id, TO_CHAR(created, 'YYYY-MM-DD HH24:MI') as created, updated
+                """,
+                [(note.title, *pack_body(note.body), note.status, note.priority, note.tags) for note in notes],
+                template="(%s, %s, %s, %s, %s, %s, %s, %s, %s::text[])",
+                page_size=len(notes),
+                fetch=True
+            )
+            # Строки RETURNING идут в порядке VALUES
+            for note, result in zip(notes, rows):
+                note.id = result['id']
+                note.created = result['created']
+                note.updated = result['updated']
+
+    except Exception as e:
+        print(f"❌ Ошибка сохранения заметок: {e}")
+        raise
+
+
+def _matching_conditions(filters):
+    """
+    Строит условия для массовых операций.
+
+    Raises:
+        ValueError: Если не задан ни один фильтр (чтобы случайно не изменить все заметки)
+    """
+    conditions, params = filter_conditions(**filters)
+    if not conditions:
+        raise ValueError("Не задан ни один фильтр: укажите ID или условия отбора")
+    return " AND ".join(conditions), params
+
+
+def count_matching(**filters):
+    """
+    Считает заметки, подходящие под фильтры (для предварительного просмотра).
+
+    Args:
+        **filters: Фильтры filter_conditions()
+
+    Returns:
+        int: Количество заметок
+    """
+    where, params = _matching_conditions(filters)
+    with Database.get_cursor(readonly=True) as cursor:
+        cursor.execute(f"SELECT COUNT(*) AS count FROM notes WHERE NOT deleted AND {where}", params)
+        return cursor.fetchone()['count']
+
+
+def update_matching(values, **filters):
+    """
+    Изменяет поля у всех заметок, подходящих под фильтры, одним запросом.
+
+    Args:
+        values (dict): Новые значения полей (ключи из UPDATABLE_FIELDS)
+        **filters: Фильтры filter_conditions()
+
+    Returns:
+        list[int]: ID измененных заметок
+    """
+    unknown = set(values) - set(UPDATABLE_FIELDS)
+    if unknown:
+        raise ValueError(f"Нельзя изменить поля: {', '.join(sorted(unknown))}")
+    if not values:
+        raise ValueError("Не указаны поля для изменения")
+    where, params = _matching_conditions(filters)
+
+    # Имена колонок берутся только из UPDATABLE_FIELDS, значения передаются параметрами
+    if "tags" in values:
+        values = {**values, "tags": normalize_tags(values["tags"])}
+    assignments = ", ".join(
+        BODY_ASSIGNMENTS if field == "body" else "tags = %s::text[]" if field == "tags" else f"{field} = %s"
+        for field in values
+    )
+    params = [
+        param
+        for field, value in values.items()
+        for param in (pack_body(value) if field == "body" else (value,))
+    ] + params
+    try:
+        with Database.get_cursor() as cursor:
+            cursor.execute(f"""
+                UPDATE notes
+                SET {assignments}, updated = CURRENT_TIMESTAMP
+                WHERE NOT deleted AND {where}
+                RETURNING id
+            """, params)
+            return [data['id'] for data in cursor.fetchall()]
+
+    except Exception as e:
+        print(f"❌ Ошибка обновления заметок: {e}")
+        raise
+
+
+def delete_matching(**filters):
+    """
+    Удаляет (помечает удаленными) все заметки, подходящие под фильтры, одним запросом.
+
+    Args:
+        **filters: Фильтры filter_conditions()
+
+    Returns:
+        list[int]: ID удаленных заметок
+    """
+    where, params = _matching_conditions(filters)
+    try:
+        with Database.get_cursor() as cursor:
+            cursor.execute(f"""
+                UPDATE notes
+                SET deleted = TRUE, updated = CURRENT_TIMESTAMP
+                WHERE NOT deleted AND {where}
+                RETURNING id
+            """, params)
+            return [data['id'] for data in cursor.fetchall()]
+
+    except Exception as e:
+        print(f"❌ Ошибка удаления заметок: {e}")
+        raise
+
+
+def update_notes(ids, values):
+    """
+    Изменяет поля у нескольких заметок по ID одним запросом.
+
+    Args:
+        ids (list[int]): ID заметок
+        values (dict): Новые значения полей (ключи из UPDATABLE_FIELDS)
+
+    Returns:
+        list[int]: ID измененных заметок
+    """
+    return update_matching(values, ids=ids)
+
+
+def delete_notes(ids):
+    """
+    Удаляет (помечает удаленными) несколько заметок по ID одним запросом.
+
+    Args:
+        ids (list[int]): ID заметок
+
+    Returns:
+        list[int]: ID удаленных заметок
+    """
+    return delete_matching(ids=ids)
+
+
 def update_note(note):
     """
     Обновляет существующую заметку в БД.
 
     Args:
         note (Note): Объект заметки для обновления
+
+    Returns:
+        Note: Заметка в том виде, в каком она сохранена в БД (тем же запросом),
+        или None, если заметки с таким ID нет
     """
     try:
         with Database.get_cursor() as cursor:
-            cursor.execute("""
-                UPDATE notes 
-                SET title = %s, 
-                    body = %s, 
-                    status = %s, 
+            cursor.execute(f"""
+                UPDATE notes
+                SET title = %s,
+                    {BODY_ASSIGNMENTS},
+                    status = %s,
                     priority = %s,
+                    tags = %s::text[],
                     updated = CURRENT_TIMESTAMP     -- Автоматическое обновление времени изменения
-                WHERE id = %s       -- Какую именно запись обновлять
+                WHERE id = %s AND NOT deleted       -- Какую именно запись обновлять
+                RETURNING {NOTE_COLUMNS}
             """, (
                 note.title,
-                note.body,
+                *pack_body(note.body),
                 note.status,
                 note.priority,
+                note.tags,
                 note.id
             ))
 
+            data = cursor.fetchone()
+            return row_to_note(data) if data else None
+
     except Exception as e:
         print(f"❌ Ошибка обновления заметки: {e}")
         raise
 
 
+def edit_note(note):
+    """
+    Сохраняет изменения заметки, если ее никто не изменил после чтения.
+
+    Оптимистическая блокировка: строка обновляется, только если ее updated
+    совпадает с note.updated (значением на момент чтения). Строки не
+    блокируются на время редактирования, поэтому редакторы не ждут друг
+    друга, а одновременное изменение обнаруживается при сохранении.
+    Текущая версия при конфликте читается отдельным запросом: в одном
+    запросе с UPDATE она читалась бы из того же снимка, то есть без
+    изменения, которое и помешало обновлению.
+
+    Args:
+        note (Note): Измененная заметка с updated исходной версии
+
+    Returns:
+        Note: Сохраненная заметка (с новым updated) или None, если заметки с таким ID нет
+
+    Raises:
+        ConflictError: Если заметку изменили с момента чтения
+    """
+    try:
+        with Database.get_cursor() as cursor:
+            cursor.execute(f"""
+                UPDATE notes
+                SET title = %s,
+                    {BODY_ASSIGNMENTS},
+                    status = %s,
+                    priority = %s,
+                    tags = %s::text[],
+                    updated = CURRENT_TIMESTAMP
+                WHERE id = %s AND NOT deleted
+                  AND updated IS NOT DISTINCT FROM %s   -- Версия не изменилась с момента чтения
+                RETURNING {NOTE_COLUMNS}
+            """, (
+                note.title,
+                *pack_body(note.body),
+                note.status,
+                note.priority,
+                note.tags,
+                note.id,
+                note.updated
+            ))
+            data = cursor.fetchone()
+            if data is not None:
+                return row_to_note(data)
+
+            # Обновление не применилось: новый запрос видит зафиксированные
+            # к этому моменту изменения (READ COMMITTED)
+            cursor.execute(f"""
+                SELECT {NOTE_COLUMNS} FROM notes
+                WHERE id = %s AND NOT deleted
+                FOR SHARE
+            """, (note.id,))
+            current = cursor.fetchone()
+
+    except Exception as e:
+        print(f"❌ Ошибка сохранения заметки: {e}")
+        raise
+
+    if current is None:
+        return None
+    raise ConflictError(row_to_note(current))
+
+
 def delete_note_by_id(note_id):
     """
     Удаляет заметку по ID.
 
+    Заметка не удаляется физически, а помечается удаленной ("надгробие"),
+    чтобы другие клиенты узнали об удалении через changes_since().
+
     Args:
         note_id (int): ID заметки для удаления
+
+    Returns:
+        Note: Удаленная заметка (возвращается тем же запросом)
+        или None, если заметки с таким ID нет
     """
     try:
         with Database.get_cursor() as cursor:
-            cursor.execute("DELETE FROM notes WHERE id = %s", (note_id,))
+            cursor.execute(f"""
+                UPDATE notes
+                SET deleted = TRUE, updated = CURRENT_TIMESTAMP
+                WHERE id = %s AND NOT deleted
+                RETURNING {NOTE_COLUMNS}
+            """, (note_id,))
+
+            data = cursor.fetchone()
+            return row_to_note(data) if data else None
 
     except Exception as e:
         print(f"❌ Ошибка удаления заметки: {e}")
         raise
 
-def search_notes(keyword):
+def search_notes(keyword, include_archive=False, tags=None, include_compressed=False):
     """
     Ищет заметки по ключевому слову.
 
+    Сжатые тексты (см. compression.py) БД прочитать не может, поэтому
+    по умолчанию в них ищется только заголовок. С include_compressed
+    все сжатые заметки передаются клиенту и распаковываются - это
+    медленно, если таких заметок много.
+
     Args:
         keyword (str): Ключевое слово для поиска
+        include_archive (bool): Искать также в архиве
+        tags (list[str], optional): Только заметки, у которых есть все эти теги
+        include_compressed (bool): Искать также в сжатых текстах
 
     Returns:
         list[Note]: Список найденных заметок
     """
+    try:
+        conditions, params = filter_conditions(tags=tags)
+        # Оператор поиска: поиск в заголовке ИЛИ тексте; сжатые тексты
+        # проверяются ниже, после распаковки
+        match = SEARCH_CONDITION
+        if include_compressed:
+            match += " OR body_z IS NOT NULL"
+        with Database.get_cursor(readonly=True) as cursor:
+            notes = query_notes(
+                cursor,
+                [f"({match})", *conditions],
+                [f'%{keyword}%', f'%{keyword}%', *params],  # для поиска подстроки
+                include_archive
+            )
+
+        needle = keyword.lower()
+        return [
+            note for note in notes
+            if not note.packed or needle in note.title.lower() or needle in note.body.lower()
+        ]
+
+    except Exception as e:
+        print(f"⚠️ Ошибка поиска заметок: {e}")
+        return []
+
+def archive_done_notes(older_than, batch_size=1000):
+    """
+    Переносит одну порцию завершенных заметок в архив (notes_archive).
+
+    Удаление из notes и вставка в архив выполняются одним запросом в одной
+    транзакции, поэтому заметка не может потеряться или задвоиться. Вызывайте
+    повторно, пока функция не вернет 0: небольшие порции не блокируют
+    таблицу надолго.
+
+    Args:
+        older_than (datetime.timedelta): Минимальный возраст последнего изменения
+        batch_size (int): Размер порции
+
+    Returns:
+        int: Количество перенесенных заметок
+    """
     try:
         with Database.get_cursor() as cursor:
-            cursor.execute("""
-                SELECT id, title, body, status, priority, 
-                       TO_CHAR(created, 'YYYY-MM-DD HH24:MI') as created
-                FROM notes 
-                WHERE title ILIKE %s OR body ILIKE %s      --  Оператор поиска: поиск в заголовке ИЛИ тексте
-                ORDER BY created DESC
-            """, (f'%{keyword}%', f'%{keyword}%'))   #для поиска подстроки
-
-            notes_data = cursor.fetchall()
-
-            # Преобразуем словари в объекты Note
-            notes = []
-            for data in notes_data:
-                note = Note(
-                    data['id'],
-                    data['title'],
-                    data['body'],
-                    data['status'],
-                    data['priority']
+            cursor.execute(f"""
+                WITH moved AS (
+                    DELETE FROM notes
+                    WHERE id IN (
+                        {ARCHIVE_CANDIDATES_SQL}
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    RETURNING id, title, body, body_z, body_codec, body_length, body_hash,
+                              status, priority, tags, created, updated
                 )
-                note.created = data['created']
-                notes.append(note)
+                INSERT INTO notes_archive (id, title, body, body_z, body_codec, body_length, body_hash,
+                                           status, priority, tags, created, updated)
+                SELECT id, title, body, body_z, body_codec, body_length, body_hash,
+                       status, priority, tags, created, updated
+                FROM moved
+            """, (older_than, batch_size))
+            return cursor.rowcount
 
+    except Exception as e:
+        print(f"❌ Ошибка архивации заметок: {e}")
+        raise
+
+
+def purge_tombstones(older_than, batch_size=1000):
+    """
+    Удаляет одну порцию устаревших надгробий (заметок, помеченных удаленными).
+
+    Надгробия нужны только клиентам синхронизации, которые еще не получили
+    удаление через changes_since(). Срок older_than должен быть больше, чем
+    клиент может пробыть без синхронизации: клиент с более старым курсором
+    не узнает об удалении. Вызывайте повторно, пока функция не вернет 0.
+
+    Args:
+        older_than (datetime.timedelta): Минимальный возраст удаления
+        batch_size (int): Размер порции
+
+    Returns:
+        int: Количество удаленных надгробий
+    """
+    try:
+        with Database.get_cursor() as cursor:
+            cursor.execute(f"""
+                DELETE FROM notes
+                WHERE id IN (
+                    {TOMBSTONE_CANDIDATES_SQL}
+                    FOR UPDATE SKIP LOCKED
+                )
+            """, (older_than, batch_size))
+            return cursor.rowcount
+
+    except Exception as e:
+        print(f"❌ Ошибка удаления надгробий: {e}")
+        raise
+
+
+def next_notes(limit=10):
+    """
+    Возвращает открытые заметки в порядке очереди: сначала с высоким
+    приоритетом, при равном приоритете - более старые.
+
+    Запрос обслуживается частичным индексом idx_notes_next, поэтому
+    тексты заметок не загружаются (body - пустая строка).
+
+    Args:
+        limit (int): Количество заметок
+
+    Returns:
+        list[Note]: Заметки в порядке очереди
+    """
+    try:
+        with Database.get_cursor(readonly=True) as cursor:
+            cursor.execute(NEXT_NOTES_SQL, (limit,))
+
+            return [
+                Note(data['id'], data['title'], "", data['status'], data['priority'], data['created'])
+                for data in cursor.fetchall()
+            ]
+
+    except Exception as e:
+        print(f"⚠️ Ошибка получения очереди заметок: {e}")
+        return []
+
+
+def claim_next_notes(limit=1):
+    """
+    Атомарно берет в работу следующие заметки из очереди (todo -> in_progress).
+
+    Строки выбираются с FOR UPDATE SKIP LOCKED, поэтому несколько
+    обработчиков могут забирать задачи одновременно, не получая одну
+    и ту же заметку и не ожидая друг друга.
+
+    Args:
+        limit (int): Сколько заметок взять
+
+    Returns:
+        list[Note]: Взятые в работу заметки (пустой список, если очередь пуста)
+    """
+    try:
+        with Database.get_cursor() as cursor:
+            cursor.execute(f"""
+                UPDATE notes
+                SET status = 'in_progress', updated = CURRENT_TIMESTAMP
+                WHERE id IN (
+                    {CLAIM_CANDIDATES_SQL}
+                    FOR UPDATE SKIP LOCKED      -- Пропускаем строки, которые уже берет другой обработчик
+                )
+                RETURNING {NOTE_COLUMNS}
+            """, (limit,))
+
+            # RETURNING не гарантирует порядок - восстанавливаем порядок очереди
+            notes = [row_to_note(data) for data in cursor.fetchall()]
+            notes.sort(key=lambda note: (-PRIORITY_RANK.get(note.priority, 0), note.created or ""))
             return notes
 
     except Exception as e:
-        print(f"⚠️ Ошибка поиска заметок: {e}")
+        print(f"❌ Ошибка получения задачи из очереди: {e}")
+        raise
+
+
+def recent_note_ids(limit=5):
+    """
+    Возвращает ID последних созданных заметок (подсказка, если ID не найден).
+
+    Args:
+        limit (int): Количество ID
+
+    Returns:
+        list[int]: ID заметок, новые сверху
+    """
+    try:
+        with Database.get_cursor(readonly=True) as cursor:
+            cursor.execute(RECENT_IDS_SQL, (limit,))
+            return [data['id'] for data in cursor.fetchall()]
+
+    except Exception as e:
+        print(f"⚠️ Ошибка получения списка ID: {e}")
+        return []
+
+
+def tag_counts(**filters):
+    """
+    Считает заметки по тегам.
+
+    Args:
+        **filters: Фильтры filter_conditions() (например, status или tags)
+
+    Returns:
+        list[tuple[str, int]]: Пары (тег, количество заметок), самые частые сначала
+    """
+    conditions, params = filter_conditions(**filters)
+    where = " AND ".join(["NOT deleted", *conditions])
+    try:
+        with Database.get_cursor(readonly=True) as cursor:
+            cursor.execute(f"""
+                SELECT tag, COUNT(*) AS count
+                FROM notes, unnest(tags) AS tag
+                WHERE {where}
+                GROUP BY tag
+                ORDER BY count DESC, tag
+            """, params)
+            return [(data['tag'], data['count']) for data in cursor.fetchall()]
+
+    except Exception as e:
+        print(f"⚠️ Ошибка подсчета тегов: {e}")
         return []
 
+
+# Сколько распакованных сжатых текстов хранится для read_body_range/find_in_body
+UNPACKED_CACHE_SIZE = 4
+
+# body_hash -> распакованный текст (последние использованные в конце)
+_unpacked = collections.OrderedDict()
+_unpacked_lock = threading.Lock()
+
+
+def _unpacked_body(note_id, digest):
+    """
+    Возвращает распакованный сжатый текст заметки.
+
+    Окно просмотра читает длинный текст частями и ищет в нем по шагам,
+    поэтому последние распакованные тексты хранятся в памяти: сжатый
+    текст загружается и распаковывается один раз, а не для каждой части.
+    Ключ - хэш текста (body_hash), так что измененная заметка
+    не возьмется из кэша.
+
+    Args:
+        note_id (int): ID заметки
+        digest (bytes): Хэш текста (колонка body_hash)
+
+    Returns:
+        str | None: Текст заметки (None, если заметки уже нет)
+    """
+    digest = bytes(digest)
+    with _unpacked_lock:
+        if digest in _unpacked:
+            _unpacked.move_to_end(digest)
+            return _unpacked[digest]
+
+    with Database.get_cursor(readonly=True) as cursor:
+        cursor.execute("""
+            SELECT body_z, body_codec, body_hash
+            FROM notes
+            WHERE id = %s AND NOT deleted AND body_z IS NOT NULL
+        """, (note_id,))
+        data = cursor.fetchone()
+    if not data:
+        return None
+    body = unpack_body(data['body_z'], data['body_codec'], data['body_hash'])
+
+    with _unpacked_lock:
+        _unpacked[bytes(data['body_hash'])] = body
+        while len(_unpacked) > UNPACKED_CACHE_SIZE:
+            _unpacked.popitem(last=False)
+    return body
+
+
+def read_body_range(note_id, start, length):
+    """
+    Читает часть текста заметки.
+
+    Args:
+        note_id (int): ID заметки
+        start (int): Позиция первого символа (с нуля)
+        length (int): Количество символов
+
+    Returns:
+        str: Фрагмент текста (пустая строка за концом текста или для несуществующей заметки)
+    """
+    with Database.get_cursor(readonly=True) as cursor:
+        cursor.execute("""
+            SELECT substring(body from %s for %s) AS chunk, body_hash
+            FROM notes
+            WHERE id = %s AND NOT deleted
+        """, (start + 1, length, note_id))   # В SQL позиции считаются с единицы
+        data = cursor.fetchone()
+    if data and data['body_hash'] is not None:
+        # Сжатый текст можно только распаковать целиком (один раз, см. _unpacked_body)
+        body = _unpacked_body(note_id, data['body_hash'])
+        return body[start:start + length] if body is not None else ""
+    return data['chunk'] if data else ""
+
+
+def find_in_body(note_id, query, start=0):
+    """
+    Ищет подстроку в тексте заметки на стороне БД (без учета регистра).
+
+    Текст не передается клиенту, поэтому поиск в очень длинной заметке
+    не зависит от скорости сети и размера окна просмотра (кроме сжатых
+    текстов, см. compression.py - они распаковываются на клиенте один раз
+    для всех шагов поиска).
+
+    Args:
+        note_id (int): ID заметки
+        query (str): Искомая подстрока
+        start (int): С какой позиции искать (с нуля)
+
+    Returns:
+        int | None: Позиция найденной подстроки (с нуля) или None
+    """
+    with Database.get_cursor(readonly=True) as cursor:
+        cursor.execute("""
+            SELECT strpos(lower(substring(body from %s)), lower(%s)) AS pos, body_hash
+            FROM notes
+            WHERE id = %s AND NOT deleted
+        """, (start + 1, query, note_id))
+        data = cursor.fetchone()
+    if data and data['body_hash'] is not None:
+        # Сжатый текст БД прочитать не может - ищем после распаковки
+        body = _unpacked_body(note_id, data['body_hash'])
+        pos = body.lower().find(query.lower(), start) if body is not None else -1
+        return pos if pos >= 0 else None
+    if not data or not data['pos']:
+        return None
+    return start + data['pos'] - 1
+
+
 def get_note_by_id(note_id):
     """
     Получает заметку по ID.
@@ -213,27 +1092,199 @@ def get_note_by_id(note_id):
         Note: Объект заметки или None если не найдена
     """
     try:
-        with Database.get_cursor() as cursor:
-            cursor.execute("""
-                SELECT id, title, body, status, priority, 
-                       TO_CHAR(created, 'YYYY-MM-DD HH24:MI') as created
-                FROM notes 
-                WHERE id = %s
-            """, (note_id,))
+        with Database.get_cursor(readonly=True) as cursor:
+            cursor.execute(NOTE_BY_ID_SQL, (note_id,))
 
             data = cursor.fetchone()
             if data:
-                note = Note(
-                    data['id'],
-                    data['title'],
-                    data['body'],
-                    data['status'],
-                    data['priority']
-                )
-                note.created = data['created']
-                return note
+                return row_to_note(data)
             return None
 
     except Exception as e:
         print(f"⚠️ Ошибка получения заметки: {e}")
-        return None
\ No newline at end of file
+        return None
+
+
+def get_notes_by_ids(ids):
+    """
+    Получает несколько заметок по ID одним запросом.
+
+    Args:
+        ids (list[int]): ID заметок
+
+    Returns:
+        list[Note]: Найденные заметки (в произвольном порядке)
+    """
+    if not ids:
+        return []
+    with Database.get_cursor(readonly=True) as cursor:
+        cursor.execute(f"""
+            SELECT {NOTE_COLUMNS}
+            FROM notes
+            WHERE id = ANY(%s) AND NOT deleted
+        """, (list(ids),))
+        return [row_to_note(data) for data in cursor.fetchall()]
+
+
+def body_previews(ids, body_limit):
+    """
+    Загружает начало текста нескольких заметок одним запросом.
+
+    Нужна, когда остальные поля заметок уже известны (например, из
+    локального снимка, см. snapshot.py). Сжатые тексты, как и в
+    note_columns(body_limit), не передаются.
+
+    Args:
+        ids (list[int]): ID заметок
+        body_limit (int): Сколько первых символов текста загрузить
+
+    Returns:
+        dict[int, str]: ID заметки -> начало текста (удаленных заметок нет)
+    """
+    if not ids:
+        return {}
+    with Database.get_cursor(readonly=True) as cursor:
+        cursor.execute("""
+            SELECT id, left(body, %s) AS body
+            FROM notes
+            WHERE id = ANY(%s) AND NOT deleted
+        """, (int(body_limit), list(ids)))
+        return {data['id']: data['body'] for data in cursor.fetchall()}
+
+
+def note_versions():
+    """
+    Возвращает ID и время последнего изменения всех заметок без их содержимого.
+
+    Позволяет локальным кэшам (например, dedupe.py) догружать только
+    изменившиеся заметки.
+
+    Returns:
+        dict[int, datetime.datetime | None]: ID заметки -> время изменения
+    """
+    with Database.get_cursor(readonly=True) as cursor:
+        cursor.execute("SELECT id, updated FROM notes WHERE NOT deleted")
+        return {data['id']: data['updated'] for data in cursor.fetchall()}
+
+
+def allocate_note_ids(count, above=None):
+    """
+    Выделяет ID для новых заметок из последовательности notes.id.
+
+    ID выдаются по возрастанию, поэтому заметки, которым они назначаются
+    по порядку, сохраняют порядок (например, строк импортируемого файла).
+
+    Args:
+        count (int): Количество ID
+        above (int, optional): Сначала сдвинуть последовательность за этот ID
+            (чтобы новые ID не совпали с явно заданными)
+
+    Returns:
+        list[int]: Выделенные ID по возрастанию
+    """
+    with Database.get_cursor() as cursor:
+        if above is not None:
+            cursor.execute("""
+                SELECT setval(seq, GREATEST(%s, COALESCE(pg_sequence_last_value(seq), 1)))
+                FROM pg_get_serial_sequence('notes', 'id') AS seq
+            """, (above,))
+        if not count:
+            return []
+        cursor.execute("""
+            SELECT nextval(pg_get_serial_sequence('notes', 'id')) AS id
+            FROM generate_series(1, %s)
+            ORDER BY 1
+        """, (count,))
+        return [data['id'] for data in cursor.fetchall()]
+
+
+def import_notes(notes):
+    """
+    Вставляет заметки с уже назначенными ID и датой создания одним запросом.
+
+    Заметка, ID и дата создания которой уже есть в таблице, пропускается,
+    поэтому повторный импорт того же файла ничего не дублирует. Если же
+    ID занят другой заметкой (с другой датой создания), это конфликт:
+    заметка не записывается. ID проверяются отдельным запросом, а не только
+    ON CONFLICT: в секционированной таблице первичный ключ - (id, created),
+    и заметка с тем же ID, но другой датой вставилась бы дубликатом.
+
+    Args:
+        notes (list[Note]): Заметки с заполненными id и created
+
+    Returns:
+        tuple[list[int], list[int]]: ID вставленных заметок и ID конфликтов
+    """
+    if not notes:
+        return [], []
+    with Database.get_cursor() as cursor:
+        cursor.execute("SELECT id, created FROM notes WHERE id = ANY(%s)",
+                       ([note.id for note in notes],))
+        existing = {data['id']: data['created'] for data in cursor.fetchall()}
+
+        fresh, conflicts = [], []
+        for note in notes:
+            if note.id not in existing:
+                fresh.append(note)
+            elif existing[note.id] != datetime.datetime.fromisoformat(note.created).replace(tzinfo=None):
+                conflicts.append(note.id)
+        if not fresh:
+            return [], conflicts
+
+        rows = execute_values(
+            cursor,
+            """
+            INSERT INTO notes (id, title, body, body_z, body_codec, body_length, body_hash,
+                               status, priority, tags, created)
+            VALUES %s
+            ON CONFLICT DO NOTHING
+            RETURNING id
+            """,
+            [(note.id, note.title, *pack_body(note.body), note.status, note.priority, note.tags, note.created)
+             for note in fresh],
+            template="(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s::text[], %s::timestamp)",
+            page_size=len(fresh),
+            fetch=True
+        )
+        return [data['id'] for data in rows], conflicts
+
+
+def id_bounds(**filters):
+    """
+    Возвращает диапазон ID и количество заметок, подходящих под фильтры.
+
+    Args:
+        **filters: Фильтры filter_conditions()
+
+    Returns:
+        tuple[int | None, int | None, int]: Минимальный и максимальный ID и количество
+    """
+    conditions, params = filter_conditions(**filters)
+    where = " AND ".join(["NOT deleted", *conditions])
+    with Database.get_cursor(readonly=True) as cursor:
+        cursor.execute(f"""
+            SELECT MIN(id) AS first, MAX(id) AS last, COUNT(*) AS count
+            FROM notes
+            WHERE {where}
+        """, params)
+        data = cursor.fetchone()
+        return data['first'], data['last'], data['count']
+
+
+def load_id_range(first_id, last_id, **filters):
+    """
+    Загружает заметки с ID из диапазона (для выгрузки порциями).
+
+    Args:
+        first_id (int): Первый ID диапазона
+        last_id (int): Последний ID диапазона (включительно)
+        **filters: Фильтры filter_conditions()
+
+    Returns:
+        list[Note]: Заметки по возрастанию ID
+    """
+    conditions, params = filter_conditions(**filters)
+    where = " AND ".join(["NOT deleted", "id BETWEEN %s AND %s", *conditions])
+    with Database.get_cursor(readonly=True) as cursor:
+        cursor.execute(ID_RANGE_SQL.format(where=where), [first_id, last_id, *params])
+        return [row_to_note(data) for data in cursor.fetchall()]
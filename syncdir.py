@@ -0,0 +1,509 @@
+"""
+syncdir.py
+Модуль двусторонней синхронизации заметок с каталогом Markdown-файлов.
+
+Каждая заметка - отдельный файл <id>-<заголовок>.md:
+
+    ---
+    id: 12
+    status: todo
+    priority: high
+    created: 2026-01-05 10:30
+    tags: работа, срочно
+    ---
+
+    # Заголовок
+
+    Текст заметки
+
+Изменения определяются инкрементально с обеих сторон:
+- в БД - через changes_since() по курсору updated из прошлой синхронизации;
+- в каталоге - по времени изменения и размеру файлов (без чтения), а
+  у файлов, где они отличаются, - по хэшу содержимого.
+Состояние (курсор и mtime/размер/хэш/updated каждого файла) хранится в
+файле .notebookk-sync.json в самом каталоге, поэтому после небольшого
+изменения синхронизация перезаписывает только измененные файлы.
+
+Если заметка изменилась и в БД, и в файле, побеждает версия из БД, а
+локальная сохраняется рядом как <имя>.conflict.md. Так же сохраняется
+файл, которого нет в состоянии (например, после потери файла состояния),
+если он отличается от заметки в БД. Новые файлы без id
+становятся новыми заметками, удаленные файлы - удаленными заметками.
+
+В режиме наблюдения изменения файлов отслеживаются через inotify
+(необязательный пакет inotify_simple, только Linux), иначе каталог
+периодически сканируется целиком.
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import time
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:  # Необязательная зависимость
+    INotify = None
+
+from .models import Note, STATUSES, PRIORITIES
+from .search_index import TOKEN_RE
+from .storage import changes_since, edit_note, save_note, delete_notes, ConflictError
+
+STATE_FILE = ".notebookk-sync.json"
+STATE_VERSION = 1
+CONFLICT_SUFFIX = ".conflict.md"
+
+# Максимальная длина части имени файла, полученной из заголовка
+SLUG_LENGTH = 60
+
+# Пауза для накопления событий inotify (редакторы пишут файл в несколько приемов)
+WATCH_DEBOUNCE_MS = 200
+
+
+def file_name(note):
+    """
+    Возвращает имя файла заметки: ID и слова заголовка через дефис.
+
+    Args:
+        note (Note): Заметка
+
+    Returns:
+        str: Имя файла, например "12-купить-молоко.md"
+    """
+    slug = "-".join(TOKEN_RE.findall(note.title.lower()))[:SLUG_LENGTH].strip("-_")
+    return f"{note.id}-{slug or 'note'}.md"
+
+
+def render_note(note):
+    """
+    Формирует содержимое Markdown-файла заметки.
+
+    Args:
+        note (Note): Заметка
+
+    Returns:
+        str: Текст файла (метаданные, заголовок и текст заметки)
+    """
+    lines = [
+        "---",
+        f"id: {note.id}",
+        f"status: {note.status}",
+        f"priority: {note.priority}",
+        f"created: {note.created}",
+    ]
+    if note.tags:
+        lines.append(f"tags: {', '.join(note.tags)}")
+    lines += ["---", "", f"# {note.title}", ""]
+    # Завершающий перевод строки добавляется всегда и всегда снимается при чтении
+    return "\n".join(lines) + "\n" + note.body + "\n"
+
+
+def parse_note(text):
+    """
+    Разбирает Markdown-файл заметки.
+
+    Args:
+        text (str): Текст файла
+
+    Returns:
+        Note: Заметка; id=0 для файла без id (новая заметка)
+
+    Raises:
+        ValueError: Если файл не в формате render_note()
+    """
+    text = text.replace("\r\n", "\n")
+    if not text.startswith("---\n"):
+        raise ValueError("файл должен начинаться с метаданных между строками ---")
+    end = text.find("\n---\n", 3)
+    if end < 0:
+        raise ValueError("не найдена строка --- после метаданных")
+
+    meta = {}
+    for line in text[4:end].split("\n"):
+        key, sep, value = line.partition(":")
+        if sep:
+            meta[key.strip().lower()] = value.strip()
+
+    heading, _, body = text[end + 5:].lstrip("\n").partition("\n")
+    if not heading.startswith("# ") or not heading[2:].strip():
+        raise ValueError("после метаданных должна идти строка '# Заголовок'")
+    if body.startswith("\n"):
+        body = body[1:]
+    if body.endswith("\n"):
+        body = body[:-1]
+
+    try:
+        note_id = int(meta.get("id") or 0)
+    except ValueError:
+        raise ValueError(f"некорректный id: {meta['id']}")
+    status = meta.get("status") or "todo"
+    priority = meta.get("priority") or "medium"
+    if status not in STATUSES:
+        raise ValueError(f"неизвестный статус: {status}")
+    if priority not in PRIORITIES:
+        raise ValueError(f"неизвестный приоритет: {priority}")
+    return Note(note_id, heading[2:].strip(), body, status, priority, meta.get("created") or None,
+                tags=meta.get("tags", ""))
+
+
+def _is_note_file(name):
+    """Проверяет, что файл каталога - заметка (а не состояние, конфликт или временный файл)."""
+    return name.endswith(".md") and not name.endswith(CONFLICT_SUFFIX) and not name.startswith(".")
+
+
+class DirectorySync:
+    """
+    Синхронизация заметок с каталогом Markdown-файлов.
+
+    Attributes:
+        path (str): Каталог
+        cursor (datetime.datetime | None): Курсор changes_since() прошлой синхронизации
+        files (dict): ID заметки -> {"name", "mtime", "size", "hash", "updated"}
+            (состояние файла и версия заметки после прошлой синхронизации)
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Каталог для синхронизации (создается при необходимости)
+        """
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.cursor = None
+        self.files = {}
+        self._by_name = {}
+        self._load_state()
+
+    # === Состояние ===
+
+    def _state_path(self):
+        return os.path.join(self.path, STATE_FILE)
+
+    def _load_state(self):
+        """Читает состояние прошлой синхронизации (если его нет - все заметки будут выгружены)."""
+        try:
+            with open(self._state_path(), encoding="utf-8") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Состояние синхронизации повреждено, каталог будет сверен заново: {e}")
+            return
+        if state.get("version") != STATE_VERSION:
+            return
+        if state.get("cursor"):
+            self.cursor = datetime.datetime.fromisoformat(state["cursor"])
+        for note_id, (name, mtime, size, digest, updated) in state.get("notes", {}).items():
+            self._remember(int(note_id), name, mtime, size, digest, updated)
+
+    def _save_state(self):
+        """Сохраняет состояние атомарно (через временный файл)."""
+        state = {
+            "version": STATE_VERSION,
+            "cursor": self.cursor.isoformat() if self.cursor else None,
+            "notes": {
+                str(note_id): [rec["name"], rec["mtime"], rec["size"], rec["hash"], rec["updated"]]
+                for note_id, rec in self.files.items()
+            },
+        }
+        tmp_path = self._state_path() + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, self._state_path())
+
+    def _remember(self, note_id, name, mtime, size, digest, updated):
+        """Запоминает состояние файла заметки."""
+        self._forget(note_id)
+        self.files[note_id] = {"name": name, "mtime": mtime, "size": size, "hash": digest, "updated": updated}
+        self._by_name[name] = note_id
+
+    def _forget(self, note_id):
+        """Убирает заметку из состояния."""
+        rec = self.files.pop(note_id, None)
+        if rec:
+            self._by_name.pop(rec["name"], None)
+
+    # === Файлы ===
+
+    def _file_path(self, name):
+        return os.path.join(self.path, name)
+
+    def _read(self, name):
+        """Читает файл: (текст, хэш, mtime, размер) или None, если файла нет."""
+        try:
+            with open(self._file_path(name), "rb") as f:
+                data = f.read()
+                st = os.fstat(f.fileno())
+        except FileNotFoundError:
+            return None
+        return data.decode("utf-8"), hashlib.sha256(data).hexdigest(), st.st_mtime_ns, st.st_size
+
+    def _write(self, note):
+        """Записывает файл заметки (атомарно) и запоминает его состояние."""
+        name = file_name(note)
+        data = render_note(note).encode("utf-8")
+        path = self._file_path(name)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        old = self.files.get(note.id)
+        if old and old["name"] != name:
+            # Заголовок изменился - файл переименовывается
+            self._remove(old["name"])
+        st = os.stat(path)
+        self._remember(note.id, name, st.st_mtime_ns, st.st_size, hashlib.sha256(data).hexdigest(),
+                       note.updated.isoformat() if note.updated else None)
+
+    def _remove(self, name):
+        try:
+            os.remove(self._file_path(name))
+        except FileNotFoundError:
+            pass
+
+    def _keep_conflict(self, name, text):
+        """Сохраняет локальную версию, проигравшую конфликт, рядом с файлом заметки."""
+        conflict = name[:-len(".md")] + CONFLICT_SUFFIX
+        with open(self._file_path(conflict), "w", encoding="utf-8") as f:
+            f.write(text)
+        return conflict
+
+    def _adopt_file(self, note, local, new_files, stats):
+        """
+        Сверяет заметку из БД с файлом, которого нет в состоянии, перед его перезаписью.
+
+        Такой файл остается, например, после потери .notebookk-sync.json
+        или при первой синхронизации уже заполненного каталога, и в нем могут
+        быть изменения. Если содержимое отличается от заметки в БД, локальная
+        версия сохраняется как конфликт; файл под старым именем удаляется,
+        чтобы он не стал копией заметки.
+
+        Args:
+            note (Note): Заметка из БД
+            local (tuple | None): Файл с id этой заметки из новых файлов
+                (имя, текст, хэш, mtime, размер); None - проверить файл file_name(note)
+            new_files (list): Новые файлы синхронизации (найденный файл из них убирается)
+            stats (dict): Итоги синхронизации
+        """
+        if local is None:
+            read = self._read(file_name(note))
+            if read is None:
+                return
+            local = (file_name(note),) + read
+        if local in new_files:
+            new_files.remove(local)
+        name, text = local[:2]
+        if text.replace("\r\n", "\n") != render_note(note):
+            stats["conflicts"].append(self._keep_conflict(name, text))
+        if name != file_name(note):
+            self._remove(name)
+
+    def _scan(self, names=None):
+        """
+        Находит изменения в каталоге.
+
+        Файлы читаются, только если их mtime или размер отличаются от
+        запомненных; содержимое сравнивается по хэшу.
+
+        Args:
+            names (iterable[str], optional): Проверить только эти файлы (None - весь каталог)
+
+        Returns:
+            tuple: Измененные {id: (имя, текст, хэш, mtime, размер)},
+            новые файлы [(имя, текст, хэш, mtime, размер)] и ID удаленных файлов
+        """
+        if names is None:
+            present = {}
+            with os.scandir(self.path) as entries:
+                for entry in entries:
+                    if _is_note_file(entry.name) and entry.is_file():
+                        st = entry.stat()
+                        present[entry.name] = (st.st_mtime_ns, st.st_size)
+            missing = {note_id for name, note_id in self._by_name.items() if name not in present}
+        else:
+            present = {}
+            missing = set()
+            for name in names:
+                if not _is_note_file(name):
+                    continue
+                try:
+                    st = os.stat(self._file_path(name))
+                    present[name] = (st.st_mtime_ns, st.st_size)
+                except FileNotFoundError:
+                    if name in self._by_name:
+                        missing.add(self._by_name[name])
+
+        modified = {}
+        new_files = []
+        for name, (mtime, size) in present.items():
+            note_id = self._by_name.get(name)
+            rec = self.files.get(note_id)
+            if rec and (rec["mtime"], rec["size"]) == (mtime, size):
+                continue
+            read = self._read(name)
+            if read is None:
+                continue
+            if rec is None:
+                new_files.append((name,) + read)
+            elif read[1] == rec["hash"]:
+                # Файл "тронут", но не изменен - только обновляем mtime
+                rec["mtime"], rec["size"] = read[2], read[3]
+            else:
+                modified[note_id] = (name,) + read
+        return modified, new_files, missing
+
+    # === Синхронизация ===
+
+    def sync(self, names=None):
+        """
+        Выполняет одну двустороннюю синхронизацию.
+
+        Args:
+            names (iterable[str], optional): Проверить только эти файлы каталога
+                (события inotify); None - просканировать каталог целиком
+
+        Returns:
+            dict: Итоги: pulled (файлов записано из БД), pushed (заметок
+            изменено из файлов), created, deleted_files, deleted_notes,
+            conflicts (имена .conflict.md), errors (описания)
+        """
+        stats = {"pulled": 0, "pushed": 0, "created": 0, "deleted_files": 0, "deleted_notes": 0,
+                 "conflicts": [], "errors": []}
+        modified, new_files, missing = self._scan(names)
+
+        # Переименованный в каталоге файл: id из метаданных, а старого файла нет
+        untracked = {}
+        for item in list(new_files):
+            name, text = item[0], item[1]
+            try:
+                note_id = parse_note(text).id
+            except ValueError:
+                continue
+            if note_id and note_id not in self.files:
+                untracked.setdefault(note_id, item)
+            if note_id in missing:
+                missing.discard(note_id)
+                new_files.remove(item)
+                rec = self.files[note_id]
+                self._remember(note_id, name, item[3], item[4], rec["hash"], rec["updated"])
+                if item[2] != rec["hash"]:
+                    modified[note_id] = item
+
+        changed, deleted_ids, cursor = changes_since(self.cursor)
+
+        # Изменения из БД
+        for note in changed:
+            rec = self.files.get(note.id)
+            if rec and rec["updated"] == (note.updated.isoformat() if note.updated else None):
+                continue  # Уже в каталоге (в том числе наши собственные изменения)
+            if note.id in modified:
+                name, text = modified.pop(note.id)[:2]
+                stats["conflicts"].append(self._keep_conflict(name, text))
+            elif rec is None:
+                self._adopt_file(note, untracked.pop(note.id, None), new_files, stats)
+            missing.discard(note.id)
+            self._write(note)
+            stats["pulled"] += 1
+
+        for note_id in deleted_ids:
+            rec = self.files.get(note_id)
+            if rec is None:
+                continue
+            if note_id in modified:
+                # Заметку удалили, но файл успели изменить - сохраняем изменения
+                name, text = modified.pop(note_id)[:2]
+                stats["conflicts"].append(self._keep_conflict(name, text))
+            missing.discard(note_id)
+            self._remove(rec["name"])
+            self._forget(note_id)
+            stats["deleted_files"] += 1
+
+        # Изменения из каталога
+        for note_id, (name, text, digest, mtime, size) in modified.items():
+            try:
+                note = parse_note(text)
+            except ValueError as e:
+                stats["errors"].append(f"{name}: {e}")
+                continue
+            note.id = note_id
+            updated = self.files[note_id]["updated"]
+            note.updated = datetime.datetime.fromisoformat(updated) if updated else None
+            try:
+                saved = edit_note(note)
+            except ConflictError as e:
+                # Заметку изменили в БД уже после changes_since()
+                stats["conflicts"].append(self._keep_conflict(name, text))
+                self._write(e.current)
+                stats["pulled"] += 1
+                continue
+            if saved is None:
+                stats["conflicts"].append(self._keep_conflict(name, text))
+                self._remove(name)
+                self._forget(note_id)
+                continue
+            if file_name(saved) != name or render_note(saved) != text.replace("\r\n", "\n"):
+                # Имя или нормализованное содержимое (например, теги) изменились
+                self._write(saved)
+            else:
+                self._remember(note_id, name, mtime, size, digest, saved.updated.isoformat())
+            stats["pushed"] += 1
+
+        for name, text, digest, mtime, size in new_files:
+            try:
+                note = parse_note(text)
+            except ValueError as e:
+                stats["errors"].append(f"{name}: {e}")
+                continue
+            rec = self.files.get(note.id)
+            if rec and rec["name"] == name:
+                continue  # Файл только что записан из БД
+            # Файл без id или копия файла другой заметки - новая заметка
+            save_note(note)
+            self._write(note)
+            if file_name(note) != name:
+                self._remove(name)
+            stats["created"] += 1
+
+        if missing:
+            stats["deleted_notes"] = len(delete_notes(sorted(missing)))
+            for note_id in missing:
+                self._forget(note_id)
+
+        self.cursor = cursor
+        if any(value for value in stats.values()) or changed or deleted_ids:
+            self._save_state()
+        return stats
+
+    def watch(self, interval=2.0, on_sync=None):
+        """
+        Синхронизирует каталог непрерывно, до прерывания (Ctrl+C).
+
+        Изменения файлов отслеживаются через inotify (если установлен
+        inotify_simple) - тогда проверяются только измененные файлы, иначе
+        каталог сканируется каждые interval секунд. Изменения в БД
+        проверяются каждые interval секунд.
+
+        Args:
+            interval (float): Период проверки БД (и каталога без inotify) в секундах
+            on_sync (callable, optional): Вызывается с итогами каждой синхронизации
+        """
+        if INotify is None:
+            while True:
+                time.sleep(interval)
+                stats = self.sync()
+                if on_sync:
+                    on_sync(stats)
+            return
+
+        with INotify() as inotify:
+            inotify.add_watch(self.path, flags.CLOSE_WRITE | flags.MOVED_TO | flags.MOVED_FROM | flags.DELETE)
+            while True:
+                events = inotify.read(timeout=int(interval * 1000))
+                if events:
+                    # Редактор может записать файл в несколько приемов - собираем все события
+                    events += inotify.read(timeout=WATCH_DEBOUNCE_MS)
+                stats = self.sync({event.name for event in events})
+                if on_sync:
+                    on_sync(stats)
@@ -0,0 +1,82 @@
+# test_analytics.py
+# Колоночные снимки и агрегаты по ним (analytics.py) сверяются с перебором заметок
+import collections
+import datetime
+import random
+
+import pytest
+
+from notebookk import analytics
+from notebookk.analytics import (LENGTH_BINS, SnapshotWriter, body_length_histogram, notes_to_batch,
+                                 open_snapshot, status_priority_counts, weekly_throughput)
+from notebookk.models import Note, STATUSES, PRIORITIES
+
+# pyarrow и NumPy - необязательные зависимости
+pytestmark = pytest.mark.skipif(analytics.pyarrow is None or analytics.numpy is None,
+                                reason="нужны pyarrow и numpy")
+
+
+def make_notes(count, seed=1):
+    rnd = random.Random(seed)
+    start = datetime.datetime(2026, 1, 1)
+    notes = []
+    for note_id in range(1, count + 1):
+        created = start + datetime.timedelta(minutes=rnd.randrange(60 * 24 * 120))
+        note = Note(note_id, f"Заметка {note_id}", "x" * rnd.choice([0, 5, 99, 100, 500, 5000, 20000]),
+                    rnd.choice(STATUSES), rnd.choice(PRIORITIES), created.strftime("%Y-%m-%d %H:%M"),
+                    tags=rnd.sample(["дом", "работа"], rnd.randint(0, 2)))
+        note.updated = None if rnd.random() < 0.1 else created + datetime.timedelta(days=rnd.randrange(30))
+        notes.append(note)
+    return notes
+
+
+def monday(moment):
+    return (moment - datetime.timedelta(days=moment.weekday())).date()
+
+
+@pytest.fixture(params=["arrow", "parquet"])
+def snapshot(request, tmp_path):
+    notes = make_notes(1000)
+    path = str(tmp_path / f"notes.{request.param}")
+    with SnapshotWriter(path, request.param) as writer:
+        for start in range(0, len(notes), 300):
+            writer.write(notes_to_batch(notes[start:start + 300]))
+    return notes, open_snapshot(path)
+
+
+def test_snapshot_columns(snapshot):
+    notes, batches = snapshot
+    assert sum(batch.num_rows for batch in batches) == len(notes)
+    rows = [row for batch in batches for row in batch.to_pylist()]
+    assert [(row["id"], row["title"], row["status"], row["priority"], row["tags"]) for row in rows] == \
+        [(note.id, note.title, note.status, note.priority, note.tags) for note in notes]
+
+
+def test_weekly_throughput(snapshot):
+    notes, batches = snapshot
+    created = collections.Counter(monday(datetime.datetime.fromisoformat(note.created)) for note in notes)
+    done = collections.Counter(monday(note.updated) for note in notes if note.status == "done" and note.updated)
+    expected = [(week, created[week], done[week]) for week in sorted(created.keys() | done.keys())]
+    assert weekly_throughput(batches) == expected
+
+
+def test_body_length_histogram(snapshot):
+    notes, batches = snapshot
+    uppers = list(LENGTH_BINS[1:]) + [None]
+    expected = [(low, high, sum(1 for note in notes
+                                if note.body_length >= low and (high is None or note.body_length < high)))
+                for low, high in zip(LENGTH_BINS, uppers)]
+    assert body_length_histogram(batches) == expected
+
+
+def test_status_priority_counts(snapshot):
+    notes, batches = snapshot
+    counts = collections.Counter((note.status, note.priority) for note in notes)
+    assert status_priority_counts(batches) == {(s, p): counts[(s, p)] for s in STATUSES for p in PRIORITIES}
+
+
+def test_open_rejects_other_files(tmp_path):
+    path = str(tmp_path / "other.parquet")
+    analytics.pyarrow.parquet.write_table(analytics.pyarrow.table({"a": [1, 2]}), path)
+    with pytest.raises(ValueError):
+        open_snapshot(path)
@@ -0,0 +1,55 @@
+# test_batch.py
+# Разбор операций пакета (batch.parse_operation) без подключения к БД
+import pytest
+
+from notebookk.batch import BatchError, parse_operation
+
+
+def test_add_defaults():
+    o = parse_operation(3, '{"op": "add", "title": "Купить молоко", "tags": "Дом"}')
+    assert (o.line, o.op, o.note_id) == (3, "add", None)
+    assert o.values == {"title": "Купить молоко", "body": "", "status": "todo", "priority": "medium",
+                        "tags": ["дом"]}
+
+
+def test_status_becomes_update():
+    o = parse_operation(1, '{"op": "status", "id": 12, "status": "done"}')
+    assert (o.op, o.note_id, o.values) == ("update", 12, {"status": "done"})
+
+
+def test_update_and_delete():
+    o = parse_operation(1, '{"op": "update", "id": 5, "title": "Новый", "priority": "low"}')
+    assert (o.op, o.note_id, o.values) == ("update", 5, {"title": "Новый", "priority": "low"})
+    o = parse_operation(2, '{"op": "delete", "id": 7}')
+    assert (o.op, o.note_id) == ("delete", 7)
+
+
+def test_updates_with_same_values_group_together():
+    first = parse_operation(1, '{"op": "update", "id": 1, "status": "done", "priority": "high"}')
+    second = parse_operation(2, '{"op": "update", "id": 2, "priority": "high", "status": "done"}')
+    other = parse_operation(3, '{"op": "update", "id": 3, "status": "todo"}')
+    assert first.group_key() == second.group_key() != other.group_key()
+    assert parse_operation(4, '{"op": "delete", "id": 4}').group_key() == ("delete",)
+
+
+@pytest.mark.parametrize("text", [
+    "{not json",
+    "[1, 2]",
+    '{"title": "без операции"}',
+    '{"op": "rename", "id": 1}',
+    '{"op": "add"}',
+    '{"op": "add", "title": "x", "status": "later"}',
+    '{"op": "add", "title": "x", "priority": "urgent"}',
+    '{"op": "add", "title": "x", "tags": [1]}',
+    '{"op": "add", "title": 5}',
+    '{"op": "delete"}',
+    '{"op": "delete", "id": "7"}',
+    '{"op": "delete", "id": true}',
+    '{"op": "status", "id": 1}',
+    '{"op": "update", "id": 1}',
+    '{"op": "update", "id": 1, "created": "2026-01-01"}',
+    '{"op": "update", "id": 1, "body": null}',
+])
+def test_invalid_operations(text):
+    with pytest.raises(BatchError):
+        parse_operation(1, text)
@@ -0,0 +1,99 @@
+# test_dedupe.py
+# Подписи MinHash, кластеризация LSH и план объединения дубликатов (dedupe.py) без подключения к БД
+import datetime
+import random
+
+from notebookk import dedupe
+from notebookk.dedupe import (EMPTY_SIGNATURE, find_clusters, plan_merge, read_cache, shingles, signature,
+                              similarity, write_cache)
+from notebookk.models import Note
+
+WORDS = ("молоко хлеб отчет встреча план бюджет проект задача срок клиент договор звонок письмо "
+         "сервер релиз тест ошибка дизайн макет склад").split()
+
+
+def random_text(rnd, length=40):
+    return " ".join(rnd.choice(WORDS) + str(rnd.randrange(50)) for _ in range(length))
+
+
+def jaccard(a, b):
+    a, b = shingles(a), shingles(b)
+    return len(a & b) / len(a | b)
+
+
+def test_signature_of_same_text():
+    text = "Купить молоко, хлеб и сыр к ужину"
+    assert signature(text) == signature(text.upper())
+    assert similarity(signature(text), signature(text)) == 1.0
+    assert signature("") == signature("!!! ...") == EMPTY_SIGNATURE
+
+
+def test_signature_without_numpy(monkeypatch):
+    text = random_text(random.Random(1), 300)
+    expected = signature(text)
+    monkeypatch.setattr(dedupe, "numpy", None)
+    assert signature(text) == expected
+
+
+def test_similarity_estimates_jaccard():
+    rnd = random.Random(2)
+    base = random_text(rnd, 200).split()
+    for changed in (0, 10, 40, 100):
+        other = list(base)
+        for i in rnd.sample(range(len(other)), changed):
+            other[i] = "замена" + str(i)
+        a, b = " ".join(base), " ".join(other)
+        assert abs(similarity(signature(a), signature(b)) - jaccard(a, b)) < 0.2
+
+
+def test_find_clusters():
+    rnd = random.Random(3)
+    signatures = {}
+    groups = []
+    note_id = 0
+    for _ in range(5):
+        text = random_text(rnd, 200).split()
+        group = []
+        for _ in range(rnd.randint(2, 4)):
+            note_id += 1
+            copy = list(text)
+            copy[rnd.randrange(len(copy))] = "правка"   # Почти дубликат
+            signatures[note_id] = signature(" ".join(copy))
+            group.append(note_id)
+        groups.append(group)
+    for _ in range(50):
+        note_id += 1
+        signatures[note_id] = signature(random_text(rnd))
+    note_id += 1
+    signatures[note_id] = EMPTY_SIGNATURE
+
+    found = find_clusters(signatures, threshold=0.7)
+    assert sorted(found) == sorted(groups)
+    assert [len(group) for group in found] == sorted((len(group) for group in groups), reverse=True)
+
+
+def test_plan_merge_keeps_latest_and_skips_dissimilar():
+    rnd = random.Random(4)
+    text = random_text(rnd)
+    older = Note(1, "Заметка", text)
+    older.updated = datetime.datetime(2026, 1, 1)
+    newer = Note(2, "Заметка", text + " дополнение")
+    newer.updated = datetime.datetime(2026, 2, 1)
+    other = Note(3, "Другое", random_text(rnd))
+    other.updated = datetime.datetime(2025, 1, 1)
+
+    keep, duplicates = plan_merge([older, other, newer], threshold=0.7)
+    assert keep is newer
+    assert duplicates == [older]
+    assert plan_merge([older]) is None
+
+
+def test_cache_round_trip(tmp_path):
+    path = str(tmp_path / "minhash.bin")
+    entries = {1: (-1, signature("первая заметка")), 5: (1_700_000_000_000_000, signature("вторая"))}
+    write_cache(entries, path)
+    assert read_cache(path) == entries
+    assert read_cache(str(tmp_path / "missing.bin")) == {}
+
+    (tmp_path / "bad.bin").write_bytes(b"XXXX" + bytes(20))
+    assert read_cache(str(tmp_path / "bad.bin")) == {}
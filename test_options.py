@@ -0,0 +1,42 @@
+# test_options.py
+# Преобразования аргументов командной строки (options.py)
+import pytest
+
+from notebookk.options import format_size, parse_size
+
+
+@pytest.mark.parametrize("text, size", [
+    ("1048576", 1048576),
+    ("0", 0),
+    ("512B", 512),
+    ("512kB", 512 * 1024),
+    ("8MB", 8 * 2**20),
+    (" 8 mb ", 8 * 2**20),
+    ("1.5GB", 3 * 2**29),
+    ("2TB", 2 * 2**40),
+])
+def test_parse_size(text, size):
+    assert parse_size(text) == size
+
+
+@pytest.mark.parametrize("text", ["", "MB", "-1MB", "8 PB", "8M", "1,5GB", "восемь"])
+def test_parse_size_rejects(text):
+    with pytest.raises(ValueError):
+        parse_size(text)
+
+
+@pytest.mark.parametrize("size, text", [
+    (0, "0 B"),
+    (1023, "1023 B"),
+    (1024, "1.0 kB"),
+    (12.5 * 2**20, "12.5 MB"),
+    (3 * 2**30, "3.0 GB"),
+    (5 * 2**40, "5.0 TB"),
+])
+def test_format_size(size, text):
+    assert format_size(size) == text
+
+
+def test_format_then_parse():
+    for size in (1, 2**10, 2**20, 2**30):
+        assert parse_size(format_size(size).replace(" ", "")) == size
@@ -0,0 +1,36 @@
+# test_paths.py
+# Пути локальных файлов и перевод времени в микросекунды (paths.py)
+import datetime
+import os
+
+from notebookk.paths import data_dir, data_file, from_micros, to_micros
+
+
+def test_data_file_per_database(monkeypatch):
+    monkeypatch.delenv("NOTEBOOKK_SNAPSHOT", raising=False)
+    monkeypatch.setenv("DB_HOST", "db.example")
+    monkeypatch.setenv("DB_PORT", "6432")
+    monkeypatch.setenv("DB_NAME", "notes")
+    assert data_file("NOTEBOOKK_SNAPSHOT", "snapshot.bin") == \
+        os.path.join(data_dir(), "snapshot-db.example-6432-notes.bin")
+    assert data_file("NOTEBOOKK_SNAPSHOT", "history", per_database=False) == os.path.join(data_dir(), "history")
+
+
+def test_data_file_defaults_and_override(monkeypatch):
+    for name in ("DB_HOST", "DB_PORT", "DB_NAME"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.delenv("NOTEBOOKK_JOURNAL", raising=False)
+    assert os.path.basename(data_file("NOTEBOOKK_JOURNAL", "journal.jsonl")) == \
+        "journal-localhost-5432-notebookk_db.jsonl"
+    monkeypatch.setenv("NOTEBOOKK_JOURNAL", "/tmp/custom.jsonl")
+    assert data_file("NOTEBOOKK_JOURNAL", "journal.jsonl") == "/tmp/custom.jsonl"
+
+
+def test_micros_round_trip():
+    moment = datetime.datetime(2026, 10, 19, 12, 30, 45, 123456)
+    assert to_micros(datetime.datetime(1970, 1, 1)) == 0
+    assert from_micros(to_micros(moment)) == moment
+    assert to_micros("2026-10-19T12:30:45.123456") == to_micros(moment)
+    assert to_micros(moment.replace(tzinfo=datetime.timezone.utc)) == to_micros(moment)
+    assert to_micros(None) == to_micros("") == -1
+    assert from_micros(-1) is None
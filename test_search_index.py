@@ -0,0 +1,134 @@
+# test_search_index.py
+# Индексы GUI (search_index.py) сверяются с простым перебором заметок
+import random
+
+from notebookk.models import Note, STATUSES, PRIORITIES
+from notebookk.search_index import SearchIndex, FacetIndex, SortIndex, SORT_KEYS
+
+WORDS = ["молоко", "купить", "отчет", "report", "meeting", "встреча", "план", "plan", "a", "ab", "x1"]
+TAGS = ["работа", "дом", "срочно"]
+
+
+def make_notes(count, seed=1):
+    rnd = random.Random(seed)
+    notes = []
+    for note_id in range(1, count + 1):
+        note = Note(
+            note_id,
+            " ".join(rnd.choices(WORDS, k=rnd.randint(1, 3))),
+            " ".join(rnd.choices(WORDS, k=rnd.randint(0, 6))),
+            rnd.choice(STATUSES),
+            rnd.choice(PRIORITIES),
+            f"2026-0{rnd.randint(1, 9)}-1{rnd.randint(0, 9)} 10:00",
+            tags=rnd.sample(TAGS, rnd.randint(0, 2))
+        )
+        notes.append(note)
+    return notes
+
+
+def brute_search(notes, query):
+    query = query.lower()
+    return {note.id for note in notes if query in note.title.lower() + "\x00" + note.body.lower()}
+
+
+def test_search_matches_substring_scan():
+    notes = make_notes(300)
+    index = SearchIndex(notes)
+    for query in ["", "мол", "молоко", "ОТЧЕТ", "port", "a", "x1", "купить молоко", "pl", "нет такого", "  "]:
+        assert index.search(query) == brute_search(notes, query), query
+
+
+def test_search_refined_query_uses_fresh_results():
+    notes = make_notes(200)
+    index = SearchIndex(notes)
+    # Уточнение запроса ищет среди прошлых результатов - результат тот же, что без него
+    for query in ["м", "мо", "мол", "моло", "молок", "молоко"]:
+        assert index.search(query) == brute_search(notes, query), query
+
+
+def test_search_after_add_and_remove():
+    notes = make_notes(200)
+    index = SearchIndex(notes)
+    index.search("отчет")
+    changed = Note(5, "новый отчет", "уникальноеслово")
+    notes[4] = changed
+    index.add(changed)
+    removed = notes.pop(10)
+    index.remove(removed.id)
+    index.remove(10_000)  # Нет в индексе - ничего не происходит
+    for query in ["отчет", "уникальн", "молоко", removed.title]:
+        assert index.search(query) == brute_search(notes, query), query
+    assert len(index) == len(notes)
+
+
+def test_facets_match_filter():
+    notes = make_notes(300)
+    index = FacetIndex(("status", "priority", "tags"), notes, multi=("tags",))
+    for status in ("", *STATUSES):
+        for priority in ("", *PRIORITIES):
+            for tag in ("", *TAGS):
+                expected = {note.id for note in notes
+                            if (not status or note.status == status)
+                            and (not priority or note.priority == priority)
+                            and (not tag or tag in note.tags)}
+                selected = index.select(status=status, priority=priority, tags=tag)
+                if not (status or priority or tag):
+                    assert selected is None
+                else:
+                    assert selected == expected
+
+
+def test_facet_counts_after_update():
+    notes = make_notes(100)
+    index = FacetIndex(("status", "tags"), notes, multi=("tags",))
+    notes[0] = Note(1, "t", "", "done", tags=["новый"])
+    index.add(notes[0])
+    index.remove(notes.pop(1).id)
+    within = {note.id for note in notes if note.priority == "high"}
+
+    counts = index.counts("status", within)
+    for status in STATUSES:
+        assert counts.get(status, 0) == sum(1 for note in notes if note.id in within and note.status == status)
+    tag_counts = index.counts("tags")
+    for tag in (*TAGS, "новый"):
+        assert tag_counts.get(tag, 0) == sum(1 for note in notes if tag in note.tags)
+
+
+def brute_order(notes, column, descending=False, within=None):
+    key = SORT_KEYS[column]
+    chosen = [note for note in notes if within is None or note.id in within]
+    return [note.id for note in sorted(chosen, key=key, reverse=descending)]
+
+
+def test_sort_order_matches_sorted():
+    notes = make_notes(300)
+    index = SortIndex(notes)
+    for column in SORT_KEYS:
+        for descending in (False, True):
+            assert index.order(column, descending) == brute_order(notes, column, descending)
+
+
+def test_sort_order_after_add_and_remove():
+    notes = make_notes(200)
+    index = SortIndex(notes)
+    for column in SORT_KEYS:
+        index.order(column)
+    notes[3] = Note(4, "ААА первая", "", "done", "high", "2020-01-01 00:00")
+    index.add(notes[3])
+    notes.append(Note(999, "zzz", "", created="2030-01-01 00:00"))
+    index.add(notes[-1])
+    index.remove(notes.pop(0).id)
+    for column in SORT_KEYS:
+        assert index.order(column) == brute_order(notes, column)
+
+
+def test_ordered_within_filter():
+    notes = make_notes(400)
+    index = SortIndex(notes)
+    small = {note.id for note in notes[:20]} | {100_000}   # Меньше 1/8: сортируются только они
+    large = {note.id for note in notes if note.status != "done"}
+    for within in (None, small, large, set()):
+        for column in ("created", "title", "priority"):
+            for descending in (False, True):
+                assert list(index.ordered(column, descending, within)) == \
+                    brute_order(notes, column, descending, within)
@@ -0,0 +1,44 @@
+# test_snapshot.py
+# Запись и чтение локального снимка заметок (snapshot.py)
+import datetime
+
+from notebookk.models import Note
+from notebookk.snapshot import read_snapshot, write_snapshot
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "snapshot.bin")
+    first = Note(1, "Купить молоко 🥛", "текст " * 100, "done", "high", "2026-01-05 10:30", tags=["дом", "срочно"])
+    first.updated = datetime.datetime(2026, 1, 6, 8, 15, 30, 250000)
+    second = Note(42, "Без тегов", "", "in_progress", "low", "2026-02-01 00:00")
+    cursor = datetime.datetime(2026, 2, 2, 12, 0)
+
+    write_snapshot([first, second], cursor, path)
+    notes, read_cursor = read_snapshot(path)
+
+    assert read_cursor == cursor
+    assert [(n.id, n.title, n.status, n.priority, n.created, n.updated, n.tags, n.body_length) for n in notes] == \
+        [(1, first.title, "done", "high", "2026-01-05 10:30", first.updated, ["дом", "срочно"], len(first.body)),
+         (42, "Без тегов", "in_progress", "low", "2026-02-01 00:00", None, [], 0)]
+    # Тексты в снимок не входят и загружаются из БД по требованию
+    assert notes[0].body_complete is False
+
+
+def test_empty_snapshot(tmp_path):
+    path = str(tmp_path / "snapshot.bin")
+    write_snapshot([], None, path)
+    assert read_snapshot(path) == ([], None)
+
+
+def test_missing_or_foreign_file(tmp_path):
+    assert read_snapshot(str(tmp_path / "missing.bin")) == ([], None)
+    other = tmp_path / "other.bin"
+    other.write_bytes(b"NOPE" + bytes(32))
+    assert read_snapshot(str(other)) == ([], None)
+
+
+def test_truncated_file(tmp_path):
+    path = tmp_path / "snapshot.bin"
+    write_snapshot([Note(1, "Заметка", "текст")], None, str(path))
+    path.write_bytes(path.read_bytes()[:-3])
+    assert read_snapshot(str(path)) == ([], None)
@@ -0,0 +1,69 @@
+# test_syncdir.py
+# Формат Markdown-файлов заметок (syncdir.py) без подключения к БД
+import datetime
+import os
+
+import pytest
+
+from notebookk import syncdir
+from notebookk.models import Note
+from notebookk.syncdir import DirectorySync, file_name, parse_note, render_note
+
+
+@pytest.mark.parametrize("note", [
+    Note(12, "Купить молоко", "Текст\n\nвторой абзац", "in_progress", "high", "2026-01-05 10:30",
+         tags=["работа", "срочно"]),
+    Note(3, "Пустой текст", "", "done", "low", "2026-01-05 10:30"),
+    Note(4, "Текст с переводами строк по краям", "\n\nсередина\n\n", created="2026-01-05 10:30"),
+    Note(5, "Разметка внутри", "---\nid: 99\n---\n# не заголовок", created="2026-01-05 10:30"),
+])
+def test_render_parse_round_trip(note):
+    parsed = parse_note(render_note(note))
+    assert (parsed.id, parsed.title, parsed.body, parsed.status, parsed.priority, parsed.created, parsed.tags) == \
+        (note.id, note.title, note.body, note.status, note.priority, note.created, note.tags)
+
+
+def test_parse_windows_line_endings_and_defaults():
+    note = parse_note("---\r\ntitle: игнорируется\r\n---\r\n\r\n# Новая заметка\r\n\r\nтекст\r\n")
+    assert (note.id, note.title, note.body, note.status, note.priority) == (0, "Новая заметка", "текст", "todo",
+                                                                          "medium")
+
+
+@pytest.mark.parametrize("text", [
+    "# Без метаданных\n",
+    "---\nid: 1\n# Заголовок\n",
+    "---\nid: 1\n---\n\nтекст без заголовка\n",
+    "---\nid: 1\n---\n\n# \n",
+    "---\nid: x\n---\n\n# Заголовок\n",
+    "---\nstatus: later\n---\n\n# Заголовок\n",
+    "---\npriority: urgent\n---\n\n# Заголовок\n",
+])
+def test_parse_rejects(text):
+    with pytest.raises(ValueError):
+        parse_note(text)
+
+
+def test_file_name():
+    assert file_name(Note(12, "Купить молоко!", "")) == "12-купить-молоко.md"
+    assert file_name(Note(7, "???", "")) == "7-note.md"
+    assert len(file_name(Note(1, "слово " * 50, ""))) <= len("1-.md") + 60
+
+
+def test_sync_without_state_keeps_local_changes(tmp_path, monkeypatch):
+    changed = Note(5, "Привет", "из БД", created="2026-01-01 10:00")
+    same = Note(6, "Такая же", "текст", created="2026-01-01 10:00")
+    for note in (changed, same):
+        note.updated = datetime.datetime(2026, 1, 2)
+    monkeypatch.setattr(syncdir, "changes_since", lambda cursor: ([changed, same], [], datetime.datetime(2026, 1, 3)))
+
+    # Файлы прошлой синхронизации без файла состояния: один изменен локально и переименован
+    (tmp_path / "5-old.md").write_text(render_note(Note(5, "Old", "локальная правка", created="2026-01-01 10:00")),
+                                       encoding="utf-8")
+    (tmp_path / file_name(same)).write_text(render_note(same), encoding="utf-8")
+
+    stats = DirectorySync(str(tmp_path)).sync()
+    assert stats["conflicts"] == ["5-old.conflict.md"]
+    assert stats["created"] == 0
+    assert sorted(os.listdir(tmp_path)) == [".notebookk-sync.json", "5-old.conflict.md", "5-привет.md",
+                                            "6-такая-же.md"]
+    assert "локальная правка" in (tmp_path / "5-old.conflict.md").read_text(encoding="utf-8")
@@ -0,0 +1,122 @@
+# test_transfer.py
+# Деление файла на порции и разбор записей импорта (transfer.py) без подключения к БД
+import csv
+import io
+import json
+
+import pytest
+
+from notebookk.transfer import split_file, parse_record, detect_format, _parse_chunk, _max_explicit_id
+
+
+def write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data.encode("utf-8"))
+    return str(path)
+
+
+def test_split_file_on_line_boundaries(tmp_path):
+    lines = [json.dumps({"title": f"заметка {i}", "body": "x" * (i % 13)}, ensure_ascii=False) for i in range(200)]
+    data = "\n".join(lines) + "\n"
+    path = write(tmp_path, "notes.jsonl", data)
+    raw = data.encode("utf-8")
+
+    for chunk_bytes in (1, 50, 333, 10**6):
+        bounds = split_file(path, chunk_bytes)
+        assert bounds[0][0] == 0 and bounds[-1][1] == len(raw)
+        for (_, end), (start, _) in zip(bounds, bounds[1:]):
+            assert end == start and raw[end - 1:end] == b"\n"
+
+
+def test_split_file_keeps_quoted_newlines_together(tmp_path):
+    out = io.StringIO(newline="")
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(["id", "title", "body"])
+    rows = [[i, f"t{i}", "строка 1\nстрока 2\n\nстрока 4" if i % 3 else "просто"] for i in range(1, 60)]
+    writer.writerows(rows)
+    data = out.getvalue()
+    path = write(tmp_path, "notes.csv", data)
+    start = len(data.split("\n", 1)[0]) + 1
+    header = ["id", "title", "body"]
+
+    bounds = split_file(path, 40, start, quoted=True)
+    parsed = []
+    for first, last in bounds:
+        _, notes, _, errors, _, _ = _parse_chunk((path, "csv", first, last, header))
+        assert errors == []
+        parsed += [(note.id, note.title, note.body) for note in notes]
+    assert parsed == [tuple(row) for row in rows]
+
+
+def test_split_empty_file(tmp_path):
+    assert split_file(write(tmp_path, "empty.jsonl", ""), 100) == []
+
+
+def test_parse_record():
+    note = parse_record({"id": "12", "title": "Заголовок", "status": "done", "priority": "high",
+                         "created": "2026-01-05 10:30", "tags": "Работа, срочно"})
+    assert (note.id, note.title, note.body, note.status, note.priority, note.created) == \
+        (12, "Заголовок", "", "done", "high", "2026-01-05 10:30")
+    assert note.tags == ["работа", "срочно"]
+    assert parse_record({"title": "новая"}).id == 0
+    assert parse_record({"id": "", "title": "новая"}).id == 0
+
+
+@pytest.mark.parametrize("data", [
+    [1, 2],
+    {"body": "без заголовка"},
+    {"id": -1, "title": "x"},
+    {"id": "abc", "title": "x"},
+    {"title": "x" * 256},
+    {"title": "x", "status": "later"},
+    {"title": "x", "priority": "urgent"},
+    {"title": "x", "created": "вчера"},
+    {"title": "x", "body": 5},
+])
+def test_parse_record_rejects(data):
+    with pytest.raises(ValueError):
+        parse_record(data)
+
+
+def test_parse_chunk_reports_lines(tmp_path):
+    data = "\n".join([
+        json.dumps({"title": "первая"}),
+        "# комментарий",
+        "",
+        "{oops",
+        json.dumps({"id": 7, "title": "вторая"}),
+        json.dumps({"title": ""}),
+    ]) + "\n"
+    path = write(tmp_path, "notes.jsonl", data)
+    _, notes, note_lines, errors, lines, _ = _parse_chunk((path, "jsonl", 0, len(data.encode()), None))
+    assert [note.title for note in notes] == ["первая", "вторая"]
+    assert note_lines == [1, 5]
+    assert [line for line, _ in errors] == [4, 6]
+    assert lines == 6
+
+
+def test_max_explicit_id(tmp_path):
+    data = "\n".join([
+        json.dumps({"title": "без id"}),
+        json.dumps({"id": 40, "title": "a", "body": '"id": 1000'}),
+        '# {"id": 500}',
+        json.dumps({"id": "12", "title": "b"}),
+        json.dumps({"id": "плохой", "title": "c"}),
+    ]) + "\n"
+    path = write(tmp_path, "notes.jsonl", data)
+    assert _max_explicit_id((path, "jsonl", 0, len(data.encode()), None)) == 40
+
+    path = write(tmp_path, "new.jsonl", json.dumps({"title": "x"}) + "\n")
+    assert _max_explicit_id((path, "jsonl", 0, 17, None)) == 0
+
+    data = 'id,title\n3,a\n,b\n12,"две\nстроки"\n'
+    path = write(tmp_path, "notes.csv", data)
+    assert _max_explicit_id((path, "csv", 9, len(data.encode()), ["id", "title"])) == 12
+
+
+def test_detect_format():
+    assert detect_format("a.CSV") == "csv"
+    assert detect_format("a.feather") == "arrow"
+    assert detect_format("a.parquet") == "parquet"
+    assert detect_format("a.jsonl") == "jsonl"
+    assert detect_format("notes") == "jsonl"
@@ -0,0 +1,544 @@
+"""
+transfer.py
+Модуль параллельного импорта и экспорта заметок (JSON Lines и CSV;
+экспорт - также в колоночные снимки Arrow и Parquet, см. analytics.py).
+
+Импорт: файл делится на порции по границам строк, порции разбираются и
+проверяются (Note.from_dict) в пуле процессов, а готовые заметки
+записываются в БД несколькими подключениями одновременно. ID новым
+заметкам выделяются в порядке строк файла, а явно указанные в файле
+id и created сохраняются, поэтому экспорт и повторный импорт сохраняют
+и ID, и порядок заметок. Перед разбором файл просматривается, и
+последовательность ID сдвигается за наибольший явный ID, поэтому ID новых
+заметок не совпадают с явными ниже по файлу. Заметки, которые уже есть
+в БД (тот же ID и дата создания), пропускаются; явный ID, занятый другой
+заметкой или повторяющийся в файле, - ошибка.
+
+Экспорт: диапазон ID делится на порции, каждый процесс пула читает
+свои порции через собственное подключение и сразу форматирует их
+(для Arrow и Parquet - в колоночные порции pyarrow), а результат
+записывается в файл в порядке ID.
+
+workers=1 выполняет все в текущем процессе (без пула).
+"""
+
+import collections
+import contextlib
+import csv
+import datetime
+import io
+import json
+import math
+import mmap
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .analytics import SnapshotWriter, notes_to_batch, require_columnar
+from .database import Database
+from .models import Note, STATUSES, PRIORITIES
+from .options import SNAPSHOT_FORMATS, IMPORT_FORMATS
+from .storage import allocate_note_ids, import_notes, id_bounds, load_id_range
+
+# Колонки CSV (теги - через запятую, см. normalize_tags)
+CSV_FIELDS = ("id", "title", "body", "status", "priority", "created", "updated", "tags")
+
+# Размер порции импорта в байтах и экспорта в заметках
+IMPORT_CHUNK_BYTES = 4 * 2**20
+EXPORT_CHUNK_ROWS = 10000
+
+# Максимальная длина заголовка (колонка title VARCHAR(255))
+TITLE_MAX_LENGTH = 255
+
+# Расширения файлов для detect_format()
+_EXTENSIONS = {".csv": "csv", ".arrow": "arrow", ".feather": "arrow", ".parquet": "parquet"}
+
+_BOM = b"\xef\xbb\xbf"
+
+
+def detect_format(path):
+    """Определяет формат файла по расширению (.csv, .arrow/.feather, .parquet; иначе JSON Lines)."""
+    return _EXTENSIONS.get(os.path.splitext(path)[1].lower(), "jsonl")
+
+
+def default_workers():
+    """Число процессов по умолчанию - по числу ядер."""
+    return os.cpu_count() or 1
+
+
+def split_file(path, chunk_bytes, start=0, quoted=False):
+    """
+    Делит файл на порции примерно по chunk_bytes байт по границам строк.
+
+    Args:
+        path (str): Путь к файлу
+        chunk_bytes (int): Желаемый размер порции
+        start (int): Смещение начала данных (после заголовка)
+        quoted (bool): Значения могут содержать переводы строк в кавычках (CSV):
+            граница порции ставится только после четного числа кавычек
+
+    Returns:
+        list[tuple[int, int]]: Смещения начала и конца порций
+    """
+    if os.path.getsize(path) <= start:
+        return []
+
+    bounds = []
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        size = len(mm)
+        pos = start
+        while pos < size:
+            end = min(pos + chunk_bytes, size)
+            while end < size:
+                newline = mm.find(b"\n", end - 1)
+                end = size if newline < 0 else newline + 1
+                if not quoted or mm[pos:end].count(b'"') % 2 == 0:
+                    break
+                # Перевод строки внутри значения в кавычках - ищем следующий
+                end += 1
+            bounds.append((pos, end))
+            pos = end
+    return bounds
+
+
+def parse_record(data):
+    """
+    Проверяет запись импорта и создает из нее заметку.
+
+    Args:
+        data (dict): Поля заметки (id и created необязательны)
+
+    Returns:
+        Note: Заметка; id=0, если ID нужно выделить
+
+    Raises:
+        ValueError: Если запись некорректна
+    """
+    if not isinstance(data, dict):
+        raise ValueError("ожидается JSON-объект")
+    data = dict(data)
+    if not data.get("title"):
+        raise ValueError("не указан заголовок (title)")
+    if data.get("id") in (None, ""):
+        data["id"] = 0
+    data["id"] = int(data["id"])
+    if data["id"] < 0:
+        raise ValueError(f"некорректный id: {data['id']}")
+    data.setdefault("body", "")
+
+    try:
+        note = Note.from_dict(data)
+    except (TypeError, AttributeError) as e:
+        raise ValueError(f"некорректные поля: {e}")
+    if not isinstance(note.title, str) or not isinstance(note.body, str):
+        raise ValueError("поля title и body должны быть строками")
+    if len(note.title) > TITLE_MAX_LENGTH:
+        raise ValueError(f"заголовок длиннее {TITLE_MAX_LENGTH} символов")
+    if note.status not in STATUSES:
+        raise ValueError(f"неизвестный статус: {note.status}")
+    if note.priority not in PRIORITIES:
+        raise ValueError(f"неизвестный приоритет: {note.priority}")
+    if not isinstance(note.created, str):
+        raise ValueError(f"некорректная дата создания: {note.created}")
+    datetime.datetime.fromisoformat(note.created)  # ValueError для некорректной даты
+    return note
+
+
+def _parse_chunk(task):
+    """
+    Разбирает порцию файла (выполняется в процессе пула).
+
+    Args:
+        task (tuple): Путь, формат, смещения начала и конца, заголовок CSV
+
+    Returns:
+        tuple: PID процесса, заметки, номера их строк в порции, ошибки
+        [(строка в порции, описание)], число строк в порции и время разбора в секундах
+    """
+    path, fmt, start, end, header = task
+    started = time.perf_counter()
+    with open(path, "rb") as f:
+        f.seek(start)
+        text = f.read(end - start).decode("utf-8")
+
+    notes = []
+    note_lines = []
+    errors = []
+    if fmt == "csv":
+        reader = csv.DictReader(io.StringIO(text, newline=""), fieldnames=header)
+        line_no = 1
+        for row in reader:
+            # Пустые значения CSV - то же, что отсутствующие поля (кроме текста)
+            data = {key: value for key, value in row.items()
+                    if key is not None and (value not in ("", None) or key == "body")}
+            try:
+                notes.append(parse_record(data))
+                note_lines.append(line_no)
+            except (ValueError, KeyError) as e:
+                errors.append((line_no, str(e)))
+            line_no = reader.line_num + 1
+    else:
+        for line_no, line in enumerate(text.split("\n"), 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                notes.append(parse_record(json.loads(line)))
+                note_lines.append(line_no)
+            except json.JSONDecodeError as e:
+                errors.append((line_no, f"некорректный JSON: {e}"))
+            except (ValueError, KeyError) as e:
+                errors.append((line_no, str(e)))
+
+    return os.getpid(), notes, note_lines, errors, text.count("\n"), time.perf_counter() - started
+
+
+def _max_explicit_id(task):
+    """
+    Находит наибольший явно указанный id в порции (выполняется в процессе пула).
+
+    Некорректные записи здесь не проверяются - их отклонит _parse_chunk().
+
+    Args:
+        task (tuple): Путь, формат, смещения начала и конца, заголовок CSV
+
+    Returns:
+        int: Наибольший id (0, если явных id в порции нет)
+    """
+    path, fmt, start, end, header = task
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    if fmt != "csv" and b'"id"' not in data:
+        return 0
+
+    text = data.decode("utf-8")
+    if fmt == "csv":
+        column = header.index("id")
+        values = [row[column] for row in csv.reader(io.StringIO(text, newline="")) if len(row) > column]
+    else:
+        values = []
+        for line in text.split("\n"):
+            line = line.strip()
+            if '"id"' in line and not line.startswith("#"):
+                try:
+                    values.append(json.loads(line).get("id"))
+                except (ValueError, AttributeError):
+                    pass
+
+    largest = 0
+    for value in values:
+        try:
+            largest = max(largest, int(value))
+        except (TypeError, ValueError):
+            pass
+    return largest
+
+
+def _ordered_map(pool, fn, items, window):
+    """
+    Выполняет fn для элементов в пуле и возвращает результаты в исходном порядке.
+
+    В работе одновременно не больше window задач, поэтому готовые, но еще
+    не обработанные результаты не накапливаются в памяти.
+    """
+    if pool is None:
+        yield from map(fn, items)
+        return
+    pending = collections.deque()
+    for item in items:
+        pending.append(pool.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _process_pool(workers, initializer=None):
+    """
+    Создает пул процессов (или None для workers=1).
+
+    Процессы запускаются через spawn: при fork они унаследовали бы
+    подключение к БД родительского процесса.
+    """
+    if workers <= 1:
+        return contextlib.nullcontext()
+    return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=initializer)
+
+
+def _record_write(stats, lock, name, count, seconds, inserted=0, conflicts=(), error=None):
+    """Учитывает результат записи порции (вызывается из потоков записи)."""
+    with lock:
+        worker = stats["writers"].setdefault(name, [0, 0.0])
+        worker[0] += count
+        worker[1] += seconds
+        if error is None:
+            stats["imported"] += inserted
+            stats["skipped"] += count - inserted - len(conflicts)
+            stats["failed"] += len(conflicts)
+            if conflicts:
+                shown = ", ".join(map(str, conflicts[:10])) + (", ..." if len(conflicts) > 10 else "")
+                stats["errors"].append(f"{len(conflicts)} заметок не записаны - ID заняты другими заметками: {shown}")
+        else:
+            stats["failed"] += count
+            stats["errors"].append(f"порция из {count} заметок не записана: {error}")
+
+
+def _writer(name, tasks, stats, lock):
+    """
+    Поток записи: вставляет порции заметок через собственное подключение.
+
+    Каждая порция записывается отдельной транзакцией.
+    """
+    try:
+        with Database.session():
+            while True:
+                notes = tasks.get()
+                if notes is None:
+                    return
+                started = time.perf_counter()
+                try:
+                    with Database.transaction():
+                        inserted, conflicts = import_notes(notes)
+                except Exception as e:
+                    _record_write(stats, lock, name, len(notes), time.perf_counter() - started, error=e)
+                    continue
+                _record_write(stats, lock, name, len(notes), time.perf_counter() - started,
+                              len(inserted), conflicts)
+    except Exception as e:
+        # Подключение не открылось: поток продолжает забирать порции (как
+        # ошибочные), чтобы разбор не остановился на заполненной очереди
+        while True:
+            notes = tasks.get()
+            if notes is None:
+                return
+            _record_write(stats, lock, name, len(notes), 0.0, error=e)
+
+
+def import_file(path, fmt=None, workers=None, connections=None, chunk_bytes=IMPORT_CHUNK_BYTES, on_error=None):
+    """
+    Импортирует заметки из файла JSON Lines или CSV.
+
+    Args:
+        path (str): Путь к файлу
+        fmt (str, optional): Формат (jsonl/csv; по умолчанию по расширению)
+        workers (int, optional): Число процессов разбора (по умолчанию по числу ядер)
+        connections (int, optional): Число подключений для записи (по умолчанию min(workers, 4))
+        chunk_bytes (int): Размер порции файла
+        on_error (callable, optional): Вызывается для каждой некорректной строки
+            как on_error(номер строки, описание)
+
+    Returns:
+        dict: Итоги: imported, skipped (заметки уже есть в БД), failed, errors
+        (ошибки записи и конфликты ID), elapsed (секунды), parsers и writers
+        (обработчик -> [заметок, секунд работы])
+
+    Raises:
+        ValueError: Если формат файла не поддерживает импорт
+    """
+    fmt = fmt or detect_format(path)
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"Импорт из формата {fmt} не поддерживается (допустимо: {', '.join(IMPORT_FORMATS)})")
+    workers = workers or default_workers()
+    connections = connections or min(workers, 4)
+    stats = {"imported": 0, "skipped": 0, "failed": 0, "errors": [], "elapsed": 0.0,
+             "parsers": {}, "writers": {}}
+    started = time.perf_counter()
+
+    with open(path, "rb") as f:
+        start = len(_BOM) if f.read(len(_BOM)) == _BOM else 0
+        header = None
+        header_lines = 0
+        if fmt == "csv":
+            f.seek(start)
+            first_line = f.readline()
+            header = next(csv.reader([first_line.decode("utf-8")]), [])
+            if "title" not in header:
+                raise ValueError("В первой строке CSV должны быть названия колонок (id, title, body, ...)")
+            start += len(first_line)
+            header_lines = 1
+    tasks = [(path, fmt, first, last, header)
+             for first, last in split_file(path, chunk_bytes, start, quoted=fmt == "csv")]
+
+    # Очередь ограничена: разбор не убегает далеко вперед записи
+    pending = queue.Queue(maxsize=connections * 2)
+    lock = threading.Lock()
+    threads = [threading.Thread(target=_writer, args=(f"подключение {i}", pending, stats, lock), daemon=True)
+               for i in range(1, connections + 1)]
+    for thread in threads:
+        thread.start()
+
+    try:
+        with _process_pool(workers) as pool, Database.session():
+            # Явные ID резервируются до выделения новых: иначе ID, выданный
+            # новой заметке, мог совпасть с явным ID ниже по файлу
+            if fmt != "csv" or "id" in header:
+                explicit = max(_ordered_map(pool, _max_explicit_id, tasks, workers * 2), default=0)
+                if explicit:
+                    allocate_note_ids(0, above=explicit)
+
+            seen = set()
+            line_offset = header_lines
+            for pid, notes, note_lines, errors, lines, seconds in _ordered_map(pool, _parse_chunk, tasks, workers * 2):
+                parser = stats["parsers"].setdefault(f"процесс {pid}", [0, 0.0])
+                parser[0] += len(notes) + len(errors)
+                parser[1] += seconds
+
+                # Повтор явного ID в файле - ошибка: записывается только первая заметка
+                unique = []
+                for note, line_no in zip(notes, note_lines):
+                    if note.id in seen:
+                        errors.append((line_no, f"ID {note.id} уже встречался выше в файле"))
+                        continue
+                    if note.id:
+                        seen.add(note.id)
+                    unique.append(note)
+                errors.sort()
+
+                with lock:
+                    stats["failed"] += len(errors)
+                if on_error:
+                    for line_no, message in errors:
+                        on_error(line_offset + line_no, message)
+                line_offset += lines
+
+                # ID выделяются здесь, в порядке порций, а не в потоках записи
+                new = [note for note in unique if not note.id]
+                if new:
+                    for note, note_id in zip(new, allocate_note_ids(len(new))):
+                        note.id = note_id
+                if unique:
+                    pending.put(unique)
+    finally:
+        for _ in threads:
+            pending.put(None)
+        for thread in threads:
+            thread.join()
+
+    stats["elapsed"] = time.perf_counter() - started
+    return stats
+
+
+def format_notes(notes, fmt):
+    """
+    Форматирует заметки для записи в файл.
+
+    Args:
+        notes (list[Note]): Заметки
+        fmt (str): Формат (jsonl/csv)
+
+    Returns:
+        str: Строки файла (для CSV - без заголовка)
+    """
+    if fmt == "jsonl":
+        return "".join(json.dumps(note.to_dict(), ensure_ascii=False) + "\n" for note in notes)
+    out = io.StringIO(newline="")
+    writer = csv.writer(out, lineterminator="\n")
+    for note in notes:
+        writer.writerow((note.id, note.title, note.body, note.status, note.priority, note.created,
+                         note.updated.isoformat() if note.updated else "", ",".join(note.tags)))
+    return out.getvalue()
+
+
+_worker_session = None
+
+
+def _init_export_worker():
+    """Закрепляет за процессом пула одно подключение на все его порции."""
+    global _worker_session
+    _worker_session = Database.session(readonly=True)
+    _worker_session.__enter__()
+
+
+def _export_range(task):
+    """
+    Загружает и форматирует порцию заметок (выполняется в процессе пула).
+
+    Args:
+        task (tuple): Формат, первый и последний ID диапазона, фильтры
+
+    Returns:
+        tuple: PID процесса, число заметок, время в секундах, данные в UTF-8
+        (для Arrow и Parquet - pyarrow.RecordBatch)
+    """
+    fmt, first_id, last_id, filters = task
+    started = time.perf_counter()
+    notes = load_id_range(first_id, last_id, **filters)
+    if fmt in SNAPSHOT_FORMATS:
+        payload = notes_to_batch(notes)
+    else:
+        payload = format_notes(notes, fmt).encode("utf-8")
+    return os.getpid(), len(notes), time.perf_counter() - started, payload
+
+
+@contextlib.contextmanager
+def _open_output(path, fmt):
+    """Открывает файл выгрузки; возвращает функцию записи порции (см. _export_range())."""
+    if fmt in SNAPSHOT_FORMATS:
+        with SnapshotWriter(path, fmt) as writer:
+            yield writer.write
+        return
+    with open(path, "wb") as f:
+        if fmt == "csv":
+            f.write((",".join(CSV_FIELDS) + "\n").encode("utf-8"))
+        yield f.write
+
+
+def export_file(path, fmt=None, workers=None, chunk_rows=EXPORT_CHUNK_ROWS, **filters):
+    """
+    Выгружает заметки в файл JSON Lines, CSV, Arrow или Parquet (по возрастанию ID).
+
+    Файл сначала пишется во временный, а затем атомарно заменяет старый.
+
+    Args:
+        path (str): Путь к файлу
+        fmt (str, optional): Формат (jsonl/csv/arrow/parquet; по умолчанию по расширению)
+        workers (int, optional): Число процессов (по умолчанию по числу ядер)
+        chunk_rows (int): Примерное число заметок в порции
+        **filters: Фильтры filter_conditions() (например, status или tags)
+
+    Returns:
+        dict: Итоги: exported, elapsed (секунды) и workers
+        (обработчик -> [заметок, секунд работы])
+
+    Raises:
+        ValueError: Если для Arrow или Parquet не установлены pyarrow и NumPy
+    """
+    fmt = fmt or detect_format(path)
+    if fmt in SNAPSHOT_FORMATS:
+        require_columnar()
+    workers = workers or default_workers()
+    stats = {"exported": 0, "elapsed": 0.0, "workers": {}}
+    started = time.perf_counter()
+
+    first, last, count = id_bounds(**filters)
+    tasks = []
+    if count:
+        # ID могут идти с пропусками, поэтому порции получаются примерно равными
+        step = max(1, math.ceil((last - first + 1) * chunk_rows / count))
+        tasks = [(fmt, low, min(low + step - 1, last), filters) for low in range(first, last + 1, step)]
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + ".tmp"
+    try:
+        with _open_output(tmp_path, fmt) as write:
+            # Без пула все порции читаются через одно подключение
+            session = Database.session(readonly=True) if workers <= 1 else contextlib.nullcontext()
+            with _process_pool(workers, _init_export_worker) as pool, session:
+                for pid, rows, seconds, payload in _ordered_map(pool, _export_range, tasks, workers * 2):
+                    worker = stats["workers"].setdefault(f"процесс {pid}", [0, 0.0])
+                    worker[0] += rows
+                    worker[1] += seconds
+                    stats["exported"] += rows
+                    write(payload)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    stats["elapsed"] = time.perf_counter() - started
+    return stats
@@ -0,0 +1,385 @@
+"""
+write_behind.py
+Модуль отложенной записи заметок в БД (write-behind).
+
+Добавление и удаление заметок сразу применяются к локальному списку,
+а в БД записываются фоновым потоком: операции накапливаются и
+фиксируются одной транзакцией раз в WRITE_BEHIND_FLUSH_MS миллисекунд
+или при накоплении WRITE_BEHIND_MAX_BATCH операций (group commit).
+
+Очередь дублируется в локальном журнале (JSON Lines), поэтому
+несохраненные операции не теряются при аварийном завершении и
+повторяются при следующем запуске. Если сбой произошел между фиксацией
+транзакции и очисткой журнала, добавленные заметки будут записаны повторно.
+Соответствие временных ID настоящим сохраняется в журнале вместе с
+операциями, которые на них ссылаются.
+
+Если группа не записывается MAX_ATTEMPTS раз подряд не из-за потери
+связи с БД (нарушено ограничение, поврежденная запись журнала), ее
+операции повторяются по одной, а операция, которая не записывается
+и отдельно, переносится в файл отказов (журнал + ".failed") и больше
+не задерживает очередь.
+
+Включается переменной окружения NOTEBOOKK_WRITE_BEHIND=1.
+"""
+
+import collections
+import json
+import os
+import threading
+import time
+
+import psycopg2
+
+from .database import Database
+from .models import Note
+from .paths import data_file
+from .storage import save_notes_bulk, delete_notes
+
+
+def write_behind_enabled():
+    """Проверяет, включена ли отложенная запись (NOTEBOOKK_WRITE_BEHIND)."""
+    return os.getenv('NOTEBOOKK_WRITE_BEHIND', '').lower() in ('1', 'true', 'yes')
+
+
+def journal_path():
+    """
+    Возвращает путь к журналу несохраненных операций: NOTEBOOKK_JOURNAL
+    или свой для каждой БД файл journal-*.jsonl в ~/.notebookk.
+
+    Returns:
+        str: Путь к журналу
+    """
+    return data_file('NOTEBOOKK_JOURNAL', 'journal.jsonl')
+
+
+class DeadLetterError(Exception):
+    """Операция не записана и перенесена в файл отказов."""
+
+
+class WriteBehindQueue:
+    """
+    Очередь отложенной записи с групповой фиксацией.
+
+    Новые заметки получают временные отрицательные ID. После записи в БД
+    поток возвращает пару (временный ID, сохраненная заметка) через drain(),
+    чтобы интерфейс заменил временную заметку настоящей. Удаление еще не
+    записанной заметки просто убирает ее добавление из очереди; если
+    заметка уже записывается, она удаляется после записи, а результат
+    ее добавления не возвращается через drain().
+
+    Attributes:
+        flush_ms (int): Максимальная задержка перед фиксацией
+        max_batch (int): Максимальное число операций в одной транзакции
+        last_error (Exception | None): Ошибка последней неудачной записи
+            (DeadLetterError остается до закрытия очереди)
+        dead_letters (int): Сколько операций перенесено в файл отказов
+    """
+
+    RETRY_MS = 2000  # Пауза перед повтором после ошибки записи
+    MAX_ATTEMPTS = 3  # Неудачных попыток до разбиения группы (или переноса операции в файл отказов)
+
+    def __init__(self, path=None, flush_ms=None, max_batch=None):
+        """
+        Args:
+            path (str, optional): Путь к журналу (по умолчанию journal_path())
+            flush_ms (int, optional): Задержка фиксации (по умолчанию WRITE_BEHIND_FLUSH_MS или 200)
+            max_batch (int, optional): Размер транзакции (по умолчанию WRITE_BEHIND_MAX_BATCH или 100)
+        """
+        self.path = path or journal_path()
+        self.flush_ms = flush_ms if flush_ms is not None else int(os.getenv('WRITE_BEHIND_FLUSH_MS', '200'))
+        self.max_batch = max_batch if max_batch is not None else int(os.getenv('WRITE_BEHIND_MAX_BATCH', '100'))
+        self.last_error = None
+        self.dead_letters = 0
+
+        self._pending = collections.deque()  # (время постановки, операция)
+        self._in_flight = []                  # Операции, записываемые сейчас
+        self._flight_started = 0.0            # Время постановки самой старой из них
+        self._resolved = {}                   # временный ID -> ID в БД
+        self._cancelled = set()               # Временные ID записываемых заметок, удаленных пользователем
+        self._results = collections.deque()   # (временный ID, Note) для drain()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._next_temp_id = -1
+        self._failures = 0                    # Неудачных попыток подряд (без ошибок связи)
+        self._isolate = 0                     # Сколько следующих операций записывать по одной
+
+        self._load_journal()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._journal = open(self.path, "a", encoding="utf-8")
+
+        self._thread = threading.Thread(target=self._run, name="notebookk-write-behind", daemon=True)
+        self._thread.start()
+
+    # === Интерфейс для главного потока ===
+
+    def add(self, note):
+        """
+        Ставит новую заметку в очередь на запись.
+
+        Args:
+            note (Note): Новая заметка; ей присваивается временный отрицательный ID
+
+        Returns:
+            int: Временный ID заметки
+        """
+        with self._cond:
+            note.id = self._next_temp_id
+            self._next_temp_id -= 1
+            self._append({"op": "add", "note": note.to_dict()})
+            return note.id
+
+    def delete(self, note_id):
+        """
+        Ставит удаление заметки в очередь на запись.
+
+        Args:
+            note_id (int): ID заметки (в том числе временный)
+        """
+        with self._cond:
+            # Заметка уже записана - удаляем по настоящему ID
+            note_id = self._resolved.get(note_id, note_id)
+            if note_id < 0:
+                for item in self._pending:
+                    op = item[1]
+                    if op["op"] == "add" and op["note"]["id"] == note_id:
+                        # Заметка еще не записана - достаточно убрать ее из очереди
+                        self._pending.remove(item)
+                        self._rewrite_journal()
+                        return
+                if any(op["op"] == "add" and op["note"]["id"] == note_id for op in self._in_flight):
+                    # Заметка записывается сейчас: удаление выполнится после записи
+                    # (по сохраненному соответствию ID), а в список она не вернется
+                    self._cancelled.add(note_id)
+            self._append({"op": "delete", "id": note_id})
+
+    def pending_notes(self):
+        """
+        Возвращает добавленные, но еще не записанные заметки.
+
+        Returns:
+            list[Note]: Заметки с временными ID
+        """
+        with self._cond:
+            ops = self._in_flight + [op for _, op in self._pending]
+            return [Note.from_dict(op["note"]) for op in ops if op["op"] == "add"]
+
+    def pending_deletes(self):
+        """
+        Возвращает ID заметок, удаление которых еще не записано.
+
+        Returns:
+            list[int]: ID заметок
+        """
+        with self._cond:
+            ops = self._in_flight + [op for _, op in self._pending]
+            return [op["id"] for op in ops if op["op"] == "delete"]
+
+    def drain(self):
+        """
+        Забирает результаты записи новых заметок.
+
+        Returns:
+            list[tuple[int, Note]]: Пары (временный ID, сохраненная заметка)
+        """
+        with self._cond:
+            results = list(self._results)
+            self._results.clear()
+            return results
+
+    def backlog(self):
+        """
+        Возвращает состояние очереди.
+
+        Returns:
+            tuple[int, float]: Число несохраненных операций и задержка записи
+            (сколько секунд ждет самая старая из них)
+        """
+        with self._cond:
+            count = len(self._pending) + len(self._in_flight)
+            if not count:
+                return 0, 0.0
+            oldest = self._flight_started if self._in_flight else self._pending[0][0]
+            return count, time.monotonic() - oldest
+
+    def close(self, timeout=5.0):
+        """
+        Останавливает запись, дождавшись сохранения очереди (не дольше timeout).
+
+        Несохраненные операции остаются в журнале до следующего запуска.
+
+        Args:
+            timeout (float): Максимальное время ожидания в секундах
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout)
+        with self._cond:
+            self._journal.close()
+
+    # === Журнал ===
+
+    def _append(self, op):
+        """Добавляет операцию в очередь и журнал (вызывается под блокировкой)."""
+        self._journal.write(json.dumps(op, ensure_ascii=False) + "\n")
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        self._pending.append((time.monotonic(), op))
+        self._cond.notify()
+
+    def _rewrite_journal(self):
+        """Перезаписывает журнал несохраненными операциями (вызывается под блокировкой)."""
+        tmp_path = self.path + ".tmp"
+        ops = self._in_flight + [op for _, op in self._pending]
+        # Соответствие ID для удалений заметок, которые уже записаны под настоящим ID
+        resolves = [{"op": "resolve", "temp_id": op["id"], "id": self._resolved[op["id"]]}
+                    for op in ops if op["op"] == "delete" and op["id"] in self._resolved]
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for op in resolves + ops:
+                f.write(json.dumps(op, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        reopen = not self._journal.closed  # Журнал закрыт после close()
+        self._journal.close()
+        os.replace(tmp_path, self.path)
+        if reopen:
+            self._journal = open(self.path, "a", encoding="utf-8")
+
+    def _load_journal(self):
+        """Восстанавливает очередь из журнала, оставшегося от прошлого запуска."""
+        if not os.path.exists(self.path):
+            return
+        now = time.monotonic()
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    op = json.loads(line)
+                except json.JSONDecodeError:
+                    # Последняя строка могла быть записана не полностью
+                    continue
+                if op["op"] == "resolve":
+                    self._resolved[op["temp_id"]] = op["id"]
+                    self._next_temp_id = min(self._next_temp_id, op["temp_id"] - 1)
+                    continue
+                self._pending.append((now, op))
+                if op["op"] == "add":
+                    self._next_temp_id = min(self._next_temp_id, op["note"]["id"] - 1)
+        if self._pending:
+            print(f"📒 Восстановлено несохраненных операций из журнала: {len(self._pending)}")
+
+    # === Фоновый поток ===
+
+    def _run(self):
+        """Цикл фонового потока: ждет операции и фиксирует их группами."""
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                # Даем накопиться операциям, но не дольше flush_ms
+                deadline = self._pending[0][0] + self.flush_ms / 1000
+                while len(self._pending) < self.max_batch and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                self._flight_started = self._pending[0][0]
+                count = 1 if self._isolate else min(len(self._pending), self.max_batch)
+                self._in_flight = [self._pending.popleft()[1] for _ in range(count)]
+                batch = list(self._in_flight)
+
+            try:
+                saved = self._flush(batch)
+            except Exception as e:
+                with self._cond:
+                    if not self._record_failure(e, batch):
+                        continue
+                    # Возвращаем операции в начало очереди и повторяем позже
+                    self._pending.extendleft((self._flight_started, op) for op in reversed(self._in_flight))
+                    self._in_flight = []
+                    closed = self._closed
+                if closed:
+                    return
+                time.sleep(self.RETRY_MS / 1000)
+                continue
+
+            with self._cond:
+                self._failures = 0
+                self._isolate = max(self._isolate - len(batch), 0)
+                if not isinstance(self.last_error, DeadLetterError):
+                    self.last_error = None
+                self._in_flight = []
+                self._results.extend((temp_id, note) for temp_id, note in saved if temp_id not in self._cancelled)
+                self._cancelled.difference_update(temp_id for temp_id, _ in saved)
+                self._rewrite_journal()
+
+    def _record_failure(self, error, batch):
+        """
+        Учитывает неудачную запись группы (вызывается под блокировкой).
+
+        Ошибки связи с БД повторяются бесконечно. Прочие после MAX_ATTEMPTS
+        попыток приводят к записи операций группы по одной, а одиночная
+        операция переносится в файл отказов.
+
+        Returns:
+            bool: True - повторить группу позже, False - операция перенесена
+            в файл отказов и группа завершена
+        """
+        self.last_error = error
+        if isinstance(error, (psycopg2.OperationalError, psycopg2.InterfaceError)):
+            return True
+        self._failures += 1
+        if self._failures < self.MAX_ATTEMPTS:
+            return True
+        self._failures = 0
+        if len(batch) > 1:
+            # Ищем операцию, из-за которой не записывается группа
+            self._isolate = len(batch)
+            return True
+
+        self._dead_letter(batch[0], error)
+        self._isolate = max(self._isolate - 1, 0)
+        self._in_flight = []
+        self._rewrite_journal()
+        return False
+
+    def _dead_letter(self, op, error):
+        """Переносит операцию в файл отказов (вызывается под блокировкой)."""
+        path = self.path + ".failed"
+        try:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"op": op, "error": str(error)}, ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"⚠️ Не удалось записать файл отказов {path}: {e}")
+        self.dead_letters += 1
+        self.last_error = DeadLetterError(
+            f"операций не записано: {self.dead_letters}, перенесены в {path} ({error})"
+        )
+
+    def _flush(self, batch):
+        """
+        Записывает группу операций одной транзакцией.
+
+        Args:
+            batch (list[dict]): Операции из очереди
+
+        Returns:
+            list[tuple[int, Note]]: Пары (временный ID, сохраненная заметка)
+        """
+        adds = [Note.from_dict(op["note"]) for op in batch if op["op"] == "add"]
+        temp_ids = [note.id for note in adds]
+
+        with Database.transaction():
+            save_notes_bulk(adds)
+            resolved = dict(zip(temp_ids, (note.id for note in adds)))
+            # Временные ID удаляемых заметок заменяем настоящими
+            ids = [self._resolved.get(op["id"], resolved.get(op["id"], op["id"]))
+                   for op in batch if op["op"] == "delete"]
+            ids = [note_id for note_id in ids if note_id > 0]
+            if ids:
+                delete_notes(ids)
+
+        self._resolved.update(resolved)
+        return list(zip(temp_ids, adds))